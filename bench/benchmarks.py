@@ -0,0 +1,150 @@
+# Host benchmarks of the firmware hot paths, run against the simulated hardware
+import os
+import sim
+from .harness import measure
+from .harness import measure_loop
+
+# Simulated time allowed for constructing the colorimeter and filling the
+# sensor sample caches (s)
+SETUP_TIME = 30.0
+
+CONFIGURATION_FILE = os.path.join(sim.simulation.REPO_ROOT, 'examples', 'configuration.json')
+
+
+def make_colorimeter(simulation):
+    import fonts
+    import colorimeter
+    fonts.preload()
+    device = simulation.run(colorimeter.Colorimeter, SETUP_TIME)
+    device.light_sensor_pair.wait()
+    return device
+
+
+def set_measurement(device, name):
+    import colorimeter
+    device.menu.set_pos(device.menu_items.index(name))
+    device.mode = colorimeter.Mode.MEASURE
+
+
+def display_pass_hook(device):
+    # One pass of the run loop is taken to be one display task update
+    def hook(on_pass):
+        update_display = device.update_display
+        def update_display_hooked():
+            update_display()
+            on_pass()
+        device.update_display = update_display_hooked
+        return lambda: delattr(device, 'update_display')
+    return hook
+
+
+def bench_run(simulation, device, iterations):
+    import measurement
+    results = []
+    for name in (measurement.RawCount.NAME, measurement.Irradiance.NAME):
+        set_measurement(device, name)
+        run = lambda: simulation.run(device.run, 1.0e9)
+        hook = display_pass_hook(device)
+        results.append(measure_loop(f'run[{name}]', run, hook, iterations))
+    return results
+
+
+def bench_measurement_value(simulation, device, iterations):
+    import measurement
+    results = []
+    for measurement_class in measurement.MEASUREMENTS:
+        item = measurement.from_name(measurement_class.NAME, device.light_sensors, device.configuration)
+        if isinstance(item, measurement.RelativeUnit):
+            item.norm_sample_180 = 1.0
+        func = lambda: item.value
+        results.append(measure(f'value[{measurement_class.NAME}]', func, iterations))
+    return results
+
+
+def bench_screens(simulation, device, iterations):
+    import measurement
+    results = []
+    for measurement_class in measurement.MEASUREMENTS:
+        item = measurement.from_name(measurement_class.NAME, device.light_sensors, device.configuration)
+        if isinstance(item, measurement.RelativeUnit):
+            item.norm_sample_180 = 1.0
+        screen = item.create_screen()
+        screen_name = type(screen).__name__
+        func = lambda: screen.set_measurement(item)
+        results.append(measure(f'set_measurement[{screen_name}]', func, iterations))
+        func = lambda: screen.update(item, device.battery_monitor)
+        results.append(measure(f'update[{screen_name}]', func, iterations))
+    return results
+
+
+def bench_menu(simulation, device, iterations):
+    import colorimeter
+    device.mode = colorimeter.Mode.MENU
+    def func():
+        device.menu.move(1)
+        if device.menu.pos == device.menu.num_items - 1:
+            device.menu.reset()
+        device.update_menu_screen()
+    return [measure('update_menu_screen', func, iterations)]
+
+
+def bench_long_menu(simulation, device, iterations):
+    # Navigation in a menu of hundreds of items, e.g. one per calibration
+    from menu_model import MenuModel
+    from menu_screen import MenuScreen
+    items = [f'{chr(ord("A") + i//20)} calibration {i}' for i in range(500)]
+    screen = MenuScreen()
+    menu = MenuModel(items, screen.items_per_screen)
+    screen.set_menu(menu)
+    results = []
+    def scroll():
+        menu.move(1)
+        if menu.pos == menu.num_items - 1:
+            menu.reset()
+        screen.set_menu(menu)
+    results.append(measure('long_menu[scroll]', scroll, iterations))
+    def page():
+        menu.page_down()
+        if menu.pos == menu.num_items - 1:
+            menu.reset()
+        screen.set_menu(menu)
+    results.append(measure('long_menu[page]', page, iterations))
+    def letter():
+        menu.jump_to_next_letter()
+        screen.set_menu(menu)
+    results.append(measure('long_menu[letter]', letter, iterations))
+    return results
+
+
+def bench_mode_switch(simulation, device, iterations):
+    import colorimeter
+    def func():
+        device.mode = colorimeter.Mode.MENU
+        device.mode = colorimeter.Mode.MEASURE
+    return [measure('mode[menu->measure]', func, iterations)]
+
+
+BENCHMARKS = [
+        bench_run,
+        bench_measurement_value,
+        bench_screens,
+        bench_menu,
+        bench_long_menu,
+        bench_mode_switch,
+        ]
+
+
+def run_benchmarks(iterations=200, select=None):
+    simulation = sim.Simulation(
+            irradiance_90=50.0,
+            irradiance_180=500.0,
+            configuration=CONFIGURATION_FILE,
+            )
+    results = []
+    with simulation:
+        device = make_colorimeter(simulation)
+        for bench in BENCHMARKS:
+            for result in bench(simulation, device, iterations):
+                if select is None or select in result.name:
+                    results.append(result)
+    return results
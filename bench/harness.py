@@ -0,0 +1,120 @@
+import gc
+import time
+import tracemalloc
+
+
+class BenchmarkResult:
+
+    def __init__(self, name, latencies, alloc_bytes):
+        # latencies in seconds, alloc_bytes is the peak traced heap growth of
+        # each iteration (tracemalloc)
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.alloc_bytes = sorted(alloc_bytes)
+
+    @property
+    def iterations(self):
+        return len(self.latencies)
+
+    @property
+    def ops_per_sec(self):
+        total = sum(self.latencies)
+        return self.iterations/total if total > 0 else float('inf')
+
+    @property
+    def p50(self):
+        return percentile(self.latencies, 50)
+
+    @property
+    def p99(self):
+        return percentile(self.latencies, 99)
+
+    @property
+    def alloc_per_iter(self):
+        return percentile(self.alloc_bytes, 50)
+
+    def as_dict(self):
+        return {
+                'iterations'     : self.iterations,
+                'ops_per_sec'    : self.ops_per_sec,
+                'p50_us'         : 1.0e6*self.p50,
+                'p99_us'         : 1.0e6*self.p99,
+                'alloc_per_iter' : self.alloc_per_iter,
+                }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct/100.0*(len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(name, func, iterations=200, warmup=20):
+    # Timing and allocation passes are separate since tracemalloc slows
+    # everything down.
+    for i in range(warmup):
+        func()
+    gc.collect()
+    latencies = []
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t0)
+    alloc_bytes = []
+    tracemalloc.start()
+    try:
+        for i in range(iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            alloc_bytes.append(peak - current)
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(name, latencies, alloc_bytes)
+
+
+class StopLoop(BaseException):
+    pass
+
+
+def measure_loop(name, run, hook, iterations=100, warmup=10):
+    # Times the passes of a firmware main loop. hook(on_pass) must arrange for
+    # on_pass to be called once per pass and return a function undoing that.
+    # run is called twice, once for timing and once for allocations, and is
+    # stopped by raising StopLoop from on_pass.
+
+    def run_passes(on_pass):
+        count = [0]
+        def counted_pass():
+            count[0] += 1
+            if count[0] > warmup:
+                on_pass()
+            if count[0] > warmup + iterations:
+                raise StopLoop
+        unhook = hook(counted_pass)
+        try:
+            run()
+        except StopLoop:
+            pass
+        finally:
+            unhook()
+
+    stamps = []
+    run_passes(lambda: stamps.append(time.perf_counter()))
+    latencies = [t1 - t0 for (t0, t1) in zip(stamps[:-1], stamps[1:])]
+
+    alloc_bytes = []
+    def on_alloc_pass():
+        current, peak = tracemalloc.get_traced_memory()
+        alloc_bytes.append(max(peak - on_alloc_pass.current, 0))
+        on_alloc_pass.current = current
+        tracemalloc.reset_peak()
+    on_alloc_pass.current = 0
+    tracemalloc.start()
+    try:
+        run_passes(on_alloc_pass)
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(name, latencies, alloc_bytes[1:])
@@ -0,0 +1,83 @@
+# Runs the host benchmarks and compares them against the stored baseline
+#
+#   python -m bench.run                   # compare, exit status 1 on regression
+#   python -m bench.run --save-baseline   # store current numbers as the baseline
+#
+import os
+import sys
+import json
+import argparse
+
+from .benchmarks import run_benchmarks
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def compare(results, baseline, time_tolerance, alloc_tolerance):
+    # Returns list of regression messages. Latency is compared on p50 and
+    # allocations on bytes per iteration.
+    regressions = []
+    for name, values in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        p50_limit = base['p50_us']*(1.0 + time_tolerance)
+        if values['p50_us'] > p50_limit:
+            regressions.append(f"{name}: p50 {values['p50_us']:1.1f}us > {p50_limit:1.1f}us")
+        alloc_limit = base['alloc_per_iter']*(1.0 + alloc_tolerance) + 64
+        if values['alloc_per_iter'] > alloc_limit:
+            regressions.append(f"{name}: alloc {values['alloc_per_iter']}B > {alloc_limit:1.0f}B")
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='firmware hot path benchmarks')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--select', default=None, help='only run benchmarks containing this string')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+            help='allowed fractional p50 increase over the baseline')
+    parser.add_argument('--alloc-tolerance', type=float, default=0.1,
+            help='allowed fractional allocation increase over the baseline')
+    args = parser.parse_args(args)
+
+    results = {r.name: r.as_dict() for r in run_benchmarks(args.iterations, args.select)}
+
+    header = f"{'benchmark':<46} {'ops/s':>10} {'p50 us':>10} {'p99 us':>10} {'alloc B':>10}"
+    print(header)
+    print('-'*len(header))
+    for name, values in results.items():
+        print(
+                f"{name:<46} {values['ops_per_sec']:>10.0f} {values['p50_us']:>10.1f} "
+                f"{values['p99_us']:>10.1f} {values['alloc_per_iter']:>10}"
+                )
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f'\nbaseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('\nno baseline to compare against, run with --save-baseline')
+        return 0
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.time_tolerance, args.alloc_tolerance)
+    if regressions:
+        print('\nREGRESSIONS')
+        for msg in regressions:
+            print(f'  {msg}')
+        return 1
+    print('\nno regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+from .clock import SimClock
+from .clock import SimulationStop
+from .simulation import Simulation
+from .simulation import current
+from .tsl2591_model import TSL2591Model
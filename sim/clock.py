@@ -0,0 +1,58 @@
+import time
+
+
+class SimulationStop(BaseException):
+    # BaseException so that firmware "except Exception" handlers can't swallow it
+    pass
+
+
+class SimClock:
+
+    # Same wrap around as supervisor.ticks_ms
+    TICKS_PERIOD = 1 << 29
+    TICKS_MAX = TICKS_PERIOD - 1
+
+    def __init__(self, start=0.0, cpu_scale=0.0):
+        # When cpu_scale > 0 the host cpu time spent between clock reads, scaled
+        # by cpu_scale, is added to simulated time as a crude model of the
+        # microcontroller's (much slower) execution speed.
+        self._now = start
+        self.cpu_scale = cpu_scale
+        self.stop_time = None
+        self.sleep_count = 0
+        self.sleep_time = 0.0
+        self._cpu_last = time.process_time()
+
+    def _sync(self):
+        if self.cpu_scale > 0.0:
+            cpu_now = time.process_time()
+            self._now += self.cpu_scale*(cpu_now - self._cpu_last)
+            self._cpu_last = cpu_now
+        if self.stop_time is not None and self._now >= self.stop_time:
+            # Raised once so the firmware's cleanup (e.g. asyncio task
+            # cancellation) can still run
+            self.stop_time = None
+            raise SimulationStop(f'simulation time {self._now:1.3f}s reached')
+
+    @property
+    def now(self):
+        self._sync()
+        return self._now
+
+    def advance(self, dt):
+        self._now += max(dt, 0.0)
+        self._sync()
+
+    def sleep(self, dt):
+        self.sleep_count += 1
+        self.sleep_time += max(dt, 0.0)
+        self.advance(dt)
+
+    def monotonic(self):
+        return self.now
+
+    def monotonic_ns(self):
+        return int(self.now*1.0e9)
+
+    def ticks_ms(self):
+        return int(self.now*1000.0) & self.TICKS_MAX
@@ -0,0 +1,31 @@
+import asyncio
+import selectors
+
+
+class SimSelector(selectors.DefaultSelector):
+
+    # Never blocks, the time the event loop would have waited is added to
+    # the simulated clock instead.
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            raise RuntimeError('simulated event loop would block forever')
+        self.clock.sleep(timeout)
+        return events
+
+
+class SimEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def new_event_loop(self):
+        return asyncio.SelectorEventLoop(SimSelector(self.clock))
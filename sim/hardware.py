@@ -0,0 +1,241 @@
+import collections
+
+
+class I2CBus:
+
+    # Transaction time is modelled as (bytes + address + stop)*9 bit times
+    FREQUENCY = 100000
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.devices = {}
+        self.transactions = 0
+        self.mux_selects = 0
+        self.selected_channel = None
+
+    def attach(self, channel, address, device):
+        # channel is the PCA9546A channel or None for the root bus
+        self.devices[(channel, address)] = device
+
+    def device(self, channel, address):
+        try:
+            return self.devices[(channel, address)]
+        except KeyError:
+            raise ValueError(f'No I2C device at address: 0x{address:x}')
+
+    def transaction(self, channel, num_bytes):
+        if channel is not None and channel != self.selected_channel:
+            # PCA9546A channel select write
+            self.mux_selects += 1
+            self.selected_channel = channel
+            self.clock.advance(3*9/self.FREQUENCY)
+        self.transactions += 1
+        self.clock.advance((num_bytes + 2)*9/self.FREQUENCY)
+
+
+class Display:
+
+    WIDTH = 160
+    HEIGHT = 128
+
+    # Time to push a full frame over SPI (s)
+    REFRESH_TIME = WIDTH*HEIGHT*16/24.0e6
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.width = self.WIDTH
+        self.height = self.HEIGHT
+        self.brightness = 1.0
+        self.auto_refresh = True
+        self._root_group = None
+        self.root_group_sets = 0
+        self.root_group_changes = 0
+        self.refreshes = 0
+
+    @property
+    def root_group(self):
+        return self._root_group
+
+    @root_group.setter
+    def root_group(self, group):
+        self.root_group_sets += 1
+        if group is not self._root_group:
+            self.root_group_changes += 1
+        self._root_group = group
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        self.refreshes += 1
+        self.clock.advance(self.REFRESH_TIME)
+        return True
+
+
+class KeyEvent:
+
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __eq__(self, other):
+        return (self.key_number, self.pressed) == (other.key_number, other.pressed)
+
+    def __repr__(self):
+        state = 'pressed' if self.pressed else 'released'
+        return f'<Event: key_number {self.key_number} {state}>'
+
+
+class KeyScript:
+
+    # Scripted key presses, delivered through keypad.EventQueue once simulated
+    # time reaches them.
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.pending = []
+        self.delivered = 0
+
+    def press(self, key_number, at, hold=0.05):
+        self.pending.append((at, key_number, True))
+        self.pending.append((at + hold, key_number, False))
+        self.pending.sort()
+
+    def get(self):
+        if self.pending and self.pending[0][0] <= self.clock.now:
+            at, key_number, pressed = self.pending.pop(0)
+            self.delivered += 1
+            return KeyEvent(key_number, pressed, int(at*1000))
+        return None
+
+    def __len__(self):
+        now = self.clock.now
+        return sum(1 for item in self.pending if item[0] <= now)
+
+
+class SerialPort:
+
+    # USB CDC data channel. By default the host side is a pair of in-memory
+    # buffers; with use_pty=True it is a pseudo terminal whose slave end,
+    # device_path, can be opened by a real host program. The device writes to
+    # the pty master without blocking so a host which isn't reading applies
+    # back pressure once the kernel buffer is full.
+
+    # Device side transmit buffer for the in-memory port (bytes)
+    OUT_BUFFER_SIZE = 1024
+
+    def __init__(self, clock, use_pty=False):
+        self.clock = clock
+        self.timeout = 1.0
+        self.write_timeout = None
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.host_connected = True
+        self.master_fd = None
+        self.slave_fd = None
+        self.device_path = None
+        self.to_host = bytearray()
+        self.from_host = bytearray()
+        if use_pty:
+            import os
+            import tty
+            self.master_fd, self.slave_fd = os.openpty()
+            tty.setraw(self.master_fd)
+            tty.setraw(self.slave_fd)
+            os.set_blocking(self.master_fd, False)
+            self.device_path = os.ttyname(self.slave_fd)
+
+    def close(self):
+        import os
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    # Device side, as usb_cdc.Serial
+
+    @property
+    def connected(self):
+        return self.host_connected
+
+    @property
+    def in_waiting(self):
+        self._poll()
+        return len(self.from_host)
+
+    @property
+    def out_waiting(self):
+        return len(self.to_host) if self.master_fd is None else 0
+
+    def write(self, buf):
+        buf = bytes(buf)
+        if self.master_fd is not None:
+            import os
+            try:
+                num = os.write(self.master_fd, buf)
+            except BlockingIOError:
+                num = 0
+        else:
+            space = self.OUT_BUFFER_SIZE - len(self.to_host)
+            num = max(min(space, len(buf)), 0)
+            self.to_host.extend(buf[:num])
+        self.bytes_written += num
+        return num
+
+    def read(self, size=1):
+        self._poll()
+        data = bytes(self.from_host[:size])
+        del self.from_host[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buf):
+        data = self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._poll()
+        self.from_host.clear()
+
+    def reset_output_buffer(self):
+        self.to_host.clear()
+
+    def _poll(self):
+        if self.master_fd is not None:
+            import os
+            try:
+                self.from_host.extend(os.read(self.master_fd, 4096))
+            except (BlockingIOError, OSError):
+                pass
+
+    # Host side of the in-memory port
+
+    def host_read(self, size=None):
+        size = len(self.to_host) if size is None else size
+        data = bytes(self.to_host[:size])
+        del self.to_host[:size]
+        return data
+
+    def host_write(self, data):
+        self.from_host.extend(data)
+
+
+class Battery:
+
+    def __init__(self, clock, voltage=3.9):
+        # voltage may be a number or a function of simulated time
+        self.clock = clock
+        self.voltage = voltage
+
+    @property
+    def ain_value(self):
+        voltage = self.voltage(self.clock.now) if callable(self.voltage) else self.voltage
+        # Battery is read through a 1/2 divider on a 3.3V 16 bit input
+        return min(int(65536*voltage/(2.0*3.3)), 65535)
+
+
+class Stats(collections.Counter):
+    pass
@@ -0,0 +1,76 @@
+# Stand-in for adafruit_bitmap_font. Glyph metrics are a fixed cell derived
+# from the point size in the font file name, loaded glyphs are tracked.
+import os
+import re
+import sim
+
+
+class Glyph:
+
+    def __init__(self, width, height, shift_x):
+        self._bitmap = None
+        self.tile_index = 0
+        self.width = width
+        self.height = height
+        self.dx = 0
+        self.dy = 0
+        self.shift_x = shift_x
+        self.shift_y = 0
+
+    @property
+    def bitmap(self):
+        # Made on first use, a box outline stands in for the glyph's pixels
+        if self._bitmap is None:
+            import displayio
+            self._bitmap = displayio.Bitmap(self.width, self.height, 2)
+            for x in range(self.width):
+                self._bitmap[x, 0] = self._bitmap[x, self.height - 1] = 1
+            for y in range(self.height):
+                self._bitmap[0, y] = self._bitmap[self.width - 1, y] = 1
+        return self._bitmap
+
+
+class BuiltinFont:
+
+    def __init__(self, cell=(6, 12)):
+        self.cell = cell
+        self.glyphs = {}
+
+    def get_bounding_box(self):
+        return self.cell[0], self.cell[1], 0, 0
+
+    def load_glyphs(self, code_points):
+        if isinstance(code_points, int):
+            code_points = (code_points,)
+        elif isinstance(code_points, str):
+            code_points = [ord(c) for c in code_points]
+        for code_point in code_points:
+            if code_point not in self.glyphs:
+                self.glyphs[code_point] = Glyph(self.cell[0], self.cell[1], self.cell[0])
+                try:
+                    sim.current().stats['glyphs_loaded'] += 1
+                except RuntimeError:
+                    pass
+
+    def get_glyph(self, code_point):
+        self.load_glyphs(code_point)
+        return self.glyphs[code_point]
+
+
+class PCFFont(BuiltinFont):
+
+    def __init__(self, filename):
+        match = re.search(r'(\d+)\.pcf$', filename)
+        size = int(match.group(1)) if match else 10
+        super().__init__(cell=(int(0.8*size), int(1.3*size)))
+        self.filename = filename
+        self.ascent = int(1.0*size)
+        self.descent = self.cell[1] - self.ascent
+
+
+def load_font(filename, bitmap=None):
+    # Absolute paths are relative to the simulated CIRCUITPY root
+    path = filename.lstrip('/')
+    if not os.path.exists(path):
+        raise OSError(2, 'No such file/directory', filename)
+    return PCFFont(filename)
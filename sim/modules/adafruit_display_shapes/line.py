@@ -0,0 +1,10 @@
+# Stand-in for adafruit_display_shapes.line
+import displayio
+
+
+class Line(displayio.Group):
+
+    def __init__(self, x0, y0, x1, y1, color):
+        super().__init__(x=min(x0, x1), y=min(y0, y1))
+        self.points = (x0, y0, x1, y1)
+        self.color = color
@@ -0,0 +1,23 @@
+# Stand-in for adafruit_display_text
+
+
+def wrap_text_to_lines(string, max_chars):
+    lines = []
+    for paragraph in string.split('\n'):
+        line = ''
+        for word in paragraph.split(' '):
+            while len(word) > max_chars:
+                if line:
+                    lines.append(line)
+                    line = ''
+                lines.append(word[:max_chars - 1] + '-')
+                word = word[max_chars - 1:]
+            if not line:
+                line = word
+            elif len(line) + 1 + len(word) <= max_chars:
+                line = f'{line} {word}'
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+    return lines
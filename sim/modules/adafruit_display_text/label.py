@@ -0,0 +1,57 @@
+# Stand-in for adafruit_display_text.label. Every text/color assignment is
+# counted since on the device each one re-lays out glyphs and dirties the area.
+import sim
+import displayio
+
+
+class Label(displayio.Group):
+
+    def __init__(self, font, *, text='', color=0xFFFFFF, background_color=None,
+            scale=1, anchor_point=None, anchored_position=None, padding_top=0,
+            padding_bottom=0, padding_left=0, padding_right=0, **kwargs):
+        super().__init__(scale=scale)
+        self.font = font
+        self._text = text
+        self._color = color
+        self._background_color = background_color
+        self.anchor_point = anchor_point
+        self.anchored_position = anchored_position
+        self.padding_right = padding_right
+        font.load_glyphs(text)
+        sim.current().stats['labels_created'] += 1
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, new_text):
+        stats = sim.current().stats
+        stats['label_text_sets'] += 1
+        if new_text != self._text:
+            stats['label_text_changes'] += 1
+        self.font.load_glyphs(new_text)
+        self._text = new_text
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, new_color):
+        sim.current().stats['label_color_sets'] += 1
+        self._color = new_color
+
+    @property
+    def background_color(self):
+        return self._background_color
+
+    @background_color.setter
+    def background_color(self, new_color):
+        sim.current().stats['label_color_sets'] += 1
+        self._background_color = new_color
+
+    @property
+    def bounding_box(self):
+        width, height = self.font.get_bounding_box()[:2]
+        return 0, -height//2, width*len(self._text), height
@@ -0,0 +1,2 @@
+# Stand-in for adafruit_itertools
+from itertools import *
@@ -0,0 +1,43 @@
+# Stand-in for adafruit_tca9548a, channels route transactions to the simulated bus
+
+
+class TCA9548A_Channel:
+
+    def __init__(self, tca, channel):
+        self.tca = tca
+        self.channel = channel
+        self.bus = tca.i2c.bus
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+    def scan(self):
+        return sorted(address for (channel, address) in self.bus.devices if channel == self.channel)
+
+
+class TCA9548A:
+
+    NUM_CHANNELS = 8
+
+    def __init__(self, i2c, address=0x70):
+        self.i2c = i2c
+        self.address = address
+        self.channels = [None]*self.NUM_CHANNELS
+
+    def __len__(self):
+        return self.NUM_CHANNELS
+
+    def __getitem__(self, key):
+        if not 0 <= key < self.NUM_CHANNELS:
+            raise IndexError('Channel must be an integer in the range: 0-{}.'.format(self.NUM_CHANNELS - 1))
+        if self.channels[key] is None:
+            self.channels[key] = TCA9548A_Channel(self, key)
+        return self.channels[key]
+
+
+class PCA9546A(TCA9548A):
+
+    NUM_CHANNELS = 4
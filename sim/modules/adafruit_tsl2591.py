@@ -0,0 +1,133 @@
+# Stand-in for adafruit_tsl2591, register access goes to the simulated TSL2591Model
+
+GAIN_LOW = 0x00
+GAIN_MED = 0x10
+GAIN_HIGH = 0x20
+GAIN_MAX = 0x30
+INTEGRATIONTIME_100MS = 0x00
+INTEGRATIONTIME_200MS = 0x01
+INTEGRATIONTIME_300MS = 0x02
+INTEGRATIONTIME_400MS = 0x03
+INTEGRATIONTIME_500MS = 0x04
+INTEGRATIONTIME_600MS = 0x05
+
+_TSL2591_ADDR = 0x29
+_TSL2591_ENABLE_POWEROFF = 0x00
+_TSL2591_ENABLE_POWERON = 0x01
+_TSL2591_ENABLE_AEN = 0x02
+_TSL2591_ENABLE_AIEN = 0x10
+_TSL2591_ENABLE_NPIEN = 0x80
+_TSL2591_REGISTER_ENABLE = 0x00
+_TSL2591_REGISTER_CONTROL = 0x01
+_TSL2591_REGISTER_DEVICE_ID = 0x12
+_TSL2591_REGISTER_CHAN0_LOW = 0x14
+_TSL2591_REGISTER_CHAN1_LOW = 0x16
+_TSL2591_LUX_DF = 408.0
+_TSL2591_LUX_COEFB = 1.64
+_TSL2591_LUX_COEFC = 0.59
+_TSL2591_LUX_COEFD = 0.86
+_TSL2591_MAX_COUNT_100MS = 36863
+_TSL2591_MAX_COUNT = 65535
+
+
+class TSL2591:
+
+    def __init__(self, i2c, address=_TSL2591_ADDR):
+        self._bus = i2c.bus
+        self._channel = i2c.channel
+        self._model = self._bus.device(self._channel, address)
+        self._integration_time = 0
+        self._gain = 0
+        if self._read_u8(_TSL2591_REGISTER_DEVICE_ID) != 0x50:
+            raise RuntimeError('Failed to find TSL2591, check wiring!')
+        self.gain = GAIN_MED
+        self.integration_time = INTEGRATIONTIME_100MS
+        self.enable()
+
+    def _read_u8(self, address):
+        self._bus.transaction(self._channel, 2)
+        return self._model.read_u8(address)
+
+    def _read_u16LE(self, address):
+        self._bus.transaction(self._channel, 3)
+        return self._model.read_u16(address)
+
+    def _write_u8(self, address, val):
+        self._bus.transaction(self._channel, 2)
+        self._model.write_u8(address, val & 0xFF)
+
+    def enable(self):
+        self._write_u8(
+            _TSL2591_REGISTER_ENABLE,
+            _TSL2591_ENABLE_POWERON
+            | _TSL2591_ENABLE_AEN
+            | _TSL2591_ENABLE_AIEN
+            | _TSL2591_ENABLE_NPIEN,
+        )
+
+    def disable(self):
+        self._write_u8(_TSL2591_REGISTER_ENABLE, _TSL2591_ENABLE_POWEROFF)
+
+    @property
+    def gain(self):
+        control = self._read_u8(_TSL2591_REGISTER_CONTROL)
+        return control & 0b00110000
+
+    @gain.setter
+    def gain(self, val):
+        control = self._read_u8(_TSL2591_REGISTER_CONTROL)
+        control &= 0b11001111
+        control |= val
+        self._write_u8(_TSL2591_REGISTER_CONTROL, control)
+        self._gain = val
+
+    @property
+    def integration_time(self):
+        control = self._read_u8(_TSL2591_REGISTER_CONTROL)
+        return control & 0b00000111
+
+    @integration_time.setter
+    def integration_time(self, val):
+        control = self._read_u8(_TSL2591_REGISTER_CONTROL)
+        control &= 0b11111000
+        control |= val
+        self._write_u8(_TSL2591_REGISTER_CONTROL, control)
+        self._integration_time = val
+
+    @property
+    def raw_luminosity(self):
+        channel_0 = self._read_u16LE(_TSL2591_REGISTER_CHAN0_LOW)
+        channel_1 = self._read_u16LE(_TSL2591_REGISTER_CHAN1_LOW)
+        return (channel_0, channel_1)
+
+    @property
+    def full_spectrum(self):
+        channel_0, channel_1 = self.raw_luminosity
+        return (channel_1 << 16) | channel_0
+
+    @property
+    def infrared(self):
+        _, channel_1 = self.raw_luminosity
+        return channel_1
+
+    @property
+    def visible(self):
+        channel_0, channel_1 = self.raw_luminosity
+        full = (channel_1 << 16) | channel_0
+        return full - channel_1
+
+    @property
+    def lux(self):
+        channel_0, channel_1 = self.raw_luminosity
+        atime = 100.0 * self._integration_time + 100.0
+        if self._integration_time == INTEGRATIONTIME_100MS:
+            max_counts = _TSL2591_MAX_COUNT_100MS
+        else:
+            max_counts = _TSL2591_MAX_COUNT
+        if channel_0 >= max_counts or channel_1 >= max_counts:
+            raise RuntimeError('Overflow reading light channels!')
+        again = {GAIN_LOW: 1.0, GAIN_MED: 25.0, GAIN_HIGH: 428.0, GAIN_MAX: 9876.0}[self._gain]
+        cpl = (atime * again) / _TSL2591_LUX_DF
+        lux1 = (channel_0 - (_TSL2591_LUX_COEFB * channel_1)) / cpl
+        lux2 = ((_TSL2591_LUX_COEFC * channel_0) - (_TSL2591_LUX_COEFD * channel_1)) / cpl
+        return max(lux1, lux2)
@@ -0,0 +1,16 @@
+# Stand-in for analogio, only the battery monitor input is simulated
+import sim
+
+
+class AnalogIn:
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.reference_voltage = 3.3
+
+    @property
+    def value(self):
+        return sim.current().battery.ain_value
+
+    def deinit(self):
+        pass
@@ -0,0 +1,25 @@
+# Stand-in for the CircuitPython board module (Adafruit PyBadge layout)
+import sim
+
+
+class Pin:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f'board.{self.name}'
+
+
+SCL = Pin('SCL')
+SDA = Pin('SDA')
+A6 = Pin('A6')
+BUTTON_CLOCK = Pin('BUTTON_CLOCK')
+BUTTON_OUT = Pin('BUTTON_OUT')
+BUTTON_LATCH = Pin('BUTTON_LATCH')
+
+
+def __getattr__(name):
+    if name == 'DISPLAY':
+        return sim.current().display
+    raise AttributeError(f"module 'board' has no attribute '{name}'")
@@ -0,0 +1,25 @@
+# Stand-in for busio, I2C objects share the simulated bus
+import sim
+
+
+class I2C:
+
+    def __init__(self, scl, sda, *, frequency=100000, timeout=255):
+        self.bus = sim.current().i2c
+        self.channel = None
+        self._locked = False
+
+    def try_lock(self):
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def scan(self):
+        return sorted(address for (channel, address) in self.bus.devices if channel is None)
+
+    def deinit(self):
+        pass
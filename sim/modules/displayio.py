@@ -0,0 +1,169 @@
+# Stand-in for displayio. Objects keep their state so screens can be
+# inspected, and allocations/updates are counted in the simulation stats.
+import struct
+import sim
+
+
+def _count(name, n=1):
+    sim.current().stats[name] += n
+
+
+class Group:
+
+    def __init__(self, *, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._items = []
+        _count('groups_created')
+
+    def append(self, layer):
+        self._items.append(layer)
+
+    def insert(self, index, layer):
+        self._items.insert(index, layer)
+
+    def index(self, layer):
+        return self._items.index(layer)
+
+    def pop(self, i=-1):
+        return self._items.pop(i)
+
+    def remove(self, layer):
+        self._items.remove(layer)
+
+    def sort(self, key=None, reverse=False):
+        self._items.sort(key=key, reverse=reverse)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __setitem__(self, index, value):
+        self._items[index] = value
+
+    def __delitem__(self, index):
+        del self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, layer):
+        return layer in self._items
+
+
+class Bitmap:
+
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._data = bytearray(width*height) if value_count <= 256 else [0]*(width*height)
+        _count('bitmaps_created')
+        _count('bitmap_bytes', width*height)
+
+    def _index(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+            return y*self.width + x
+        return index
+
+    def __getitem__(self, index):
+        return self._data[self._index(index)]
+
+    def __setitem__(self, index, value):
+        self._data[self._index(index)] = value
+
+    def fill(self, value):
+        for i in range(len(self._data)):
+            self._data[i] = value
+
+    def dirty(self, x1=0, y1=0, x2=-1, y2=-1):
+        pass
+
+
+class Palette:
+
+    def __init__(self, color_count, *, dither=False):
+        self._colors = [0]*color_count
+        self._transparent = set()
+        _count('palettes_created')
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, value):
+        self._colors[index] = value
+
+    def make_transparent(self, index):
+        self._transparent.add(index)
+
+    def make_opaque(self, index):
+        self._transparent.discard(index)
+
+    def is_transparent(self, index):
+        return index in self._transparent
+
+
+class ColorConverter:
+
+    def __init__(self, *, input_colorspace=None, dither=False):
+        pass
+
+
+class TileGrid:
+
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1,
+            tile_width=None, tile_height=None, default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = bitmap.width if tile_width is None else tile_width
+        self.tile_height = bitmap.height if tile_height is None else tile_height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+        self._tiles = [default_tile]*(width*height)
+        _count('tile_grids_created')
+
+    def _index(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+            return y*self.width + x
+        return index
+
+    def __getitem__(self, index):
+        return self._tiles[self._index(index)]
+
+    def __setitem__(self, index, value):
+        index = self._index(index)
+        if self._tiles[index] != value:
+            self._tiles[index] = value
+            _count('tile_updates')
+
+
+class OnDiskBitmap:
+
+    def __init__(self, file):
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                header = f.read(26)
+        else:
+            header = file.read(26)
+        self.width, self.height = struct.unpack('<ii', header[18:26])
+        self.height = abs(self.height)
+        self.pixel_shader = ColorConverter()
+
+
+def release_displays():
+    pass
@@ -0,0 +1,47 @@
+# Stand-in for keypad, events come from the simulation's key script
+import sim
+from sim.hardware import KeyEvent as Event
+
+
+class EventQueue:
+
+    def __init__(self, keys):
+        self._keys = keys
+        self.overflowed = False
+
+    def get(self):
+        return self._keys.get()
+
+    def get_into(self, event):
+        new_event = self._keys.get()
+        if new_event is None:
+            return False
+        event.key_number = new_event.key_number
+        event.pressed = new_event.pressed
+        event.timestamp = new_event.timestamp
+        return True
+
+    def clear(self):
+        while self._keys.get() is not None:
+            continue
+        self.overflowed = False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class ShiftRegisterKeys:
+
+    def __init__(self, *, clock, data, latch, key_count, value_when_pressed,
+            value_to_latch=True, interval=0.02, max_events=64, debounce_threshold=1):
+        self.key_count = key_count
+        self.events = EventQueue(sim.current().keys)
+
+    def reset(self):
+        pass
+
+    def deinit(self):
+        pass
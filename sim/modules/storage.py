@@ -0,0 +1,7 @@
+# Stand-in for storage, the simulated drive is always writable; remount only
+# records whether code was given write access
+import sim
+
+
+def remount(mount_path, readonly=False, *, disable_concurrent_write_protection=False):
+    sim.current().storage_readonly = readonly
@@ -0,0 +1,4 @@
+# Stand-in for terminalio
+from adafruit_bitmap_font.bitmap_font import BuiltinFont
+
+FONT = BuiltinFont()
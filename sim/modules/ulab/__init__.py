@@ -0,0 +1,2 @@
+# Stand-in for ulab backed by numpy
+from . import numpy
@@ -0,0 +1,2 @@
+# Stand-in for ulab.numpy backed by numpy
+from numpy import *
@@ -0,0 +1,17 @@
+# Stand-in for usb_cdc, the data channel is the simulation's serial port once
+# enabled by boot.py
+import sim
+
+console = None
+
+
+def enable(*, console=True, data=False):
+    sim.current().usb_data_enabled = data
+    return True
+
+
+def __getattr__(name):
+    if name == 'data':
+        simulation = sim.current()
+        return simulation.serial if simulation.usb_data_enabled else None
+    raise AttributeError(f"module 'usb_cdc' has no attribute '{name}'")
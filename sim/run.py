@@ -0,0 +1,60 @@
+# Runs the unmodified firmware (code.py) on the host against simulated hardware
+#
+#   python -m sim.run --duration 30 --irradiance-90 50 --press 5.0:menu
+#
+import argparse
+import json
+
+from .simulation import Simulation
+
+
+def parse_press(text):
+    # time:key[:hold], key is a constants.BUTTON name or a key number
+    items = text.split(':')
+    if len(items) not in (2, 3):
+        raise argparse.ArgumentTypeError(f'bad key press {text}, expected time:key[:hold]')
+    at = float(items[0])
+    hold = float(items[2]) if len(items) == 3 else 0.05
+    return at, items[1], hold
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='run the firmware against simulated hardware')
+    parser.add_argument('--root', default=None,
+            help='directory standing in for CIRCUITPY, default is a temporary copy of the repo')
+    parser.add_argument('--configuration', default=None, help='configuration.json to use')
+    parser.add_argument('--calibrations', default=None, help='calibrations.json to use')
+    parser.add_argument('--duration', type=float, default=10.0, help='simulated run time (s)')
+    parser.add_argument('--irradiance-90', type=float, default=100.0, help='uW/cm^2 on 90 sensor')
+    parser.add_argument('--irradiance-180', type=float, default=1000.0, help='uW/cm^2 on 180 sensor')
+    parser.add_argument('--battery', type=float, default=3.9, help='battery voltage')
+    parser.add_argument('--noise', type=float, default=0.0, help='relative sensor noise')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cpu-scale', type=float, default=0.0,
+            help='add host cpu time scaled by this factor to simulated time')
+    parser.add_argument('--press', type=parse_press, action='append', default=[],
+            help='scripted key press time:key[:hold], may be repeated')
+    args = parser.parse_args(args)
+
+    simulation = Simulation(
+            root=args.root,
+            configuration=args.configuration,
+            calibrations=args.calibrations,
+            irradiance_90=args.irradiance_90,
+            irradiance_180=args.irradiance_180,
+            battery_voltage=args.battery,
+            noise=args.noise,
+            seed=args.seed,
+            cpu_scale=args.cpu_scale,
+            )
+    with simulation:
+        import constants
+        for at, key, hold in args.press:
+            key_number = int(key) if key.isdigit() else constants.BUTTON[key]
+            simulation.press(key_number, at, hold)
+        simulation.run_code(args.duration)
+    print(json.dumps(simulation.report(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
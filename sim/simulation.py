@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import glob
+import shutil
+import runpy
+import asyncio
+import tempfile
+
+from .clock import SimClock
+from .clock import SimulationStop
+from .hardware import I2CBus
+from .hardware import Display
+from .hardware import KeyScript
+from .hardware import Battery
+from .hardware import SerialPort
+from .hardware import Stats
+from .tsl2591_model import TSL2591Model
+from .event_loop import SimEventLoopPolicy
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modules')
+
+# PCA9546A channels the sensors are wired to
+SENSOR_90_CHANNEL = 1
+SENSOR_180_CHANNEL = 0
+
+_current = None
+
+
+def make_circuitpy(root, configuration=None, calibrations=None):
+    # Lays out root like the CIRCUITPY drive, see src/upload.bash
+    src_dir = os.path.join(root, 'src')
+    os.makedirs(src_dir, exist_ok=True)
+    for filename in glob.glob(os.path.join(REPO_ROOT, 'src', '*.py')):
+        if os.path.basename(filename) in ('code.py', 'boot.py'):
+            shutil.copy(filename, root)
+        else:
+            shutil.copy(filename, src_dir)
+    assets_dir = os.path.join(root, 'assets')
+    if not os.path.exists(assets_dir):
+        shutil.copytree(os.path.join(REPO_ROOT, 'assets'), assets_dir)
+    if configuration is not None:
+        shutil.copy(configuration, os.path.join(root, 'configuration.json'))
+    if calibrations is not None:
+        shutil.copy(calibrations, os.path.join(root, 'calibrations.json'))
+
+
+def current():
+    if _current is None:
+        raise RuntimeError('no simulation installed')
+    return _current
+
+
+class Simulation:
+
+    def __init__(self, root=None, irradiance_90=100.0, irradiance_180=1000.0,
+            battery_voltage=3.9, noise=0.0, seed=0, cpu_scale=0.0, sensors=(90, 180),
+            configuration=None, calibrations=None, usb_pty=False):
+        # root plays the part of the CIRCUITPY drive and is the working directory
+        # while installed. When not given a temporary one is populated from the
+        # repository with the optional configuration and calibrations files.
+        if root is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix='circuitpy_')
+            root = self._tmp_dir.name
+            make_circuitpy(root, configuration, calibrations)
+        else:
+            self._tmp_dir = None
+        self.root = os.path.abspath(root)
+        self.clock = SimClock(cpu_scale=cpu_scale)
+        self.i2c = I2CBus(self.clock)
+        self.display = Display(self.clock)
+        self.keys = KeyScript(self.clock)
+        self.battery = Battery(self.clock, battery_voltage)
+        self.serial = SerialPort(self.clock, use_pty=usb_pty)
+        self.usb_data_enabled = False
+        self.storage_readonly = True
+        self.stats = Stats()
+        self.sensor_90 = TSL2591Model(self.clock, irradiance_90, noise=noise, seed=seed)
+        self.sensor_180 = TSL2591Model(self.clock, irradiance_180, noise=noise, seed=seed + 1)
+        if 90 in sensors:
+            self.i2c.attach(SENSOR_90_CHANNEL, TSL2591Model.ADDRESS, self.sensor_90)
+        if 180 in sensors:
+            self.i2c.attach(SENSOR_180_CHANNEL, TSL2591Model.ADDRESS, self.sensor_180)
+        self._saved = None
+
+    def press(self, key_number, at, hold=0.05):
+        self.keys.press(key_number, at, hold)
+
+    def install(self):
+        global _current
+        if _current is not None:
+            raise RuntimeError('a simulation is already installed')
+        self._saved = (
+                list(sys.path),
+                os.getcwd(),
+                time.sleep,
+                time.monotonic,
+                time.monotonic_ns,
+                asyncio.get_event_loop_policy(),
+                )
+        sys.path.insert(0, MODULES_DIR)
+        src_dir = os.path.join(self.root, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(1, src_dir)
+        os.chdir(self.root)
+        time.sleep = self.clock.sleep
+        time.monotonic = self.clock.monotonic
+        time.monotonic_ns = self.clock.monotonic_ns
+        asyncio.set_event_loop_policy(SimEventLoopPolicy(self.clock))
+        _current = self
+
+    def uninstall(self):
+        global _current
+        if self._saved is None:
+            return
+        sys.path[:], cwd, time.sleep, time.monotonic, time.monotonic_ns, policy = self._saved
+        os.chdir(cwd)
+        asyncio.set_event_loop_policy(policy)
+        self._saved = None
+        _current = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+        return False
+
+    def run_boot(self):
+        # Runs boot.py, if there is one, as CircuitPython does before code.py
+        boot_file = os.path.join(self.root, 'boot.py')
+        if os.path.exists(boot_file):
+            self.run(runpy.run_path, 1.0, boot_file, run_name='__main__')
+
+    def run_code(self, duration):
+        # Runs boot.py and code.py, unmodified, until simulated time reaches duration seconds
+        self.run_boot()
+        return self.run(runpy.run_path, duration, os.path.join(self.root, 'code.py'), run_name='__main__')
+
+    def run(self, func, duration, *args, **kwargs):
+        # Runs func(*args, **kwargs) until it returns or simulated time reaches duration
+        installed = self._saved is not None
+        if not installed:
+            self.install()
+        self.clock.stop_time = self.clock.now + duration
+        try:
+            return func(*args, **kwargs)
+        except SimulationStop:
+            return None
+        finally:
+            self.clock.stop_time = None
+            if not installed:
+                self.uninstall()
+
+    def report(self):
+        report = {
+                'sim_time'           : self.clock.now,
+                'sleep_count'        : self.clock.sleep_count,
+                'sleep_time'         : self.clock.sleep_time,
+                'i2c_transactions'   : self.i2c.transactions,
+                'i2c_mux_selects'    : self.i2c.mux_selects,
+                'samples_read_90'    : self.sensor_90.samples_read,
+                'samples_read_180'   : self.sensor_180.samples_read,
+                'root_group_sets'    : self.display.root_group_sets,
+                'root_group_changes' : self.display.root_group_changes,
+                'display_refreshes'  : self.display.refreshes,
+                'key_events'         : self.keys.delivered,
+                'usb_bytes_written'  : self.serial.bytes_written,
+                'storage_readonly'   : self.storage_readonly,
+                }
+        report.update(self.stats)
+        return report
@@ -0,0 +1,126 @@
+import random
+
+
+class TSL2591Model:
+
+    # Register level model of the TSL2591. Once AEN is set the ADC integrates
+    # continuously, latching new channel data every integration period.
+
+    ADDRESS = 0x29
+    DEVICE_ID = 0x50
+
+    REGISTER_ENABLE = 0x00
+    REGISTER_CONTROL = 0x01
+    REGISTER_DEVICE_ID = 0x12
+    REGISTER_STATUS = 0x13
+    REGISTER_CHAN0_LOW = 0x14
+    REGISTER_CHAN1_LOW = 0x16
+
+    ENABLE_AEN = 0x02
+    STATUS_AVALID = 0x01
+
+    GAIN_MASK = 0x30
+    ITIME_MASK = 0x07
+
+    GAIN_TO_AGAIN = {0x00: 1.0, 0x10: 24.5, 0x20: 400.0, 0x30: 9200.0}
+
+    # Channel 0 counts per uW/cm^2 at 400x gain and 100ms integration
+    COUNTS_PER_IRRADIANCE = 264.1
+
+    MAX_COUNT_100MS = 36863
+    MAX_COUNT = 65535
+
+    def __init__(self, clock, irradiance=100.0, ir_fraction=0.1, noise=0.0, seed=0):
+        # irradiance (uW/cm^2) may be a number or a function of simulated time
+        self.clock = clock
+        self.irradiance = irradiance
+        self.ir_fraction = ir_fraction
+        self.noise = noise
+        self.random = random.Random(seed)
+        self.enable = 0x00
+        self.control = 0x00
+        self.aen_time = None
+        self.latched_cycle = None
+        self.channels = (0, 0)
+        self.conversions = 0
+        self.samples_read = 0
+        self.register_reads = 0
+        self.register_writes = 0
+
+    @property
+    def again(self):
+        return self.GAIN_TO_AGAIN[self.control & self.GAIN_MASK]
+
+    @property
+    def atime(self):
+        # Integration time in seconds
+        return (100.0*(self.control & self.ITIME_MASK) + 100.0)/1000.0
+
+    @property
+    def max_counts(self):
+        if self.control & self.ITIME_MASK == 0:
+            return self.MAX_COUNT_100MS
+        return self.MAX_COUNT
+
+    def irradiance_at(self, t):
+        if callable(self.irradiance):
+            return float(self.irradiance(t))
+        return float(self.irradiance)
+
+    @property
+    def completed_cycles(self):
+        if self.aen_time is None:
+            return 0
+        return int((self.clock.now - self.aen_time)/self.atime)
+
+    def latch(self):
+        cycle = self.completed_cycles
+        if cycle == 0 or cycle == self.latched_cycle:
+            return
+        # Light is sampled at the middle of the last completed integration window
+        t_mid = self.aen_time + (cycle - 0.5)*self.atime
+        counts_0 = self.irradiance_at(t_mid)*self.COUNTS_PER_IRRADIANCE
+        counts_0 *= (self.again/400.0)*(self.atime/0.1)
+        if self.noise > 0.0:
+            counts_0 += self.random.gauss(0.0, self.noise*max(counts_0, 1.0))
+        counts_1 = self.ir_fraction*counts_0
+        ceiling = self.max_counts
+        self.channels = tuple(min(max(int(c), 0), ceiling) for c in (counts_0, counts_1))
+        self.latched_cycle = cycle
+        self.conversions += 1
+
+    def read_u8(self, register):
+        self.register_reads += 1
+        self.latch()
+        if register == self.REGISTER_DEVICE_ID:
+            return self.DEVICE_ID
+        if register == self.REGISTER_ENABLE:
+            return self.enable
+        if register == self.REGISTER_CONTROL:
+            return self.control
+        if register == self.REGISTER_STATUS:
+            return self.STATUS_AVALID if self.completed_cycles > 0 else 0x00
+        if self.REGISTER_CHAN0_LOW <= register <= self.REGISTER_CHAN1_LOW + 1:
+            value = self.channels[(register - self.REGISTER_CHAN0_LOW)//2]
+            return (value >> 8) & 0xFF if register % 2 else value & 0xFF
+        return 0x00
+
+    def read_u16(self, register):
+        if register == self.REGISTER_CHAN0_LOW:
+            self.samples_read += 1
+        return self.read_u8(register) | (self.read_u8(register + 1) << 8)
+
+    def write_u8(self, register, value):
+        self.register_writes += 1
+        self.latch()
+        if register == self.REGISTER_ENABLE:
+            aen_was_set = bool(self.enable & self.ENABLE_AEN)
+            aen_is_set = bool(value & self.ENABLE_AEN)
+            if aen_is_set and not aen_was_set:
+                self.aen_time = self.clock.now
+                self.latched_cycle = None
+            elif aen_was_set and not aen_is_set:
+                self.aen_time = None
+            self.enable = value
+        elif register == self.REGISTER_CONTROL:
+            self.control = value
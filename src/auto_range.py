@@ -0,0 +1,66 @@
+import constants
+from light_sensor import LightSensorTSL2591
+
+
+class AutoRange:
+
+    # Step down when counts exceed this fraction of max_counts and step up
+    # when counts fall below the noise floor.
+    HIGH_FRACTION = 0.9
+    NOISE_FLOOR_COUNTS = 200
+
+    # Settings are chosen to bring counts to this fraction of the lowest
+    # max_counts (100ms) so the new setting is valid for every itime.
+    TARGET_COUNTS = 0.5*LightSensorTSL2591.TSL2591_MAX_COUNT_100MS
+
+    # The true count is unknown on overflow so reduce sensitivity by this factor
+    OVERFLOW_FACTOR = 16.0
+
+    def __init__(self):
+        # Table of (sensitivity, gain, itime) sorted by increasing sensitivity
+        # where sensitivity is again*atime.
+        self.table = []
+        for gain in constants.STR_TO_GAIN.values():
+            for itime in constants.STR_TO_INTEGRATION_TIME.values():
+                sensitivity = sensitivity_from_settings(gain, itime)
+                self.table.append((sensitivity, gain, itime))
+        self.table.sort()
+        self.num_steps = 0
+
+    def find_setting(self, sensitivity):
+        # Most sensitive setting not exceeding the requested sensitivity
+        setting = self.table[0]
+        for item in self.table:
+            if item[0] > sensitivity:
+                break
+            setting = item
+        return setting
+
+    def update(self, sensor):
+        # Called with each newly collected sample, steps the sensor's gain and
+        # integration time when the sample is saturated or in the noise floor.
+        counts = max(sensor.sample)
+        max_counts = sensor.sample_max_counts
+        sensitivity = sensitivity_from_settings(
+                sensor.sample_gain,
+                sensor.sample_integration_time,
+                )
+        if counts >= max_counts:
+            new_sensitivity = sensitivity/self.OVERFLOW_FACTOR
+        elif counts > self.HIGH_FRACTION*max_counts or counts < self.NOISE_FLOOR_COUNTS:
+            new_sensitivity = sensitivity*self.TARGET_COUNTS/max(counts, 1)
+        else:
+            return False
+        _, gain, itime = self.find_setting(new_sensitivity)
+        if (gain, itime) == (sensor.gain, sensor.integration_time):
+            return False
+        sensor.gain = gain
+        sensor.integration_time = itime
+        self.num_steps += 1
+        return True
+
+
+def sensitivity_from_settings(gain, itime):
+    again = LightSensorTSL2591.GAIN_TO_AGAIN[gain]
+    atime = 100.0*itime + 100.0
+    return again*atime
@@ -21,7 +21,7 @@ class BatteryMonitor:
             self.lowpass = LowpassFilter(
                     freq_cutoff = self.FREQ_CUTOFF, 
                     value = self.voltage_raw,  
-                    dt = constants.LOOP_DT
+                    dt = constants.BATTERY_DT
                     )
         else:
             # Update filter on new reading
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+from ulab import numpy as np
+import constants
+
+
+class BlankTable:
+
+    def __init__(self, filename=None, norm_cache=None):
+        # Dark count offsets, one per channel, keyed by sensor, gain and
+        # integration time. Settings which haven't been blanked use the
+        # blanked setting of the same sensor nearest in sensitivity, scaled.
+        # A new blank changes the offsets of every setting of its sensor, so
+        # the sensor's normalization samples in norm_cache, taken with the old
+        # offsets, are dropped.
+        self.filename = filename
+        self.norm_cache = norm_cache
+        self.entries = {}
+        self.lookup = {}
+        if self.filename is not None:
+            self.load()
+
+    def offset(self, sensor_name, gain, itime):
+        key = sensor_name, gain, itime
+        try:
+            return self.lookup[key]
+        except KeyError:
+            pass
+        offset = self.entries.get(key)
+        if offset is None:
+            offset = self.scaled_offset(sensor_name, gain, itime)
+        self.lookup[key] = offset
+        return offset
+
+    def scaled_offset(self, sensor_name, gain, itime):
+        nearest_offset = 0.0, 0.0
+        if not self.entries:
+            return nearest_offset
+        from auto_range import sensitivity_from_settings
+        sensitivity = sensitivity_from_settings(gain, itime)
+        nearest_distance = None
+        for (name, entry_gain, entry_itime), offset in self.entries.items():
+            if name != sensor_name:
+                continue
+            ratio = sensitivity/sensitivity_from_settings(entry_gain, entry_itime)
+            distance = max(ratio, 1.0/ratio)
+            if nearest_distance is None or distance < nearest_distance:
+                nearest_distance = distance
+                nearest_offset = tuple(ratio*v for v in offset)
+        return nearest_offset
+
+    def put(self, sensor_name, gain, itime, offset):
+        self.entries[sensor_name, gain, itime] = tuple(float(v) for v in offset)
+        self.lookup = {}
+        if self.norm_cache is not None:
+            self.norm_cache.drop_sensor(sensor_name)
+        if self.filename is not None:
+            self.save()
+
+    def clear(self):
+        if self.norm_cache is not None:
+            for sensor_name in set(k[0] for k in self.entries):
+                self.norm_cache.drop_sensor(sensor_name)
+        self.entries = {}
+        self.lookup = {}
+        if self.filename is not None:
+            self.save()
+
+    def load(self):
+        if self.filename not in os.listdir():
+            return
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in data:
+            key = item['sensor'], item['gain'], item['itime']
+            self.entries[key] = tuple(float(v) for v in item['offset'])
+
+    def save(self):
+        data = []
+        for (sensor_name, gain, itime), offset in self.entries.items():
+            data.append({
+                'sensor' : sensor_name,
+                'gain'   : gain,
+                'itime'  : itime,
+                'offset' : list(offset),
+                })
+        try:
+            with open(self.filename, 'w') as f:
+                json.dump(data, f)
+        except OSError:
+            # Filesystem is read-only while mounted over USB
+            pass
+
+
+class BlankCapture:
+
+    # Sleep between polls when capturing with wait() (s)
+    WAIT_POLL_DT = constants.BLANK_DT
+
+    def __init__(self, table, named_sensors, num=constants.NUM_BLANK_SAMPLES):
+        # Averages num samples of both channels from each (name, sensor) pair
+        # and stores them in the table under the settings they were taken with.
+        # Auto-ranging is suspended while capturing so the settings stay fixed.
+        self.table = table
+        self.named_sensors = named_sensors
+        self.num = num
+        self.samples = [np.zeros((num, 2)) for item in named_sensors]
+        self.count = 0
+        self.cycles = None
+        self.settings = None
+        self.auto_ranges = None
+
+    @property
+    def is_capturing(self):
+        return self.cycles is not None
+
+    @property
+    def progress(self):
+        if self.cycles is None:
+            return None
+        return self.count/self.num
+
+    def start(self):
+        self.count = 0
+        self.settings = None
+        self.cycles = [sensor.sample_count for (name, sensor) in self.named_sensors]
+        self.auto_ranges = []
+        for name, sensor in self.named_sensors:
+            self.auto_ranges.append(sensor.auto_range)
+            sensor.auto_range = None
+
+    def cancel(self):
+        if self.cycles is None:
+            return
+        self.cycles = None
+        for (name, sensor), auto_range in zip(self.named_sensors, self.auto_ranges):
+            sensor.auto_range = auto_range
+
+    def update(self):
+        # Non-blocking, returns True when the capture has completed
+        if self.cycles is None:
+            return False
+        sensors = [sensor for (name, sensor) in self.named_sensors]
+        cycles = [sensor.sample_count for sensor in sensors]
+        if False in [a != b for (a, b) in zip(cycles, self.cycles)]:
+            # Wait for a new sample from every sensor
+            return False
+        self.cycles = cycles
+        settings = [(s.sample_gain, s.sample_integration_time) for s in sensors]
+        if settings != self.settings:
+            # Settings changed under the capture, start over
+            self.settings = settings
+            self.count = 0
+        for sensor, samples in zip(sensors, self.samples):
+            samples[self.count, :] = np.array(sensor.sample)
+        self.count += 1
+        if self.count < self.num:
+            return False
+        for (name, sensor), (gain, itime), samples in zip(self.named_sensors, self.settings, self.samples):
+            self.table.put(name, gain, itime, np.mean(samples, axis=0))
+        self.cancel()
+        return True
+
+    def wait(self, pair):
+        # Blocking capture driven by the given LightSensorPair
+        self.start()
+        while not self.update():
+            pair.update()
+            time.sleep(self.WAIT_POLL_DT)
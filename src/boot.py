@@ -0,0 +1,36 @@
+# Enable the secondary USB CDC data channel used for telemetry and let the
+# firmware write to the CIRCUITPY drive, which the data logger, blank table,
+# normalization cache and settings cache need. The drive is then read-only to
+# the computer; hold the menu button while resetting to leave it writable by
+# the computer instead, e.g. to copy new firmware or edit configuration.json.
+# Changes here only take effect after a hard reset.
+import time
+import board
+import keypad
+import storage
+import usb_cdc
+
+# Menu button, see constants.BUTTON
+MENU_KEY_NUMBER = 3
+
+usb_cdc.enable(console=True, data=True)
+
+keys = keypad.ShiftRegisterKeys(
+        clock=board.BUTTON_CLOCK,
+        data=board.BUTTON_OUT,
+        latch=board.BUTTON_LATCH,
+        key_count=8,
+        value_when_pressed=True,
+        )
+# Keys already held are reported as pressed by the first scans
+time.sleep(0.05)
+menu_held = False
+event = keys.events.get()
+while event is not None:
+    if event.pressed and event.key_number == MENU_KEY_NUMBER:
+        menu_held = True
+    event = keys.events.get()
+keys.deinit()
+
+if not menu_held:
+    storage.remount('/', readonly=False)
@@ -0,0 +1,57 @@
+from adafruit_ticks import ticks_ms
+from adafruit_ticks import ticks_diff
+
+# Timestamped boot phase markers. Times are from when this module is first
+# imported, which code.py does before anything else, up to the first
+# measurement value shown on the display.
+
+
+class BootTimer:
+
+    def __init__(self):
+        self.start_ms = ticks_ms()
+        self.marks = []
+        self.done = False
+
+    def mark(self, phase):
+        # Records the end of phase, ignored once boot is done
+        if not self.done:
+            self.marks.append((phase, ticks_diff(ticks_ms(), self.start_ms)))
+
+    def finish(self, phase):
+        # Records the last phase, returns False if boot was already done
+        if self.done:
+            return False
+        self.mark(phase)
+        self.done = True
+        return True
+
+    @property
+    def elapsed_ms(self):
+        if not self.marks:
+            return 0
+        return self.marks[-1][1]
+
+    def report(self):
+        # One line per phase with the time since start and the phase duration
+        lines = []
+        prev_ms = 0
+        for phase, t_ms in self.marks:
+            lines.append(f'boot {t_ms:6d} ms  +{t_ms - prev_ms:5d} ms  {phase}')
+            prev_ms = t_ms
+        return lines
+
+
+boot_timer = BootTimer()
+
+
+def mark(phase):
+    boot_timer.mark(phase)
+
+
+def finish(phase):
+    return boot_timer.finish(phase)
+
+
+def report():
+    return boot_timer.report()
@@ -0,0 +1,153 @@
+import constants
+from ulab import numpy as np
+from json_settings_file import JsonSettingsFile
+
+class CalibrationsError(Exception):
+    pass
+
+class Calibrations(JsonSettingsFile):
+
+    FILE_TYPE = 'calibrations'
+    FILE_NAME = constants.CALIBRATIONS_FILE
+    LOAD_ERROR_EXCEPTION = CalibrationsError
+    ALLOWED_FIT_TYPES = ['polynomial']
+
+    def __init__(self):
+        super().__init__()
+        self.fits = {}
+
+    def check(self):
+        for name, calibration in self.data.items():
+            error_list = []
+
+            if type(calibration) != dict:
+                error_msg = f'{self.FILE_TYPE} {name} incorrect format'
+                self.error_dict[name] = [error_msg]
+                continue
+
+            # Check units
+            units = calibration.get('units', None)
+            if units is not None and type(units) != str:
+                error_msg = f'{name} units must be a string'
+                error_list.append(error_msg)
+
+            # Check fit type
+            try:
+                fit_type = calibration['fit_type']
+            except KeyError:
+                error_msg = f'{name} missing fit_type'
+                error_list.append(error_msg)
+            else:
+                if fit_type not in self.ALLOWED_FIT_TYPES:
+                    error_msg = f'{name} unknown fit_type {fit_type}'
+                    error_list.append(error_msg)
+
+            # Check fit coefficients
+            try:
+                fit_coef = calibration['fit_coef']
+            except KeyError:
+                error_msg = f'{name} missing fit_coef'
+                error_list.append(error_msg)
+            else:
+                if type(fit_coef) != list or not fit_coef:
+                    error_msg = f'{name} fit_coef must be a non-empty list'
+                    error_list.append(error_msg)
+                else:
+                    for coef in fit_coef:
+                        if type(coef) not in (int, float):
+                            error_msg = f'{name} fit_coef {coef} not a number'
+                            error_list.append(error_msg)
+
+            # Check range
+            try:
+                range_dict = calibration['range']
+            except KeyError:
+                error_msg = f'{name} missing range'
+                error_list.append(error_msg)
+            else:
+                if type(range_dict) != dict:
+                    error_msg = f'{name} range incorrect format'
+                    error_list.append(error_msg)
+                else:
+                    for range_key in ('min', 'max'):
+                        range_value = range_dict.get(range_key, None)
+                        if type(range_value) not in (int, float):
+                            error_msg = f'{name} range {range_key} missing or not a number'
+                            error_list.append(error_msg)
+
+            if error_list:
+                self.error_dict[name] = error_list
+
+        # Remove calibrations with errors
+        for name in self.error_dict:
+            del self.data[name]
+
+    @property
+    def names(self):
+        return list(self.data)
+
+    def units(self, name):
+        return self.data[name].get('units', None)
+
+    def led(self, name):
+        led = self.data[name].get('led', None)
+        if led is not None:
+            led = f'{led}'
+        return led
+
+    def fit(self, name):
+        # Compiled on first use, check() isn't run when loaded from the cache
+        try:
+            return self.fits[name]
+        except KeyError:
+            pass
+        calibration = self.data[name]
+        fit = PolynomialFit(
+                calibration['fit_coef'],
+                calibration['range']['min'],
+                calibration['range']['max'],
+                )
+        self.fits[name] = fit
+        return fit
+
+    def apply(self, name, input_value):
+        return self.fit(name).apply(input_value)
+
+    def apply_array(self, name, input_values):
+        return self.fit(name).apply_array(input_values)
+
+
+class PolynomialFit:
+
+    def __init__(self, fit_coef, range_min, range_max):
+        # Coefficients highest power first, as for numpy.polyval. Range
+        # bounds are on the input value.
+        self.coef = tuple(float(c) for c in fit_coef)
+        self.range_min = float(range_min)
+        self.range_max = float(range_max)
+
+    def in_range(self, input_value):
+        return self.range_min <= input_value <= self.range_max
+
+    def evaluate(self, input_value):
+        # Horner's method
+        output_value = 0.0
+        for c in self.coef:
+            output_value = output_value*input_value + c
+        return output_value
+
+    def apply(self, input_value):
+        if not self.in_range(input_value):
+            return constants.RANGE_ERROR_STR
+        return self.evaluate(input_value)
+
+    def apply_array(self, input_values):
+        # Evaluates a whole buffer of input values at once, values outside the
+        # range are nan in the output.
+        input_values = np.array(input_values)
+        output_values = np.zeros(input_values.shape)
+        for c in self.coef:
+            output_values = output_values*input_values + c
+        output_values = np.where(input_values < self.range_min, np.nan, output_values)
+        output_values = np.where(input_values > self.range_max, np.nan, output_values)
+        return output_values
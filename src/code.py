@@ -1,13 +1,25 @@
 import sys
 sys.path.append('src')
+import boot_timer
 from splash_screen import SplashScreen
 
 # Show splash screen and display while other stuff loads
 splash_screen = SplashScreen()
 splash_screen.show()
+boot_timer.mark('splash')
 
-# Import and start colorimeter
+# Load the fonts and the glyphs the UI uses in one batch while the splash is up
+import fonts
+import constants
+fonts.preload()
+if constants.DEBUG:
+    for line in fonts.memory_report():
+        print(line)
+boot_timer.mark('fonts')
+
+# Import and start colorimeter, the boot report is printed once the first
+# measurement value is on the display
 from colorimeter import Colorimeter 
+boot_timer.mark('import colorimeter')
 colorimeter = Colorimeter()
 colorimeter.run()
-
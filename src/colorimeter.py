@@ -1,29 +1,50 @@
 import gc
-import time
 import busio
 import board
 import analogio
 import digitalio
 import keypad
+import usb_cdc
 import constants
-import adafruit_itertools
 import adafruit_tca9548a
 
+import fonts
+import boot_timer
 import measurement
 from light_sensor import LightSensorTSL2591
+from light_sensor import LightSensorPair
 from light_sensor import LightSensorIOError
 
 from battery_monitor import BatteryMonitor
 from configuration import Configuration
 from configuration import ConfigurationError
-from menu_screen import MenuScreen
-from message_screen import MessageScreen
+from calibrations import Calibrations
+from calibrations import CalibrationsError
+from menu_model import MenuModel
+from scheduler import Scheduler
+from screen_pool import ScreenPool
+from display_manager import DisplayManager
+from norm_cache import NormCache
+from blank import BlankTable
+from blank import BlankCapture
+from key_repeat import KeyRepeat
 
 class Mode:
     MEASURE = 0
     MENU    = 1
     MESSAGE = 2
     ABORT   = 3
+    BLANK   = 4
+
+
+def next_setting(settings, current):
+    # Setting after current, wrapping round, so the buttons step on from
+    # wherever auto-ranging or a command left the sensor
+    try:
+        pos = settings.index(current)
+    except ValueError:
+        return settings[0]
+    return settings[(pos + 1) % len(settings)]
 
 
 class Colorimeter:
@@ -36,7 +57,14 @@ class Colorimeter:
             
     def __init__(self):
 
-        # Screens
+        # Set to MESSAGE or ABORT below if there is an error to show at boot
+        self._mode = None
+
+        # Screens, built once and reused. Only the startup screen is built
+        # during boot, the others once the first value is shown.
+        self.screen_pool = ScreenPool()
+        self.screens_to_preload = None
+        self.first_value_shown = False
         self.measurement_screen = None
         self.message_screen = None
         self.menu_screen = None
@@ -44,8 +72,7 @@ class Colorimeter:
 
         self.menu_items = list(self.DEFAULT_MEASUREMENTS)
         self.menu_items.append(constants.ABOUT_STR)
-        self.menu_view_pos = 0
-        self.menu_item_pos = 0
+        self.menu = None
 
         self.i2c = busio.I2C(board.SCL, board.SDA)
         self.i2c_mux = adafruit_tca9548a.PCA9546A(self.i2c)
@@ -57,6 +84,21 @@ class Colorimeter:
                 key_count=8, 
                 value_when_pressed=True,
                 )
+        self.pad_event = keypad.Event()
+
+        # Long-press auto-repeat for menu navigation and gain/itime cycling
+        self.key_repeat = KeyRepeat(
+                (
+                    constants.BUTTON['up'],
+                    constants.BUTTON['down'],
+                    constants.BUTTON['gain'],
+                    constants.BUTTON['itime'],
+                    ),
+                constants.LONG_PRESS_DT,
+                constants.REPEAT_DT,
+                constants.REPEAT_MIN_DT,
+                constants.REPEAT_ACCEL,
+                )
 
         # Load Configuration
         self.configuration = Configuration()
@@ -67,6 +109,35 @@ class Colorimeter:
             self.mode = Mode.MESSAGE
             self.message_screen.set_message(error)
             self.message_screen.set_to_error()
+        boot_timer.mark('configuration')
+
+        # Refresh the display only when the shown screen changes
+        self.display_manager = DisplayManager(
+                board.DISPLAY,
+                self.configuration.display_max_fps,
+                self.configuration.display_min_refresh_interval,
+                )
+
+        # Load calibrations and create a measurement for each of them
+        self.calibrations = Calibrations()
+        try:
+            self.calibrations.load()
+        except CalibrationsError as error:
+            # Unable to load calibrations file or not a dict after loading
+            self.mode = Mode.MESSAGE
+            self.message_screen.set_message(error)
+            self.message_screen.set_to_error()
+        for name in self.calibrations.names:
+            if name in self.menu_items:
+                continue
+            measurement.register(measurement.calibrated_measurement(
+                name,
+                self.calibrations.units(name),
+                self.calibrations.fit(name),
+                ))
+            self.menu_items.insert(-1, name)
+        self.preload_measurement_glyphs()
+        boot_timer.mark('calibrations')
 
         # Setup 90 degree light sensor 
         try:
@@ -81,6 +152,9 @@ class Colorimeter:
                 self.light_sensor_90.gain = self.configuration.gain_sensor_90
             if self.configuration.itime_sensor_90 is not None:
                 self.light_sensor_90.integration_time = self.configuration.itime_sensor_90
+            if self.configuration.auto_range_sensor_90:
+                from auto_range import AutoRange
+                self.light_sensor_90.auto_range = AutoRange()
 
         # Setup 180 degree light sensor 
         try:
@@ -95,8 +169,52 @@ class Colorimeter:
                 self.light_sensor_180.gain = self.configuration.gain_sensor_180
             if self.configuration.itime_sensor_180 is not None:
                 self.light_sensor_180.integration_time = self.configuration.itime_sensor_180
+            if self.configuration.auto_range_sensor_180:
+                from auto_range import AutoRange
+                self.light_sensor_180.auto_range = AutoRange()
 
         self.light_sensors = self.light_sensor_90, self.light_sensor_180
+        boot_timer.mark('sensors')
+
+        # Normalization samples outlive the measurement objects
+        if self.configuration.norm_cache_persist:
+            norm_cache_file = constants.NORM_CACHE_FILE
+        else:
+            norm_cache_file = None
+        self.norm_cache = NormCache(self.configuration.norm_cache_max_age, norm_cache_file)
+        self.light_sensor_pair = LightSensorPair(*self.light_sensors)
+
+        # Dark count offsets, shared by all measurements
+        self.blank_table = BlankTable(constants.BLANK_TABLE_FILE, self.norm_cache)
+        self.blank_capture = BlankCapture(
+                self.blank_table,
+                (
+                    ('sensor_90', self.light_sensor_90),
+                    ('sensor_180', self.light_sensor_180),
+                    ),
+                )
+
+        # Optional logging of each paired frame to flash
+        self.data_logger = None
+        self.log_stopped_shown = False
+        if self.configuration.data_logging:
+            from data_logger import DataLogger
+            self.data_logger = DataLogger()
+
+        # Stream every acquisition on the USB data channel when enabled in boot.py
+        # and accept commands from the host on the same channel
+        self.telemetry = None
+        self.command_interpreter = None
+        if usb_cdc.data is not None:
+            from telemetry import Telemetry
+            from command_interpreter import CommandInterpreter
+            self.telemetry = Telemetry(usb_cdc.data)
+            self.command_interpreter = CommandInterpreter(self, usb_cdc.data, self.telemetry)
+
+        boot_timer.mark('storage and usb')
+
+        # The number of menu rows is set when the menu screen is built
+        self.menu = MenuModel(self.menu_items)
 
         # Set default/startup measurement
         if self.configuration.startup in self.menu_items:
@@ -108,40 +226,37 @@ class Colorimeter:
                 self.message_screen.set_message(error_msg)
                 self.message_screen.set_to_error()
             measurement_name = self.menu_items[0] 
-        self.menu_item_pos = self.menu_items.index(measurement_name)
-        self.mode = Mode.MEASURE
+        self.menu.set_pos(self.menu_items.index(measurement_name))
+        # An error shown above stays on screen, calibrations which were
+        # dropped for errors are shown before measuring
+        if self._mode not in (Mode.MESSAGE, Mode.ABORT):
+            if not self.show_calibration_error():
+                self.mode = Mode.MEASURE
+        boot_timer.mark('startup measurement')
 
             
-        # Setup up battery monitoring settings cycles 
+        # Setup up battery monitoring and the settings stepped through by
+        # the gain and itime buttons
         self.battery_monitor = BatteryMonitor()
-        self.setup_gain_and_itime_cycles()
-
-
-    def setup_gain_and_itime_cycles(self):
-        self.gain_cycle_sensor_90 = adafruit_itertools.cycle(constants.GAIN_TO_STR) 
-        gain_config = self.configuration.gain_sensor_90
-        if gain_config is not None:
-            while next(self.gain_cycle_sensor_90) != gain_config: 
-                continue
-
-        self.itime_cycle_sensor_90 = adafruit_itertools.cycle(constants.INTEGRATION_TIME_TO_STR)
-        itime_config = self.configuration.itime_sensor_90
-        if itime_config is not None:
-            while next(self.itime_cycle_sensor_90) != itime_config:
-                continue
-
-        self.gain_cycle_sensor_180 = adafruit_itertools.cycle(constants.GAIN_TO_STR) 
-        gain_config = self.configuration.gain_sensor_180
-        if gain_config is not None:
-            while next(self.gain_cycle_sensor_180) != gain_config: 
-                continue
-
-        self.itime_cycle_sensor_180 = adafruit_itertools.cycle(constants.INTEGRATION_TIME_TO_STR)
-        itime_config = self.configuration.itime_sensor_180
-        if itime_config is not None:
-            while next(self.itime_cycle_sensor_180) != itime_config:
-                continue
-
+        self.gain_settings = tuple(constants.GAIN_TO_STR)
+        self.itime_settings = tuple(constants.INTEGRATION_TIME_TO_STR)
+        boot_timer.mark('colorimeter')
+
+
+    def preload_measurement_glyphs(self):
+        # Names, labels and units of the measurements, which depend on
+        # calibrations.json, are added to the glyphs preloaded by code.py
+        text = [constants.ABOUT_STR]
+        for name in self.menu_items[:-1]:
+            measurement_class = measurement.NAME_TO_MEASUREMENT[name]
+            text.append(name)
+            if type(measurement_class.LABEL) == str:
+                text.append(measurement_class.LABEL)
+            else:
+                text.extend(measurement_class.LABEL)
+            if measurement_class.UNITS is not None:
+                text.append(measurement_class.UNITS)
+        fonts.preload({'10pt': ''.join(text)})
 
     @property
     def mode(self):
@@ -149,95 +264,132 @@ class Colorimeter:
 
     @mode.setter
     def mode(self, new_mode):
-        self.delete_screens()
+        self.release_screens()
         if new_mode == Mode.MEASURE:
-            measurement_name = self.menu_items[self.menu_item_pos]
+            measurement_name = self.menu.item
             self.measurement = measurement.from_name(
                     measurement_name, 
                     self.light_sensors,
                     self.configuration,
+                    self.norm_cache,
+                    self.blank_table,
                     )
-            self.measurement_screen = self.measurement.create_screen()
+            self.measurement_screen = self.measurement.create_screen(self.screen_pool)
         elif new_mode in (Mode.MESSAGE, Mode.ABORT):
-            self.message_screen = MessageScreen()
+            import message_screen
+            self.message_screen = self.screen_pool.get(message_screen.MessageScreen)
+        elif new_mode == Mode.BLANK:
+            import message_screen
+            self.message_screen = self.screen_pool.get(message_screen.MessageScreen)
+            self.message_screen.set_header(constants.BLANK_HEADER_STR)
         elif new_mode == Mode.MENU:
-            self.menu_screen = MenuScreen()
-            self.menu_view_pos = 0
-            self.menu_item_pos = 0
+            import menu_screen
+            self.menu_screen = self.screen_pool.get(menu_screen.MenuScreen)
+            self.menu.set_num_rows(self.menu_screen.items_per_screen)
+            self.menu.reset()
             self.update_menu_screen()
         self._mode = new_mode
 
-    def delete_screens(self):
+    def housekeeping(self):
+        self.preload_screens()
+        gc.collect()
+
+    def preload_screens(self):
+        # Builds one of the screens which weren't needed at boot per call,
+        # starting once the first value is shown, so that later mode changes
+        # don't allocate
+        if not self.first_value_shown:
+            return
+        if self.screens_to_preload is None:
+            import message_screen
+            import menu_screen
+            self.screens_to_preload = [message_screen.MessageScreen, menu_screen.MenuScreen]
+            for name in self.menu_items[:-1]:
+                self.screens_to_preload.append(measurement.screen_class(name))
+        if self.screens_to_preload:
+            self.screen_pool.preload([self.screens_to_preload.pop(0)])
+
+    def on_first_value(self):
+        self.first_value_shown = True
+        if boot_timer.finish('first value'):
+            for line in boot_timer.report():
+                print(line)
+
+    def release_screens(self):
+        # Screens stay in the pool, nothing to collect
         self.measurement_screen = None 
         self.message_screen = None 
         self.menu_screen = None 
-        gc.collect()
     
 
-    @property
-    def num_menu_items(self):
-        return len(self.menu_items)
-
-    def incr_menu_item_pos(self):
-        if self.menu_item_pos < self.num_menu_items-1:
-            self.menu_item_pos += 1
-        diff_pos = self.menu_item_pos - self.menu_view_pos
-        if diff_pos > self.menu_screen.items_per_screen-1:
-            self.menu_view_pos += 1
-
-    def decr_menu_item_pos(self):
-        if self.menu_item_pos > 0:
-            self.menu_item_pos -= 1
-        if self.menu_item_pos < self.menu_view_pos:
-            self.menu_view_pos -= 1
-
     def update_menu_screen(self):
         if self.menu_screen is not None:
-            n0 = self.menu_view_pos
-            n1 = n0 + self.menu_screen.items_per_screen
-            view_items = []
-            for i, item in enumerate(self.menu_items[n0:n1]):
-                item_text = f'{n0+i} {item}' 
-                view_items.append(item_text)
-            self.menu_screen.set_menu_items(view_items)
-            pos = self.menu_item_pos - self.menu_view_pos
-            self.menu_screen.set_curr_item(pos)
+            self.menu_screen.set_menu(self.menu)
 
     def handle_button_events(self):
-        event = self.pad.events.get()
+        # Drain all pending events so presses are never applied late
+        while self.pad.events.get_into(self.pad_event):
+            if self.key_repeat.on_event(self.pad_event):
+                continue
+            self.dispatch_button_event(self.pad_event)
+
+        # Repeats for held keys are handled as key releases
+        for key_number in self.key_repeat.due():
+            self.dispatch_button_event(keypad.Event(key_number, False))
+
+    def dispatch_button_event(self, event):
         if self.mode == Mode.MEASURE:
             self.on_measure_mode_button(event)
         elif self.mode == Mode.MENU:
             self.on_menu_mode_button(event)
         elif self.mode == Mode.MESSAGE: 
             self.on_message_mode_button(event)
+        elif self.mode == Mode.BLANK:
+            self.on_blank_mode_button(event)
 
     def on_measure_mode_button(self, event): 
         if event is None or event.pressed:
             return
+        if self.measurement.is_capturing_norm:
+            # Any key cancels normalization capture
+            self.measurement.cancel_norm_sample()
+            return
         if event.key_number == constants.BUTTON['menu']:
             self.mode = Mode.MENU
-            self.menu_view_pos = 0
-            self.menu_item_pos = 0
-            self.update_menu_screen()
         elif event.key_number == constants.BUTTON['gain']: 
             if self.measurement_screen.has_selected_sensor:
                 if self.measurement_screen.selected_sensor == 0:
-                    self.light_sensor_90.gain = next(self.gain_cycle_sensor_90)
+                    self.light_sensor_90.auto_range = None
+                    self.light_sensor_90.gain = next_setting(self.gain_settings, self.light_sensor_90.gain)
                 if self.measurement_screen.selected_sensor == 1:
-                    self.light_sensor_180.gain = next(self.gain_cycle_sensor_180)
+                    self.light_sensor_180.auto_range = None
+                    self.light_sensor_180.gain = next_setting(self.gain_settings, self.light_sensor_180.gain)
         elif event.key_number == constants.BUTTON['itime']: 
             if self.measurement_screen.has_selected_sensor:
                 if self.measurement_screen.selected_sensor == 0:
-                    self.light_sensor_90.integration_time = next(self.itime_cycle_sensor_90)
+                    self.light_sensor_90.auto_range = None
+                    self.light_sensor_90.integration_time = next_setting(
+                            self.itime_settings,
+                            self.light_sensor_90.integration_time,
+                            )
                 if self.measurement_screen.selected_sensor == 1:
-                    self.light_sensor_180.integration_time = next(self.itime_cycle_sensor_180)
+                    self.light_sensor_180.auto_range = None
+                    self.light_sensor_180.integration_time = next_setting(
+                            self.itime_settings,
+                            self.light_sensor_180.integration_time,
+                            )
         elif event.key_number == constants.BUTTON['right']:
             if self.measurement_screen.has_selected_sensor:
                 if self.measurement_screen.has_selected_sensor:
                     self.measurement_screen.selected_sensor_next()
         elif event.key_number == constants.BUTTON['norm']:
-            self.measurement.update_norm_sample()
+            self.measurement.start_norm_sample()
+        elif event.key_number == constants.BUTTON['blank']:
+            if self.blank_capture.is_capturing:
+                # Blank requested over USB is still running
+                return
+            self.blank_capture.start()
+            self.mode = Mode.BLANK
 
     def on_menu_mode_button(self, event): 
         if event is None or event.pressed:
@@ -245,15 +397,20 @@ class Colorimeter:
         if event.key_number == constants.BUTTON['menu']: 
             self.mode = Mode.MEASURE
         elif event.key_number == constants.BUTTON['up']: 
-            self.decr_menu_item_pos()
+            self.menu.move(-1)
         elif event.key_number == constants.BUTTON['down']: 
-            self.incr_menu_item_pos()
+            self.menu.move(1)
+        elif event.key_number == constants.BUTTON['page_up']: 
+            self.menu.page_up()
+        elif event.key_number == constants.BUTTON['page_down']: 
+            self.menu.page_down()
+        elif event.key_number == constants.BUTTON['letter']: 
+            self.menu.jump_to_next_letter()
         elif event.key_number == constants.BUTTON['right']: 
-            selected_item = self.menu_items[self.menu_item_pos]
+            selected_item = self.menu.item
             if selected_item == constants.ABOUT_STR:
                 self.mode = Mode.MESSAGE
-                about_msg = f'firmware version {constants.__version__}'
-                self.message_screen.set_message(about_msg) 
+                self.message_screen.set_message(constants.FIRMWARE_VERSION_STR)
                 self.message_screen.set_to_about()
             else:
                 self.mode = Mode.MEASURE
@@ -263,26 +420,98 @@ class Colorimeter:
         if event is None or event.pressed:
             return
         if event.key_number == constants.BUTTON['menu']: 
-            self.mode = Mode.MENU
+            if not self.show_calibration_error():
+                self.mode = Mode.MENU
+
+    def show_calibration_error(self):
+        # Shows the next error in the calibrations file, if any, one per
+        # screen. Returns False once all have been shown.
+        if not self.calibrations.has_errors:
+            return False
+        self.mode = Mode.MESSAGE
+        self.message_screen.set_message(self.calibrations.pop_error())
+        self.message_screen.set_to_error()
+        return True
+
+    def on_blank_mode_button(self, event):
+        if event is None or event.pressed:
+            return
+        # Any key cancels the blank capture
+        self.blank_capture.cancel()
+        self.mode = Mode.MEASURE
 
-    def run(self):
-        while True:
+    def flush_log(self):
+        # Logging stops if the drive can't be written, e.g. when the menu
+        # button was held at reset, see boot.py. This is shown once, from
+        # the measure screen so that a blank capture isn't interrupted.
+        self.data_logger.flush()
+        if self.data_logger.enabled or self.log_stopped_shown:
+            return
+        if self.mode == Mode.MEASURE:
+            self.log_stopped_shown = True
+            self.mode = Mode.MESSAGE
+            self.message_screen.set_message(constants.LOG_STOPPED_STR)
+            self.message_screen.set_to_error()
 
-            # Deal with any button presses
-            self.handle_button_events()
+    def update_sensors(self):
+        # Collect paired light sensor conversions and let the current
+        # measurement make use of any new samples.
+        new_frame = self.light_sensor_pair.update()
+        if new_frame and self.telemetry is not None:
+            self.telemetry.send_acquisition(self.light_sensors, self.light_sensor_pair.frame_count)
+        if self.mode == Mode.MEASURE:
+            self.measurement.update()
+            if new_frame and self.data_logger is not None:
+                self.data_logger.log(
+                        self.light_sensors,
+                        self.measurement.value,
+                        self.battery_monitor.voltage_lowpass,
+                        )
+        elif self.mode == Mode.BLANK:
+            if self.blank_capture.update():
+                self.mode = Mode.MEASURE
+        if new_frame and self.command_interpreter is not None:
+            values = self.measurement.value if self.mode == Mode.MEASURE else None
+            self.command_interpreter.on_frame(values)
 
-            # Update display based on the current operating mode
-            if self.mode == Mode.MEASURE:
-                self.measurement_screen.update(self.measurement, self.battery_monitor)
-                self.measurement_screen.show()
+    def update_display(self):
+        # Update display based on the current operating mode
+        if self.mode == Mode.MEASURE:
+            if self.light_sensor_pair.frame_count == 0:
+                # No samples yet, the splash screen stays up until there are
+                return
+            self.measurement_screen.update(self.measurement, self.battery_monitor)
+            if self.display_manager.present(self.measurement_screen):
+                if not self.first_value_shown:
+                    self.on_first_value()
 
-            elif self.mode == Mode.MENU:
-                self.menu_screen.show()
+        elif self.mode == Mode.MENU:
+            self.display_manager.present(self.menu_screen)
 
-            elif self.mode in (Mode.MESSAGE, Mode.ABORT):
-                self.message_screen.show()
+        elif self.mode in (Mode.MESSAGE, Mode.ABORT):
+            self.display_manager.present(self.message_screen)
 
-            self.battery_monitor.update()
-            time.sleep(constants.LOOP_DT)
-            gc.collect()
+        elif self.mode == Mode.BLANK:
+            progress = int(100*self.blank_capture.progress)
+            blank_msg = constants.BLANK_PROGRESS_STR.format(progress)
+            self.message_screen.set_message(blank_msg, ok_to_continue=False)
+            self.display_manager.present(self.message_screen)
 
+    def run(self):
+        # Each subsystem runs as its own cooperative task with its own period
+        # so input latency and sampling are not tied to the display rate.
+        self.scheduler = Scheduler()
+        self.scheduler.add('buttons', self.handle_button_events, constants.BUTTON_DT)
+        self.scheduler.add('sensors', self.update_sensors, constants.SENSOR_DT)
+        self.scheduler.add('display', self.update_display, constants.DISPLAY_DT)
+        self.scheduler.add('battery', self.battery_monitor.update, constants.BATTERY_DT)
+        self.scheduler.add('housekeeping', self.housekeeping, constants.GC_DT)
+        if self.data_logger is not None:
+            self.scheduler.add('logger', self.flush_log, constants.LOG_DT)
+        if self.telemetry is not None:
+            self.scheduler.add('telemetry', self.telemetry.pump, constants.TELEMETRY_DT)
+        if self.norm_cache.filename is not None:
+            self.scheduler.add('norm_cache', self.norm_cache.update, self.norm_cache.save_interval)
+        if self.command_interpreter is not None:
+            self.scheduler.add('commands', self.command_interpreter.update, constants.COMMAND_DT)
+        self.scheduler.run()
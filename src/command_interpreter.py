@@ -0,0 +1,298 @@
+import struct
+import binascii
+import constants
+import telemetry
+from adafruit_ticks import ticks_ms
+from float_values import to_floats
+
+# Commands are frames (see telemetry.py) of type FRAME_TYPE_COMMAND with
+# payload opcode (u8) followed by the opcode's arguments. Each command gets one
+# FRAME_TYPE_RESPONSE frame with payload
+#
+#   command sequence number (u16), opcode (u8), status (u8), result
+#
+# Commands are run one at a time in the order received, so a host can send
+# several without waiting (pipelining) and match responses by sequence number.
+#
+#   OP_PING          -                          -
+#   OP_GET_SETTINGS  -                          gain, itime of each sensor (4 x u8)
+#   OP_SET_GAIN      sensor (u8), gain (u8)     -
+#   OP_SET_ITIME     sensor (u8), itime (u8)    -
+#   OP_ACQUIRE       count (u16)                count records, RECORD_FORMAT, count <= MAX_ACQUIRE
+#   OP_BLANK         -                          dark offsets ch0, ch1 of each sensor (4 x f32)
+#
+# Sensor 0 is the 90 degree sensor and 1 the 180 degree sensor. Gain and
+# integration time codes are those of adafruit_tsl2591. Setting the gain or
+# integration time turns off auto-ranging of that sensor. Acquisitions only
+# use frames taken with the current settings.
+
+FRAME_TYPE_COMMAND = 2
+FRAME_TYPE_RESPONSE = 3
+
+RESPONSE_HEADER_FORMAT = '<HBB'
+RESPONSE_HEADER_SIZE = struct.calcsize(RESPONSE_HEADER_FORMAT)
+
+OP_PING = 0
+OP_GET_SETTINGS = 1
+OP_SET_GAIN = 2
+OP_SET_ITIME = 3
+OP_ACQUIRE = 4
+OP_BLANK = 5
+
+STATUS_OK = 0
+STATUS_UNKNOWN_COMMAND = 1
+STATUS_BAD_ARGUMENT = 2
+STATUS_BUSY = 3
+
+# Argument format of each opcode
+OP_TO_ARGS_FORMAT = {
+        OP_PING: '',
+        OP_GET_SETTINGS: '',
+        OP_SET_GAIN: '<BB',
+        OP_SET_ITIME: '<BB',
+        OP_ACQUIRE: '<H',
+        OP_BLANK: '',
+        }
+
+# Acquisition record: ticks (ms), paired frame count, sensor 90 counts (ch0,
+# ch1), sensor 180 counts (ch0, ch1), measurement value 0, value 1
+RECORD_FORMAT = '<IIHHHHff'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+SETTINGS_FORMAT = '<BBBB'
+
+# The response is built in RAM and its payload size must fit the frame's u16
+# length field
+MAX_ACQUIRE = min(constants.MAX_ACQUIRE, (0xFFFF - RESPONSE_HEADER_SIZE)//RECORD_SIZE)
+BLANK_FORMAT = '<ffff'
+
+
+class CommandInterpreter:
+
+    def __init__(self, colorimeter, serial, link, buffer_size=constants.COMMAND_BUFFER_SIZE):
+        # Commands are read from serial without blocking and responses sent
+        # through link, the Telemetry instance for the same port. Commands
+        # which take time (acquire, blank) are advanced by on_frame() as new
+        # paired frames arrive.
+        self.colorimeter = colorimeter
+        self.serial = serial
+        self.serial.timeout = 0
+        self.link = link
+        self.rx_buffer = bytearray(buffer_size)
+        self.rx_view = memoryview(self.rx_buffer)
+        self.rx_count = 0
+        self.queue = []
+        self.active = None
+        self.commands_run = 0
+        self.frame_errors = 0
+
+    @property
+    def sensors(self):
+        return self.colorimeter.light_sensors
+
+    def update(self):
+        self.read()
+        while self.active is None and self.queue:
+            seq, payload = self.queue.pop(0)
+            self.run(seq, payload)
+
+    def read(self):
+        num = self.serial.in_waiting
+        if not num:
+            return
+        space = len(self.rx_buffer) - self.rx_count
+        if space == 0:
+            # Buffer full of junk, start over
+            self.frame_errors += 1
+            self.rx_count = 0
+            space = len(self.rx_buffer)
+        num = self.serial.readinto(self.rx_view[self.rx_count:self.rx_count + min(num, space)])
+        if num:
+            self.rx_count += num
+            self.parse()
+
+    def parse(self):
+        data = bytes(self.rx_view[:self.rx_count])
+        pos = 0
+        while True:
+            start = data.find(telemetry.FRAME_SYNC, pos)
+            if start < 0:
+                pos = max(self.rx_count - 1, pos)
+                break
+            pos = start
+            if self.rx_count - pos < telemetry.FRAME_HEADER_SIZE:
+                break
+            sync, frame_type, length, seq = struct.unpack_from(telemetry.FRAME_HEADER_FORMAT, data, pos)
+            frame_size = telemetry.FRAME_HEADER_SIZE + length + telemetry.FRAME_CRC_SIZE
+            if frame_size > len(self.rx_buffer):
+                self.frame_errors += 1
+                pos += 1
+                continue
+            if self.rx_count - pos < frame_size:
+                break
+            crc_pos = pos + telemetry.FRAME_HEADER_SIZE + length
+            crc, = struct.unpack_from(telemetry.FRAME_CRC_FORMAT, data, crc_pos)
+            if binascii.crc32(data[pos + len(telemetry.FRAME_SYNC):crc_pos]) & 0xffffffff != crc:
+                self.frame_errors += 1
+                pos += 1
+                continue
+            if frame_type == FRAME_TYPE_COMMAND:
+                self.queue.append((seq, data[pos + telemetry.FRAME_HEADER_SIZE:crc_pos]))
+            pos += frame_size
+        remaining = self.rx_count - pos
+        self.rx_view[:remaining] = self.rx_view[pos:self.rx_count]
+        self.rx_count = remaining
+
+    def respond(self, seq, opcode, status, result_format=None, *values):
+        result_size = 0 if result_format is None else struct.calcsize(result_format)
+        frame = telemetry.frame_buffer(RESPONSE_HEADER_SIZE + result_size)
+        struct.pack_into(RESPONSE_HEADER_FORMAT, frame, telemetry.FRAME_HEADER_SIZE, seq, opcode, status)
+        if result_format is not None:
+            struct.pack_into(result_format, frame, telemetry.FRAME_HEADER_SIZE + RESPONSE_HEADER_SIZE, *values)
+        self.link.send_block(FRAME_TYPE_RESPONSE, frame)
+        self.commands_run += 1
+
+    def run(self, seq, payload):
+        if not payload:
+            self.respond(seq, 0, STATUS_BAD_ARGUMENT)
+            return
+        opcode = payload[0]
+        try:
+            args_format = OP_TO_ARGS_FORMAT[opcode]
+        except KeyError:
+            self.respond(seq, opcode, STATUS_UNKNOWN_COMMAND)
+            return
+        if len(payload) - 1 != struct.calcsize(args_format):
+            self.respond(seq, opcode, STATUS_BAD_ARGUMENT)
+            return
+        args = struct.unpack_from(args_format, payload, 1) if args_format else ()
+        try:
+            if opcode == OP_PING:
+                self.respond(seq, opcode, STATUS_OK)
+            elif opcode == OP_GET_SETTINGS:
+                self.get_settings(seq)
+            elif opcode in (OP_SET_GAIN, OP_SET_ITIME):
+                self.set_setting(seq, opcode, *args)
+            elif opcode == OP_ACQUIRE:
+                self.start_acquire(seq, *args)
+            elif opcode == OP_BLANK:
+                self.start_blank(seq)
+        except (ValueError, IndexError):
+            self.respond(seq, opcode, STATUS_BAD_ARGUMENT)
+
+    def get_settings(self, seq):
+        sensor_90, sensor_180 = self.sensors
+        self.respond(
+                seq,
+                OP_GET_SETTINGS,
+                STATUS_OK,
+                SETTINGS_FORMAT,
+                sensor_90.gain,
+                sensor_90.integration_time,
+                sensor_180.gain,
+                sensor_180.integration_time,
+                )
+
+    def set_setting(self, seq, opcode, sensor_num, value):
+        sensor = self.sensors[sensor_num]
+        if opcode == OP_SET_GAIN:
+            if value not in constants.GAIN_TO_STR:
+                raise ValueError('unknown gain')
+            sensor.auto_range = None
+            sensor.gain = value
+        else:
+            if value not in constants.INTEGRATION_TIME_TO_STR:
+                raise ValueError('unknown integration time')
+            sensor.auto_range = None
+            sensor.integration_time = value
+        self.respond(seq, opcode, STATUS_OK)
+
+    def start_acquire(self, seq, count):
+        if count > MAX_ACQUIRE:
+            raise ValueError('too many records')
+        # Records are packed straight into the response frame as they arrive
+        frame = telemetry.frame_buffer(RESPONSE_HEADER_SIZE + count*RECORD_SIZE)
+        struct.pack_into(RESPONSE_HEADER_FORMAT, frame, telemetry.FRAME_HEADER_SIZE, seq, OP_ACQUIRE, STATUS_OK)
+        self.active = Acquire(seq, count, frame)
+        if count == 0:
+            self.finish()
+
+    def start_blank(self, seq):
+        blank_capture = self.colorimeter.blank_capture
+        if blank_capture.is_capturing:
+            self.respond(seq, OP_BLANK, STATUS_BUSY)
+            return
+        blank_capture.start()
+        self.active = Blank(seq)
+
+    def on_frame(self, values=None):
+        # Called for each new paired frame with the current measurement's
+        # value(s), None when no measurement is running
+        if self.active is None:
+            return
+        if self.active.opcode == OP_ACQUIRE:
+            self.update_acquire(values)
+        elif self.active.opcode == OP_BLANK:
+            self.update_blank()
+
+    def update_acquire(self, values):
+        for sensor in self.sensors:
+            settings = sensor.sample_gain, sensor.sample_integration_time
+            if settings != (sensor.gain, sensor.integration_time):
+                # Frame started before a settings change
+                return
+        acquire = self.active
+        sensor_90, sensor_180 = self.sensors
+        value_0, value_1 = to_floats(values)
+        pos = telemetry.FRAME_HEADER_SIZE + RESPONSE_HEADER_SIZE + acquire.num*RECORD_SIZE
+        struct.pack_into(
+                RECORD_FORMAT,
+                acquire.frame,
+                pos,
+                ticks_ms(),
+                self.colorimeter.light_sensor_pair.frame_count,
+                sensor_90.sample[0],
+                sensor_90.sample[1],
+                sensor_180.sample[0],
+                sensor_180.sample[1],
+                value_0,
+                value_1,
+                )
+        acquire.num += 1
+        if acquire.num == acquire.count:
+            self.finish()
+
+    def update_blank(self):
+        blank_capture = self.colorimeter.blank_capture
+        if not blank_capture.update():
+            return
+        offsets = []
+        for (name, sensor), (gain, itime) in zip(blank_capture.named_sensors, blank_capture.settings):
+            offsets.extend(self.colorimeter.blank_table.offset(name, gain, itime))
+        blank = self.active
+        self.active = None
+        self.respond(blank.seq, OP_BLANK, STATUS_OK, BLANK_FORMAT, *offsets)
+
+    def finish(self):
+        acquire = self.active
+        self.active = None
+        self.link.send_block(FRAME_TYPE_RESPONSE, acquire.frame)
+        self.commands_run += 1
+
+
+class Acquire:
+
+    opcode = OP_ACQUIRE
+
+    def __init__(self, seq, count, frame):
+        self.seq = seq
+        self.count = count
+        self.frame = frame
+        self.num = 0
+
+
+class Blank:
+
+    opcode = OP_BLANK
+
+    def __init__(self, seq):
+        self.seq = seq
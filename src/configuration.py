@@ -50,6 +50,49 @@ class Configuration(JsonSettingsFile):
                         error_msg = f'{self.FILE_TYPE} unknown integration time {itime_str}'
                         error_dict[itime_key] = error_msg
 
+            # Check auto range setting
+            auto_range_key = f'auto_range_{sensor_name}'
+            if auto_range_key in self.data:
+                if type(self.data[auto_range_key]) != bool:
+                    error_msg = f'{self.FILE_TYPE} {auto_range_key} must be true or false'
+                    self.error_dict[auto_range_key] = error_msg
+
+        # Check smoothing window
+        window_key = 'smoothing_window'
+        if window_key in self.data:
+            window = self.data[window_key]
+            if type(window) != int or window < 1:
+                error_msg = f'{self.FILE_TYPE} {window_key} must be an integer >= 1'
+                self.error_dict[window_key] = error_msg
+
+        # Check normalization cache settings
+        max_age_key = 'norm_cache_max_age'
+        if max_age_key in self.data:
+            max_age = self.data[max_age_key]
+            if type(max_age) not in (int, float) or max_age <= 0:
+                error_msg = f'{self.FILE_TYPE} {max_age_key} must be a number > 0'
+                self.error_dict[max_age_key] = error_msg
+        persist_key = 'norm_cache_persist'
+        if persist_key in self.data:
+            if type(self.data[persist_key]) != bool:
+                error_msg = f'{self.FILE_TYPE} {persist_key} must be true or false'
+                self.error_dict[persist_key] = error_msg
+
+        # Check data logging setting
+        logging_key = 'data_logging'
+        if logging_key in self.data:
+            if type(self.data[logging_key]) != bool:
+                error_msg = f'{self.FILE_TYPE} {logging_key} must be true or false'
+                self.error_dict[logging_key] = error_msg
+
+        # Check display refresh pacing
+        for key in ('display_max_fps', 'display_min_refresh_interval'):
+            if key in self.data:
+                value = self.data[key]
+                if type(value) not in (int, float) or value <= 0:
+                    error_msg = f'{self.FILE_TYPE} {key} must be a number > 0'
+                    self.error_dict[key] = error_msg
+
         # Check for reference irradiance value
         ref_key = 'ref_irradiance_180'
         if ref_key in self.data:
@@ -86,6 +129,9 @@ class Configuration(JsonSettingsFile):
             gain = constants.STR_TO_GAIN[gain_str]
         return gain
 
+    def auto_range(self, sensor_name):
+        return self.data.get(f'auto_range_{sensor_name}', False)
+
     @property
     def itime_sensor_90(self):
         return self.itime('sensor_90')
@@ -102,10 +148,45 @@ class Configuration(JsonSettingsFile):
     def gain_sensor_180(self):
         return self.gain('sensor_180')
 
+    @property
+    def auto_range_sensor_90(self):
+        return self.auto_range('sensor_90')
+
+    @property
+    def auto_range_sensor_180(self):
+        return self.auto_range('sensor_180')
+
     @property
     def startup(self):
         return self.data.get('startup', None)
 
+    @property
+    def smoothing_window(self):
+        window = self.data.get('smoothing_window', None)
+        if window is not None and window < 2:
+            window = None
+        return window
+
+    @property
+    def norm_cache_max_age(self):
+        return float(self.data.get('norm_cache_max_age', constants.NORM_CACHE_MAX_AGE))
+
+    @property
+    def norm_cache_persist(self):
+        return self.data.get('norm_cache_persist', False)
+
+    @property
+    def data_logging(self):
+        return self.data.get('data_logging', False)
+
+    @property
+    def display_max_fps(self):
+        return float(self.data.get('display_max_fps', constants.DISPLAY_MAX_FPS))
+
+    @property
+    def display_min_refresh_interval(self):
+        return float(self.data.get('display_min_refresh_interval', constants.DISPLAY_MIN_REFRESH_DT))
+
     @property
     def ref_irradiance_180(self):
         return float(self.data['ref_irradiance_180'])
@@ -6,19 +6,54 @@ __version__ = '0.1.1'
 
 CALIBRATIONS_FILE = 'calibrations.json'
 CONFIGURATION_FILE = 'configuration.json'
+NORM_CACHE_FILE = 'norm_cache.json'
+BLANK_TABLE_FILE = 'blanks.json'
+LOG_DIRECTORY = 'logs'
 SPLASHSCREEN_BMP = 'assets/splashscreen.bmp'
 
-LOOP_DT = 0.1
+# Print diagnostics, e.g. the memory used by the fonts, to the serial console
+DEBUG = False
+
+# Task periods (s)
+BUTTON_DT = 0.02
+SENSOR_DT = 0.02
+DISPLAY_DT = 0.1
+BATTERY_DT = 0.1
+GC_DT = 1.0
+LOG_DT = 0.5
+TELEMETRY_DT = 0.02
+COMMAND_DT = 0.02
+
 BLANK_DT = 0.05
+DISPLAY_MIN_REFRESH_DT = 0.05
 DEBOUNCE_DT = 0.6 
+LONG_PRESS_DT = 0.5
+REPEAT_DT = 0.2
+REPEAT_MIN_DT = 0.04
+REPEAT_ACCEL = 0.8
 NUM_BLANK_SAMPLES = 50 
 BATTERY_AIN_PIN = board.A6
 
 DEFAULT_REF_IRRADIANCE_180 = 1000.0
 NUM_SAMPLE_180 = 10
+NORM_STABLE_COUNT = 3
+NORM_TOLERANCE = 0.005
+NORM_CACHE_MAX_AGE = 1800.0
+NORM_CACHE_SAVE_DT = 60.0
+
+LOG_BLOCK_SIZE = 4096
+LOG_MAX_FILE_SIZE = 1048576
+LOG_MAX_FILES = 8
+
+TELEMETRY_BUFFER_SIZE = 512
+COMMAND_BUFFER_SIZE = 256
+# Most records in one acquire response, 24 bytes each, held in RAM until sent
+MAX_ACQUIRE = 256
+DISPLAY_MAX_FPS = 10
 
 BUTTON = { 
         'left'  : 7,
+        'blank' : 7,
         'up'    : 6, 
         'down'  : 5, 
         'right' : 4, 
@@ -26,6 +61,10 @@ BUTTON = {
         'norm'  : 2, 
         'itime' : 1, 
         'gain'  : 0, 
+        # Menu mode only, on keys which are otherwise used in measure mode
+        'letter'    : 2,
+        'page_down' : 1,
+        'page_up'   : 0,
         }
 
 COLOR_TO_RGB = collections.OrderedDict([ 
@@ -57,6 +96,59 @@ STR_TO_INTEGRATION_TIME = collections.OrderedDict([
 INTEGRATION_TIME_TO_STR = {v:k for k,v in STR_TO_INTEGRATION_TIME.items()}
 
 OVERFLOW_STR = 'OVFL'
+RANGE_ERROR_STR = 'range err'
 ABOUT_STR = 'About'
+LOG_STOPPED_STR = 'logging stopped, drive read-only'
 MU_STR = '\u03BC'
 CM2_STR = 'cm\u00B2'
+
+# Screen headers, shown in the 14pt font
+MENU_HEADER_STR = 'Menu'
+MESSAGE_HEADER_STR = 'MESSAGE'
+ERROR_HEADER_STR = 'Error'
+ABORT_HEADER_STR = 'Abort'
+ABOUT_HEADER_STR = ABOUT_STR
+BLANK_HEADER_STR = 'Blank'
+HEADER_STRS = (
+        MENU_HEADER_STR,
+        MESSAGE_HEADER_STR,
+        ERROR_HEADER_STR,
+        ABORT_HEADER_STR,
+        ABOUT_HEADER_STR,
+        BLANK_HEADER_STR,
+        )
+
+# Messages, shown in the 10pt font
+CONTINUE_STR = 'Press any key to continue.'
+FIRMWARE_VERSION_STR = f'firmware version {__version__}'
+BLANK_PROGRESS_STR = 'capturing dark counts {}%, cover the sample holder'
+
+# Fixed text drawn in the 10pt font: value readouts, the settings, noise,
+# normalization and battery lines of the measure screens, and messages
+SCREEN_STRS = (
+        ' 0123456789.-+_*|%',
+        OVERFLOW_STR,
+        RANGE_ERROR_STR,
+        'nan',
+        '___.__',
+        'gain=' + ''.join(STR_TO_GAIN),
+        'time=' + ''.join(STR_TO_INTEGRATION_TIME),
+        'noise',
+        'normalizing',
+        'battery V',
+        MU_STR + 'W/' + CM2_STR,
+        CONTINUE_STR,
+        FIRMWARE_VERSION_STR,
+        BLANK_PROGRESS_STR.format(''),
+        LOG_STOPPED_STR,
+        )
+
+# Glyphs loaded in one batch at startup, per font. The 10pt font is used for
+# values, units, settings, messages and menu items, the 14pt font only for
+# headers. The glyphs of the measurement names and units, which depend on
+# calibrations.json, are added once it has been loaded; those of error
+# messages are loaded when first shown.
+FONT_PRELOAD_CHARS = {
+        '10pt': ''.join(SCREEN_STRS),
+        '14pt': ''.join(HEADER_STRS),
+        }
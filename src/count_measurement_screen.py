@@ -1,9 +1,13 @@
-import board
 import displayio
 import constants
 import fonts
 import adafruit_itertools
 from adafruit_display_text import label
+from render_layer import RenderLayer
+from numeric_readout import NumericReadout
+from screen_pool import COLOR_TO_INDEX
+from screen_pool import shared_palette
+from screen_pool import background_bitmap
 
 
 class CountMeasurementScreen:
@@ -12,6 +16,7 @@ class CountMeasurementScreen:
     ANCHOR_POINT = (0.0, 0.5)
 
     HEADER_TO_GAIN_SPACING = 22
+    NOISE_SPACING = 15
 
     HEADER1_LABEL_X_POSITION = 5 
     HEADER1_LABEL_Y_POSITION = 12 
@@ -37,9 +42,17 @@ class CountMeasurementScreen:
     ITIME2_LABEL_X_POSITION = 80 
     ITIME2_LABEL_Y_POSITION = GAIN2_LABEL_Y_POSITION
 
+    NOISE1_LABEL_X_POSITION = HEADER1_LABEL_X_POSITION
+    NOISE1_LABEL_Y_POSITION = GAIN1_LABEL_Y_POSITION + NOISE_SPACING
+
+    NOISE2_LABEL_X_POSITION = HEADER1_LABEL_X_POSITION
+    NOISE2_LABEL_Y_POSITION = GAIN2_LABEL_Y_POSITION + NOISE_SPACING
+
     BATTERY_LABEL_X_POSITION = 30      
     BATTERY_LABEL_Y_POSITION = 114
 
+    VALUE_NUM_CHARS = 8
+
     SENSOR_INDICES = [0,1]
 
 
@@ -48,19 +61,13 @@ class CountMeasurementScreen:
         self.selected_sensor = None  
         self.setup_selected_sensor_cycle()
 
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
-
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
+        # Only labels whose text or color changed are touched on update
+        self.render_layer = RenderLayer()
+
+        # Palette and background bitmap are shared by all screens
+        self.color_to_index = COLOR_TO_INDEX
+        self.palette = shared_palette()
+        self.bitmap = background_bitmap()
         self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
         font_scale = 1
 
@@ -68,7 +75,7 @@ class CountMeasurementScreen:
         header1_str = 'header1'
         text_color = constants.COLOR_TO_RGB['white']
         self.header1_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = header1_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -79,27 +86,20 @@ class CountMeasurementScreen:
                 self.HEADER1_LABEL_Y_POSITION,
                 )
 
-        # Create value1 text label
-        dummy_value = 0.0
-        value_str = f'{dummy_value:1.2f}'.replace('0','O')
-        text_color = constants.COLOR_TO_RGB['white']
-        self.value1_label = label.Label(
-                fonts.font_10pt, 
-                text = value_str, 
-                color = text_color, 
-                scale = font_scale,
-                anchor_point = self.ANCHOR_POINT,
-                )
-        self.value1_label.anchored_position = (
-                self.VALUE1_LABEL_X_POSITION,
-                self.VALUE1_LABEL_Y_POSITION, 
+        # Create value1 readout
+        self.value1_readout = NumericReadout(
+                fonts.font_10pt(),
+                self.VALUE_NUM_CHARS,
+                constants.COLOR_TO_RGB['white'],
+                (self.VALUE1_LABEL_X_POSITION, self.VALUE1_LABEL_Y_POSITION),
+                render_layer = self.render_layer,
                 )
 
         # Create text label for gain1 information
         gain_str = 'gain xxx' 
         text_color = constants.COLOR_TO_RGB['orange']
         self.gain1_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text=gain_str, 
                 color=text_color, 
                 scale=font_scale,
@@ -114,7 +114,7 @@ class CountMeasurementScreen:
         itime_str = 'time xxxms' 
         text_color = constants.COLOR_TO_RGB['orange']
         self.itime1_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text=itime_str, 
                 color=text_color, 
                 scale=font_scale,
@@ -129,7 +129,7 @@ class CountMeasurementScreen:
         header2_str = 'header2'
         text_color = constants.COLOR_TO_RGB['white']
         self.header2_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = header2_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -140,27 +140,20 @@ class CountMeasurementScreen:
                 self.HEADER2_LABEL_Y_POSITION,
                 )
 
-        # Create value2 text label
-        dummy_value = 0.0
-        value_str = f'{dummy_value:1.2f}'.replace('0','O')
-        text_color = constants.COLOR_TO_RGB['white']
-        self.value2_label = label.Label(
-                fonts.font_10pt, 
-                text = value_str, 
-                color = text_color, 
-                scale = font_scale,
-                anchor_point = self.ANCHOR_POINT,
-                )
-        self.value2_label.anchored_position = (
-                self.VALUE2_LABEL_X_POSITION, 
-                self.VALUE2_LABEL_Y_POSITION,
+        # Create value2 readout
+        self.value2_readout = NumericReadout(
+                fonts.font_10pt(),
+                self.VALUE_NUM_CHARS,
+                constants.COLOR_TO_RGB['white'],
+                (self.VALUE2_LABEL_X_POSITION, self.VALUE2_LABEL_Y_POSITION),
+                render_layer = self.render_layer,
                 )
 
         # Create text label for gain 2 information
         gain_str = 'gain xxx' 
         text_color = constants.COLOR_TO_RGB['orange']
         self.gain2_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text=gain_str, 
                 color=text_color, 
                 scale=font_scale,
@@ -175,7 +168,7 @@ class CountMeasurementScreen:
         itime_str = 'time xxxms' 
         text_color = constants.COLOR_TO_RGB['orange']
         self.itime2_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text=itime_str, 
                 color=text_color, 
                 scale=font_scale,
@@ -186,12 +179,42 @@ class CountMeasurementScreen:
                 self.ITIME2_LABEL_Y_POSITION,
                 )
 
+        # Create text label for noise1 information, shown when smoothing
+        noise_str = ' '
+        text_color = constants.COLOR_TO_RGB['gray']
+        self.noise1_label = label.Label(
+                fonts.font_10pt(), 
+                text = noise_str, 
+                color = text_color, 
+                scale = font_scale,
+                anchor_point = self.ANCHOR_POINT,
+                )
+        self.noise1_label.anchored_position = (
+                self.NOISE1_LABEL_X_POSITION,
+                self.NOISE1_LABEL_Y_POSITION,
+                )
+
+        # Create text label for noise2 information, shown when smoothing
+        noise_str = ' '
+        text_color = constants.COLOR_TO_RGB['gray']
+        self.noise2_label = label.Label(
+                fonts.font_10pt(), 
+                text = noise_str, 
+                color = text_color, 
+                scale = font_scale,
+                anchor_point = self.ANCHOR_POINT,
+                )
+        self.noise2_label.anchored_position = (
+                self.NOISE2_LABEL_X_POSITION,
+                self.NOISE2_LABEL_Y_POSITION,
+                )
+
         # Create integration time/window text label
         #bat_str = 'battery 100%'
         bat_str = 'battery 0.0V'
         text_color = constants.COLOR_TO_RGB['gray']
         self.bat_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = bat_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -206,22 +229,28 @@ class CountMeasurementScreen:
         self.group = displayio.Group()
         self.group.append(self.tile_grid)
         self.group.append(self.header1_label)
-        self.group.append(self.value1_label)
+        self.group.append(self.value1_readout.tile_grid)
         self.group.append(self.gain1_label)
         self.group.append(self.itime1_label)
         self.group.append(self.header2_label)
-        self.group.append(self.value2_label)
+        self.group.append(self.value2_readout.tile_grid)
         self.group.append(self.gain2_label)
         self.group.append(self.itime2_label)
+        self.group.append(self.noise1_label)
+        self.group.append(self.noise2_label)
         self.group.append(self.bat_label)
 
         self.header_labels = (self.header1_label, self.header2_label)
-        self.value_labels = (self.value1_label, self.value2_label)
+        self.value_readouts = (self.value1_readout, self.value2_readout)
 
     @property
     def has_selected_sensor(self):
         return True
 
+    def reset(self):
+        self.selected_sensor = None
+        self.setup_selected_sensor_cycle()
+
     def setup_selected_sensor_cycle(self):
         select_sensor_values = [None] + self.SENSOR_INDICES
         self.selected_sensor_cycle = adafruit_itertools.cycle(select_sensor_values)
@@ -237,56 +266,54 @@ class CountMeasurementScreen:
                 measurement.label, 
                 measurement.value, 
                 self.header_labels, 
-                self.value_labels,
+                self.value_readouts,
                 )
-        for index, name, value, header_label, value_label in zip(*measurement_items):
+        for index, name, value, header_label, value_readout in zip(*measurement_items):
             if index == self.selected_sensor:
                 mark = '|'
             else:
                 mark = ' '
-            header_label.text = f'{mark}{name}'
-            if measurement.units is None:
-                if type(value) == float:
-                    value_text = f'{value:1.2f}'
-                else: 
-                    value_text = f'{value}'
-            else:
-                if type(value) == float:
-                    value_text = f'{value:1.2f} {measurement.units}'
-                else: 
-                    value_text = f'{value} {measurement.units}'
-            value_label.text = value_text.replace('0','O')
+            self.render_layer.set_text(header_label, f'{mark}{name}')
+            value_readout.set_value(value, 2, measurement.units)
             if value == constants.OVERFLOW_STR:
                 color = constants.COLOR_TO_RGB['red']
             else:
                 color = constants.COLOR_TO_RGB['white']
-            value_label.color = color
+            value_readout.set_color(color)
 
     def set_gain(self,values):
         labels = (self.gain1_label, self.gain2_label)
         for value, label in zip(values, labels):
             if value is not None:
                 value_str = constants.GAIN_TO_STR[value]
-                label.text = f'gain={value_str}'
+                self.render_layer.set_text(label, f'gain={value_str}')
             else:
-                label.text = ''
+                self.render_layer.set_text(label, '')
 
     def set_integration_time(self,values):
         labels = (self.itime1_label, self.itime2_label)
         for value, label in zip(values, labels):
             if value is not None:
                 value_str = constants.INTEGRATION_TIME_TO_STR[value]
-                label.text = f'time={value_str}'
+                self.render_layer.set_text(label, f'time={value_str}')
             else:
-                label.text = ''
+                self.render_layer.set_text(label, '')
 
-    def set_bat(self, value):
-        self.bat_label.text = f'battery {value:1.1f}V'
+    def set_noise(self, values):
+        labels = (self.noise1_label, self.noise2_label)
+        if values is None:
+            values = (None, None)
+        for value, label in zip(values, labels):
+            if value is not None:
+                self.render_layer.set_text(label, f'noise {100*value:1.2f}%')
+            else:
+                self.render_layer.set_text(label, ' ')
 
-    def show(self):
-        board.DISPLAY.root_group = self.group
+    def set_bat(self, value):
+        self.render_layer.set_text(self.bat_label, f'battery {value:1.1f}V')
 
     def update(self, measurement, battery_monitor): 
+        self.render_layer.begin_frame()
         self.set_measurement(measurement)
         self.set_gain((
             measurement.sensor_90.gain, 
@@ -296,5 +323,6 @@ class CountMeasurementScreen:
             measurement.sensor_90.integration_time, 
             measurement.sensor_180.integration_time,
             ))
+        self.set_noise(measurement.noise)
         self.set_bat(battery_monitor.voltage_lowpass)
 
@@ -0,0 +1,137 @@
+import os
+import struct
+import constants
+from adafruit_ticks import ticks_ms
+from float_values import to_floats
+
+# Log files are a fixed size header followed by fixed size records
+#
+#   header  magic, version, record size, file sequence number, reserved
+#   record  ticks (ms), sensor 90 counts (ch0, ch1), sensor 180 counts
+#           (ch0, ch1), sensor 90 gain, itime, sensor 180 gain, itime,
+#           value 0, value 1, battery voltage
+#
+# Values which aren't available, e.g. overflow or a measurement with a single
+# value, are logged as nan. tools/log_reader.py reads these files on the host.
+
+LOG_MAGIC = b'CLOG'
+LOG_VERSION = 1
+HEADER_FORMAT = '<4sHHII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_FORMAT = '<IHHHHBBBBfff'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+
+class DataLogger:
+
+    def __init__(self,
+            directory=constants.LOG_DIRECTORY,
+            block_size=constants.LOG_BLOCK_SIZE,
+            max_file_size=constants.LOG_MAX_FILE_SIZE,
+            max_files=constants.LOG_MAX_FILES,
+            ):
+        # Records are packed into one of two RAM buffers. When a buffer fills
+        # it is handed over for writing by flush(), which runs as its own task,
+        # and packing carries on in the other buffer so logging a record never
+        # waits on the flash.
+        self.directory = directory
+        self.records_per_block = max(block_size//RECORD_SIZE, 1)
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.buffers = [bytearray(self.records_per_block*RECORD_SIZE) for i in range(2)]
+        self.active = 0
+        self.count = 0
+        self.pending = None
+        self.file_num = None
+        self.file_size = 0
+        self.enabled = True
+        self.records_logged = 0
+        self.records_dropped = 0
+        self.blocks_written = 0
+
+    def log(self, sensors, values, battery_voltage):
+        if not self.enabled:
+            return
+        sensor_90, sensor_180 = sensors
+        value_0, value_1 = to_floats(values)
+        struct.pack_into(
+                RECORD_FORMAT,
+                self.buffers[self.active],
+                self.count*RECORD_SIZE,
+                ticks_ms(),
+                sensor_90.sample[0],
+                sensor_90.sample[1],
+                sensor_180.sample[0],
+                sensor_180.sample[1],
+                sensor_90.sample_gain,
+                sensor_90.sample_integration_time,
+                sensor_180.sample_gain,
+                sensor_180.sample_integration_time,
+                value_0,
+                value_1,
+                battery_voltage,
+                )
+        self.count += 1
+        self.records_logged += 1
+        if self.count == self.records_per_block:
+            if self.pending is not None:
+                # Previous block not written yet, drop this one
+                self.records_dropped += self.count
+            else:
+                self.pending = self.active
+                self.active = 1 - self.active
+            self.count = 0
+
+    def flush(self, partial=False):
+        # Writes the pending block, with partial=True also any records waiting
+        # in the active buffer, e.g. before shutting down.
+        if not self.enabled:
+            return
+        if self.pending is not None:
+            self.write(memoryview(self.buffers[self.pending]))
+            self.pending = None
+        if partial and self.count:
+            self.write(memoryview(self.buffers[self.active])[:self.count*RECORD_SIZE])
+            self.count = 0
+
+    def write(self, block):
+        try:
+            if self.file_num is None or self.file_size + len(block) > self.max_file_size:
+                self.next_file()
+            with open(self.file_name(self.file_num), 'ab') as f:
+                f.write(block)
+        except OSError:
+            # Filesystem is read-only while mounted over USB, stop logging
+            self.enabled = False
+            return
+        self.file_size += len(block)
+        self.blocks_written += 1
+
+    def file_name(self, num):
+        return f'{self.directory}/log_{num:04d}.bin'
+
+    def log_numbers(self):
+        nums = []
+        for name in os.listdir(self.directory):
+            if name.startswith('log_') and name.endswith('.bin'):
+                try:
+                    nums.append(int(name[4:-4]))
+                except ValueError:
+                    pass
+        nums.sort()
+        return nums
+
+    def next_file(self):
+        if self.directory not in os.listdir():
+            os.mkdir(self.directory)
+        nums = self.log_numbers()
+        if self.file_num is None:
+            self.file_num = nums[-1] + 1 if nums else 0
+        else:
+            self.file_num += 1
+        nums.append(self.file_num)
+        while len(nums) > self.max_files:
+            os.remove(self.file_name(nums.pop(0)))
+        with open(self.file_name(self.file_num), 'wb') as f:
+            f.write(struct.pack(HEADER_FORMAT, LOG_MAGIC, LOG_VERSION, RECORD_SIZE, self.file_num, 0))
+        self.file_size = HEADER_SIZE
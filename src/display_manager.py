@@ -0,0 +1,43 @@
+import constants
+from adafruit_ticks import ticks_ms
+from adafruit_ticks import ticks_add
+from adafruit_ticks import ticks_diff
+
+
+class DisplayManager:
+
+    def __init__(self, display, max_fps=constants.DISPLAY_MAX_FPS, min_interval=constants.DISPLAY_MIN_REFRESH_DT):
+        # Refreshes the display by hand, only when the shown screen reports a
+        # change and no sooner than the frame period (the longer of 1/max_fps
+        # and min_interval) after the previous refresh. A change arriving
+        # within the frame period is held back until the next present().
+        self.display = display
+        self.display.auto_refresh = False
+        self.period_ms = int(1000*max(1.0/max_fps, min_interval))
+        self.next_refresh_ms = ticks_ms()
+        self.pending = True
+        self.refresh_count = 0
+        self.deferred_count = 0
+        self.idle_count = 0
+
+    def present(self, screen):
+        # screen needs a group and a render_layer
+        if self.display.root_group is not screen.group:
+            self.display.root_group = screen.group
+            self.pending = True
+        if screen.render_layer.take_dirty():
+            self.pending = True
+        if not self.pending:
+            self.idle_count += 1
+            return False
+        now_ms = ticks_ms()
+        if ticks_diff(now_ms, self.next_refresh_ms) < 0:
+            self.deferred_count += 1
+            return False
+        # Pacing is done here, a target frame rate would let displayio skip
+        # this refresh and nothing would redraw the change
+        self.display.refresh(target_frames_per_second=None)
+        self.pending = False
+        self.refresh_count += 1
+        self.next_refresh_ms = ticks_add(now_ms, self.period_ms)
+        return True
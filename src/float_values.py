@@ -0,0 +1,15 @@
+# Measurement values as fixed size float records, shared by the data logger
+# and the command interpreter so neither has to import the other
+
+NAN = float('nan')
+
+
+def to_floats(values):
+    # Measurement value(s) as two floats, nan where there isn't one
+    if type(values) not in (tuple, list):
+        values = (values,)
+    floats = [NAN, NAN]
+    for i, value in enumerate(values[:2]):
+        if type(value) in (int, float):
+            floats[i] = value
+    return floats
@@ -1,5 +1,107 @@
+import gc
+import constants
 from adafruit_bitmap_font import bitmap_font
 
+# Fonts are loaded on first use. The glyphs the UI needs are loaded in one
+# batch by preload(), while the splash screen is up, rather than one at a time
+# the first time a label shows each character in the middle of a frame.
+
 fontname = 'Hack-Bold'
-font_14pt = bitmap_font.load_font(f'/assets/{fontname}-14.pcf')
-font_10pt = bitmap_font.load_font(f'/assets/{fontname}-10.pcf')
+
+FONT_FILES = {
+        '10pt': f'/assets/{fontname}-10.pcf',
+        '14pt': f'/assets/{fontname}-14.pcf',
+        }
+
+
+def heap_used():
+    # gc.mem_alloc is only available on the device
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        return None
+
+
+class FontManager:
+
+    def __init__(self, font_files=FONT_FILES):
+        self.font_files = font_files
+        self.fonts = {}
+        # Heap used by load_font and by the batch glyph load, per font (bytes)
+        self.load_bytes = {}
+        self.preload_bytes = {}
+        self.preload_chars = {}
+
+    def get(self, name):
+        try:
+            return self.fonts[name]
+        except KeyError:
+            pass
+        heap_before = heap_used()
+        font = bitmap_font.load_font(self.font_files[name])
+        if heap_before is not None:
+            self.load_bytes[name] = heap_used() - heap_before
+        self.fonts[name] = font
+        return font
+
+    def preload(self, name_to_chars=constants.FONT_PRELOAD_CHARS):
+        # Loads each font and the glyphs for its characters in one batch.
+        # Can be called again to add characters, those already preloaded are
+        # skipped.
+        for name, chars in name_to_chars.items():
+            loaded_chars = self.preload_chars.get(name, '')
+            chars = ''.join(sorted(set(chars) - set(loaded_chars)))
+            font = self.get(name)
+            if not chars:
+                continue
+            heap_before = heap_used()
+            font.load_glyphs(chars)
+            if heap_before is not None:
+                self.preload_bytes[name] = self.preload_bytes.get(name, 0) + heap_used() - heap_before
+            self.preload_chars[name] = loaded_chars + chars
+
+    def glyph_bytes(self, name):
+        # Returns the number of preloaded glyphs and the size of their bitmaps,
+        # one bit per pixel with rows padded to 32 bits as in displayio.Bitmap
+        font = self.fonts[name]
+        num_glyphs = 0
+        num_bytes = 0
+        for c in self.preload_chars.get(name, ''):
+            glyph = font.get_glyph(ord(c))
+            if glyph is None:
+                continue
+            num_glyphs += 1
+            num_bytes += 4*glyph.height*((glyph.width + 31)//32)
+        return num_glyphs, num_bytes
+
+    def memory_report(self):
+        # One line per loaded font. Heap figures are only known on the device.
+        lines = []
+        for name in self.fonts:
+            num_glyphs, num_bytes = self.glyph_bytes(name)
+            line = f'font {name}: {num_glyphs} glyphs preloaded, {num_bytes} bytes of glyph bitmaps'
+            if name in self.load_bytes:
+                line += f', heap {self.load_bytes[name]} bytes at load'
+            if name in self.preload_bytes:
+                line += f', {self.preload_bytes[name]} bytes at preload'
+            lines.append(line)
+        return lines
+
+
+font_manager = FontManager()
+
+
+def font_10pt():
+    return font_manager.get('10pt')
+
+
+def font_14pt():
+    return font_manager.get('14pt')
+
+
+def preload(name_to_chars=constants.FONT_PRELOAD_CHARS):
+    font_manager.preload(name_to_chars)
+
+
+def memory_report():
+    return font_manager.memory_report()
@@ -1,19 +1,140 @@
 import ulab
 
+
 class Integrator:
 
-    def __init__(self, num=10):
+    # Windowed streaming statistics for one or more channels. The window is a
+    # (num, channels) ulab array, mean and variance are updated in O(1) per
+    # sample with a sliding window form of Welford's algorithm, min/max use
+    # monotonic queues and the median is taken from a sorted copy of the
+    # window which is kept up to date by insertion rather than re-sorting.
+
+    def __init__(self, num=10, channels=1):
         self.num = num
-        self.win = ulab.numpy.zeros(num, dtype=ulab.numpy.uint16)
+        self.channels = channels
+        self.win = ulab.numpy.zeros((num, channels))
+        self.reset()
+
+    def reset(self):
+        self.win[:, :] = 0.0
         self.ind = 0
+        self.count = 0
+        self.seq = 0
+        self._mean = ulab.numpy.zeros(self.channels)
+        self._m2 = ulab.numpy.zeros(self.channels)
+        self.min_queues = [[] for i in range(self.channels)]
+        self.max_queues = [[] for i in range(self.channels)]
+        self.sorted_win = [[] for i in range(self.channels)]
+
+    def update(self, val):
+        if type(val) in (int, float):
+            val = (val,)
+        x = ulab.numpy.array(val)
+        if self.count < self.num:
+            self.count += 1
+            delta = x - self._mean
+            self._mean += delta/self.count
+            self._m2 += delta*(x - self._mean)
+            x_old = None
+        else:
+            x_old = ulab.numpy.array(self.win[self.ind, :])
+            mean_old = self._mean
+            self._mean = mean_old + (x - x_old)/self.num
+            self._m2 += (x - x_old)*(x - self._mean + x_old - mean_old)
+        self.win[self.ind, :] = x
+
+        for i in range(self.channels):
+            value = float(x[i])
+            update_min_queue(self.min_queues[i], self.seq, value, self.num)
+            update_max_queue(self.max_queues[i], self.seq, value, self.num)
+            sorted_win = self.sorted_win[i]
+            if x_old is not None:
+                sorted_win.pop(bisect_left(sorted_win, float(x_old[i])))
+            sorted_win.insert(bisect_left(sorted_win, value), value)
 
-    def update(self,val):
-        self.win[self.ind] = val
         self.ind = (self.ind + 1) % self.num
-        
+        self.seq += 1
+        if self.ind == 0:
+            # Recompute from the window once per pass to stop rounding errors
+            # in the sliding update from accumulating.
+            self._mean = ulab.numpy.mean(self.win, axis=0)
+            self._m2 = ulab.numpy.sum((self.win - self._mean)**2, axis=0)
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return ulab.numpy.zeros(self.channels)
+        m2 = ulab.numpy.array([max(float(v), 0.0) for v in self._m2])
+        return m2/(self.count - 1)
+
+    @property
+    def std(self):
+        return ulab.numpy.sqrt(self.variance)
+
+    @property
+    def cv(self):
+        # Coefficient of variation, std/mean
+        cv_values = []
+        for std, mean in zip(self.std, self._mean):
+            cv_values.append(float(std)/float(mean) if mean != 0 else 0.0)
+        return ulab.numpy.array(cv_values)
+
+    @property
+    def min(self):
+        return ulab.numpy.array([q[0][1] if q else 0.0 for q in self.min_queues])
+
+    @property
+    def max(self):
+        return ulab.numpy.array([q[0][1] if q else 0.0 for q in self.max_queues])
+
+    @property
+    def median(self):
+        median_values = []
+        for sorted_win in self.sorted_win:
+            n = len(sorted_win)
+            if n == 0:
+                median_values.append(0.0)
+            elif n % 2:
+                median_values.append(sorted_win[n//2])
+            else:
+                median_values.append(0.5*(sorted_win[n//2 - 1] + sorted_win[n//2]))
+        return ulab.numpy.array(median_values)
+
     @property
     def value(self):
-        return ulab.numpy.sum(self.win)/self.num
+        if self.channels == 1:
+            return float(self._mean[0])
+        return self._mean
+
+
+def bisect_left(items, value):
+    lo = 0
+    hi = len(items)
+    while lo < hi:
+        mid = (lo + hi)//2
+        if items[mid] < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def update_min_queue(queue, seq, value, num):
+    while queue and queue[-1][1] >= value:
+        queue.pop()
+    queue.append((seq, value))
+    while queue[0][0] <= seq - num:
+        queue.pop(0)
 
 
+def update_max_queue(queue, seq, value, num):
+    while queue and queue[-1][1] <= value:
+        queue.pop()
+    queue.append((seq, value))
+    while queue[0][0] <= seq - num:
+        queue.pop(0)
 
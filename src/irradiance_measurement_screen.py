@@ -1,9 +1,13 @@
-import board
 import displayio
 import constants
 import fonts
 import adafruit_itertools
 from adafruit_display_text import label
+from render_layer import RenderLayer
+from numeric_readout import NumericReadout
+from screen_pool import COLOR_TO_INDEX
+from screen_pool import shared_palette
+from screen_pool import background_bitmap
 
 
 class IrradianceMeasurementScreen:
@@ -12,6 +16,7 @@ class IrradianceMeasurementScreen:
     ANCHOR_POINT = (0.0, 0.5)
 
     HEADER_TO_VALUE_SPACING = 22
+    NOISE_SPACING = 15
 
     HEADER1_LABEL_X_POSITION = 5 
     HEADER1_LABEL_Y_POSITION = 12 
@@ -31,26 +36,28 @@ class IrradianceMeasurementScreen:
     UNITS2_LABEL_X_POSITION = UNITS1_LABEL_X_POSITION
     UNITS2_LABEL_Y_POSITION = VALUE2_LABEL_Y_POSITION
 
+    NOISE1_LABEL_X_POSITION = HEADER1_LABEL_X_POSITION
+    NOISE1_LABEL_Y_POSITION = VALUE1_LABEL_Y_POSITION + NOISE_SPACING
+
+    NOISE2_LABEL_X_POSITION = HEADER1_LABEL_X_POSITION
+    NOISE2_LABEL_Y_POSITION = VALUE2_LABEL_Y_POSITION + NOISE_SPACING
+
     BATTERY_LABEL_X_POSITION = 30      
     BATTERY_LABEL_Y_POSITION = 114
 
+    VALUE_NUM_CHARS = 8
+
     SENSOR_INDICES = [0,1]
 
 
     def __init__(self):
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
-
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
+        # Only labels whose text or color changed are touched on update
+        self.render_layer = RenderLayer()
+
+        # Palette and background bitmap are shared by all screens
+        self.color_to_index = COLOR_TO_INDEX
+        self.palette = shared_palette()
+        self.bitmap = background_bitmap()
         self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
         font_scale = 1
 
@@ -58,7 +65,7 @@ class IrradianceMeasurementScreen:
         header1_str = 'header1'
         text_color = constants.COLOR_TO_RGB['white']
         self.header1_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = header1_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -69,27 +76,20 @@ class IrradianceMeasurementScreen:
                 self.HEADER1_LABEL_Y_POSITION,
                 )
 
-        # Create value1 text label
-        dummy_value = 0.0
-        value_str = f'{dummy_value:1.2f}'.replace('0','O')
-        text_color = constants.COLOR_TO_RGB['orange']
-        self.value1_label = label.Label(
-                fonts.font_10pt, 
-                text = value_str, 
-                color = text_color, 
-                scale = font_scale,
-                anchor_point = self.ANCHOR_POINT,
-                )
-        self.value1_label.anchored_position = (
-                self.VALUE1_LABEL_X_POSITION,
-                self.VALUE1_LABEL_Y_POSITION, 
+        # Create value1 readout
+        self.value1_readout = NumericReadout(
+                fonts.font_10pt(),
+                self.VALUE_NUM_CHARS,
+                constants.COLOR_TO_RGB['orange'],
+                (self.VALUE1_LABEL_X_POSITION, self.VALUE1_LABEL_Y_POSITION),
+                render_layer = self.render_layer,
                 )
 
         # Create units1 text label
         units_str = ' '
         text_color = constants.COLOR_TO_RGB['orange']
         self.units1_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = units_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -104,7 +104,7 @@ class IrradianceMeasurementScreen:
         header2_str = 'header2'
         text_color = constants.COLOR_TO_RGB['white']
         self.header2_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = header2_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -115,27 +115,20 @@ class IrradianceMeasurementScreen:
                 self.HEADER2_LABEL_Y_POSITION,
                 )
 
-        # Create value2 text label
-        dummy_value = 0.0
-        value_str = f'{dummy_value:1.2f}'.replace('0','O')
-        text_color = constants.COLOR_TO_RGB['orange']
-        self.value2_label = label.Label(
-                fonts.font_10pt, 
-                text = value_str, 
-                color = text_color, 
-                scale = font_scale,
-                anchor_point = self.ANCHOR_POINT,
-                )
-        self.value2_label.anchored_position = (
-                self.VALUE2_LABEL_X_POSITION, 
-                self.VALUE2_LABEL_Y_POSITION,
+        # Create value2 readout
+        self.value2_readout = NumericReadout(
+                fonts.font_10pt(),
+                self.VALUE_NUM_CHARS,
+                constants.COLOR_TO_RGB['orange'],
+                (self.VALUE2_LABEL_X_POSITION, self.VALUE2_LABEL_Y_POSITION),
+                render_layer = self.render_layer,
                 )
 
         # Create units2 text label
         units_str = ' '
         text_color = constants.COLOR_TO_RGB['orange']
         self.units2_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = units_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -146,12 +139,42 @@ class IrradianceMeasurementScreen:
                 self.UNITS2_LABEL_Y_POSITION, 
                 )
 
+        # Create text label for noise1 information, shown when smoothing
+        noise_str = ' '
+        text_color = constants.COLOR_TO_RGB['gray']
+        self.noise1_label = label.Label(
+                fonts.font_10pt(), 
+                text = noise_str, 
+                color = text_color, 
+                scale = font_scale,
+                anchor_point = self.ANCHOR_POINT,
+                )
+        self.noise1_label.anchored_position = (
+                self.NOISE1_LABEL_X_POSITION,
+                self.NOISE1_LABEL_Y_POSITION,
+                )
+
+        # Create text label for noise2 information, shown when smoothing
+        noise_str = ' '
+        text_color = constants.COLOR_TO_RGB['gray']
+        self.noise2_label = label.Label(
+                fonts.font_10pt(), 
+                text = noise_str, 
+                color = text_color, 
+                scale = font_scale,
+                anchor_point = self.ANCHOR_POINT,
+                )
+        self.noise2_label.anchored_position = (
+                self.NOISE2_LABEL_X_POSITION,
+                self.NOISE2_LABEL_Y_POSITION,
+                )
+
         # Create integration time/window text label
         #bat_str = 'battery 100%'
         bat_str = 'battery 0.0V'
         text_color = constants.COLOR_TO_RGB['gray']
         self.bat_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = bat_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -166,58 +189,68 @@ class IrradianceMeasurementScreen:
         self.group = displayio.Group()
         self.group.append(self.tile_grid)
         self.group.append(self.header1_label)
-        self.group.append(self.value1_label)
+        self.group.append(self.value1_readout.tile_grid)
         self.group.append(self.units1_label)
         self.group.append(self.header2_label)
-        self.group.append(self.value2_label)
+        self.group.append(self.value2_readout.tile_grid)
         self.group.append(self.units2_label)
+        self.group.append(self.noise1_label)
+        self.group.append(self.noise2_label)
         self.group.append(self.bat_label)
 
         self.header_labels = (self.header1_label, self.header2_label)
-        self.value_labels  = (self.value1_label,  self.value2_label)
+        self.value_readouts = (self.value1_readout, self.value2_readout)
         self.units_labels  = (self.units1_label,  self.units2_label)
 
     @property
     def has_selected_sensor(self):
         return False 
 
+    def reset(self):
+        pass
+
     def set_measurement(self, measurement):
         measurement_items = ( 
                 measurement.label, 
                 measurement.value, 
                 self.header_labels, 
-                self.value_labels,
+                self.value_readouts,
                 self.units_labels,
                 )
-        for name, value, header_label, value_label, units_label in zip(*measurement_items):
-            header_label.text = f'{name}'
-            if type(value) == float:
-                if value <= 10:
-                    value_text = f'{value:.3f}'
-                else:
-                    value_text = f'{value:.2f}'
-            else: 
-                value_text = f'{value}'
-            value_label.text = value_text.replace('0','O')
+        for name, value, header_label, value_readout, units_label in zip(*measurement_items):
+            self.render_layer.set_text(header_label, f'{name}')
+            if type(value) == float and value <= 10:
+                value_readout.set_value(value, 3)
+            else:
+                value_readout.set_value(value, 2)
             if measurement.units is None:
                 units_text = ''
             else:
                 units_text = f'{measurement.units}'
-            units_label.text = units_text
+            self.render_layer.set_text(units_label, units_text)
                 
             if value == constants.OVERFLOW_STR:
                 color = constants.COLOR_TO_RGB['red']
             else:
                 color = constants.COLOR_TO_RGB['orange']
-            value_label.color = color
+            value_readout.set_color(color)
 
-    def set_bat(self, value):
-        self.bat_label.text = f'battery {value:1.1f}V'
+    def set_noise(self, values):
+        labels = (self.noise1_label, self.noise2_label)
+        if values is None:
+            values = (None, None)
+        for value, label in zip(values, labels):
+            if value is not None:
+                self.render_layer.set_text(label, f'noise {100*value:1.2f}%')
+            else:
+                self.render_layer.set_text(label, ' ')
 
-    def show(self):
-        board.DISPLAY.root_group = self.group
+    def set_bat(self, value):
+        self.render_layer.set_text(self.bat_label, f'battery {value:1.1f}V')
 
     def update(self, measurement, battery_monitor): 
+        self.render_layer.begin_frame()
         self.set_measurement(measurement)
+        self.set_noise(measurement.noise)
         self.set_bat(battery_monitor.voltage_lowpass)
 
@@ -1,7 +1,9 @@
 import os
 import json
 import constants
+import settings_cache
 from collections import OrderedDict
+from settings_cache import SettingsCacheError
 
 class JsonSettingsError(Exception):
     pass
@@ -34,23 +36,67 @@ class JsonSettingsFile:
             error_msg = None
         return error_msg
 
+    @property
+    def cache_file_name(self):
+        return f'{self.FILE_NAME.rsplit(".", 1)[0]}.bin'
+
     def load(self):
         self.data = {}
-        if self.FILE_NAME in os.listdir():
-            try:
-                with open(self.FILE_NAME, 'r') as f:
-                    data = json.load(f)
-            except (OSError, ValueError):
-                error_msg = f'unable to read {self.FILE_TYPE} file'
+        try:
+            size, mtime = settings_cache.source_stat(self.FILE_NAME)
+        except OSError:
+            return
+        if self.load_cache(size, mtime):
+            return
+        try:
+            with open(self.FILE_NAME, 'rb') as f:
+                source = f.read()
+            data = json.loads(source)
+        except (OSError, ValueError):
+            error_msg = f'unable to read {self.FILE_TYPE} file'
+            raise self.LOAD_ERROR_EXCEPTION(error_msg)
+        else:
+            if type(data) != dict:
+                error_msg = f'{self.FILE_TYPE} file incorrect format'
                 raise self.LOAD_ERROR_EXCEPTION(error_msg)
-            else:
-                if type(data) != dict:
-                    error_msg = f'{self.FILE_TYPE} file incorrect format'
-                    raise self.LOAD_ERROR_EXCEPTION(error_msg)
-                data_tuples = [(k,v) for (k,v) in data.items()]
-                data_tuples.sort()
-                self.data = OrderedDict(data_tuples) 
-                self.check()
+            data_tuples = [(k,v) for (k,v) in data.items()]
+            data_tuples.sort()
+            self.data = OrderedDict(data_tuples) 
+            self.check()
+            self.save_cache(size, mtime, settings_cache.source_crc(source))
+
+    def load_cache(self, size, mtime):
+        # Loads the checked settings from the binary cache, returns False if
+        # there is no cache or it was made from a different source file.
+        try:
+            cache_size, cache_mtime, cache_crc = settings_cache.read_header(self.cache_file_name)
+        except (OSError, SettingsCacheError):
+            return False
+        if cache_size != size:
+            return False
+        if mtime == 0 or cache_mtime != mtime:
+            # No usable timestamp, compare checksums of the source instead
+            try:
+                with open(self.FILE_NAME, 'rb') as f:
+                    crc = settings_cache.source_crc(f.read())
+            except OSError:
+                return False
+            if crc != cache_crc:
+                return False
+        try:
+            self.data, error_dict = settings_cache.read(self.cache_file_name)
+        except (OSError, ValueError, IndexError, SettingsCacheError):
+            self.data = {}
+            return False
+        self.error_dict.update(error_dict)
+        return True
+
+    def save_cache(self, size, mtime, crc):
+        try:
+            settings_cache.write(self.cache_file_name, self.data, self.error_dict, size, mtime, crc)
+        except (OSError, SettingsCacheError):
+            # Filesystem is read-only while mounted over USB
+            pass
 
     def check(self):
         pass
@@ -0,0 +1,43 @@
+from adafruit_ticks import ticks_ms
+from adafruit_ticks import ticks_add
+from adafruit_ticks import ticks_diff
+
+
+class KeyRepeat:
+
+    def __init__(self, key_numbers, delay, interval, min_interval, accel):
+        # Keys held longer than delay (s) repeat, starting at interval (s)
+        # and speeding up by factor accel per repeat down to min_interval (s).
+        self.key_numbers = key_numbers
+        self.delay_ms = int(1000*delay)
+        self.interval_ms = int(1000*interval)
+        self.min_interval_ms = int(1000*min_interval)
+        self.accel = accel
+        self.held = {}
+
+    def on_event(self, event):
+        # Returns True for the release of a long press, i.e. one which has
+        # already repeated and should not also be handled as a short press.
+        if event.key_number not in self.key_numbers:
+            return False
+        if event.pressed:
+            due_ms = ticks_add(ticks_ms(), self.delay_ms)
+            self.held[event.key_number] = [due_ms, self.interval_ms, 0]
+            return False
+        state = self.held.pop(event.key_number, None)
+        return state is not None and state[2] > 0
+
+    def due(self):
+        # Key numbers whose repeat is due, each rescheduled at a shorter interval
+        due_keys = []
+        now_ms = ticks_ms()
+        for key_number, state in self.held.items():
+            if ticks_diff(now_ms, state[0]) >= 0:
+                due_keys.append(key_number)
+                state[0] = ticks_add(now_ms, state[1])
+                state[1] = max(int(self.accel*state[1]), self.min_interval_ms)
+                state[2] += 1
+        return due_keys
+
+    def clear(self):
+        self.held = {}
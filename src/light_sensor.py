@@ -1,4 +1,14 @@
+import time
 import adafruit_tsl2591
+from adafruit_ticks import ticks_ms
+from adafruit_ticks import ticks_add
+from adafruit_ticks import ticks_diff
+
+
+class AcquisitionState:
+    IDLE        = 0
+    INTEGRATING = 1
+    DONE        = 2
 
 
 class LightSensorTSL2591:
@@ -6,16 +16,53 @@ class LightSensorTSL2591:
     TSL2591_MAX_COUNT_100MS = 36863  # 0x8FFF
     TSL2591_MAX_COUNT = 65535        # 0xFFFF
 
+    # Registers and bits used for non-blocking acquisition
+    TSL2591_REGISTER_ENABLE = 0x00
+    TSL2591_REGISTER_CONTROL = 0x01
+    TSL2591_REGISTER_STATUS = 0x13
+    TSL2591_REGISTER_CHAN0_LOW = 0x14
+    TSL2591_REGISTER_CHAN1_LOW = 0x16
+    TSL2591_ENABLE_POWERON = 0x01
+    TSL2591_ENABLE_AEN = 0x02
+    TSL2591_ENABLE_AIEN = 0x10
+    TSL2591_ENABLE_NPIEN = 0x80
+    TSL2591_STATUS_AVALID = 0x01
+
+    # Register contents left by adafruit_tsl2591.TSL2591.__init__
+    DRIVER_INIT_ENABLE = (
+            TSL2591_ENABLE_POWERON
+            | TSL2591_ENABLE_AEN
+            | TSL2591_ENABLE_AIEN
+            | TSL2591_ENABLE_NPIEN
+            )
+    DRIVER_INIT_CONTROL = adafruit_tsl2591.GAIN_MED | adafruit_tsl2591.INTEGRATIONTIME_100MS
+
+    # Lux calculation coefficients, same as adafruit_tsl2591
+    TSL2591_LUX_DF = 408.0
+    TSL2591_LUX_COEFB = 1.64
+    TSL2591_LUX_COEFC = 0.59
+    TSL2591_LUX_COEFD = 0.86
+
+    # Sleep between status polls when waiting for a conversion (s)
+    WAIT_POLL_DT = 0.005
+
     DEFAULT_GAIN = adafruit_tsl2591.GAIN_MED
     DEFAULT_INTEGRATION_TIME = adafruit_tsl2591.INTEGRATIONTIME_500MS
 
-    GAIN_TO_AGAIN = { 
-            adafruit_tsl2591.GAIN_LOW  :  1.0, 
-            adafruit_tsl2591.GAIN_MED  :  24.5,  
-            adafruit_tsl2591.GAIN_HIGH :  400.0, 
+    GAIN_TO_AGAIN = {
+            adafruit_tsl2591.GAIN_LOW  :  1.0,
+            adafruit_tsl2591.GAIN_MED  :  24.5,
+            adafruit_tsl2591.GAIN_HIGH :  400.0,
             adafruit_tsl2591.GAIN_MAX  :  9200,
             }
 
+    GAIN_TO_LUX_AGAIN = {
+            adafruit_tsl2591.GAIN_LOW  :  1.0,
+            adafruit_tsl2591.GAIN_MED  :  25.0,
+            adafruit_tsl2591.GAIN_HIGH :  428.0,
+            adafruit_tsl2591.GAIN_MAX  :  9876.0,
+            }
+
     # Irradiance conversion coefficient gives (uW/cm^2) per count with atime=1ms and gain=1x
     IRRADIANCE_COEFF = 100.0*GAIN_TO_AGAIN[adafruit_tsl2591.GAIN_HIGH]/264.1
 
@@ -26,40 +73,178 @@ class LightSensorTSL2591:
             self._device = adafruit_tsl2591.TSL2591(i2c)
         except (ValueError, OSError) as error:
             raise LightSensorIOError(error)
-        self.gain = self.DEFAULT_GAIN 
-        self.integration_time = self.DEFAULT_INTEGRATION_TIME 
+
+        # Shadow copies of the enable and control registers. Gain and
+        # integration time changes only update the settings, they are written
+        # to the control register once, right before the next conversion, and
+        # writes which would not change a register are skipped.
+        self.enable_shadow = self.DRIVER_INIT_ENABLE
+        self.control_shadow = self.DRIVER_INIT_CONTROL
+        self.register_writes = 0
+        self._gain = None
+        self._integration_time = None
+
+        # Acquisition state machine. The most recently completed conversion
+        # is kept in sample along with the gain and integration time used.
+        self.acq_state = AcquisitionState.IDLE
+        self.acq_deadline = 0
+        self.acq_gain = None
+        self.acq_integration_time = None
+        self.sample = None
+        self.sample_gain = None
+        self.sample_integration_time = None
+        self.sample_count = 0
+
+        # When False a new conversion is not started automatically after a
+        # sample has been collected, e.g. when paired by LightSensorPair.
+        self.auto_restart = True
+
+        # Optional AutoRange, updated with each newly collected sample
+        self.auto_range = None
+
+        # Sample cache statistics. All properties are served from the same
+        # sample until a new conversion completes. The first read of a new
+        # sample counts as a miss, every further read of it as a hit.
+        self.cache_cycle = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self.gain = self.DEFAULT_GAIN
+        self.integration_time = self.DEFAULT_INTEGRATION_TIME
         self.channel = 0
 
+    def start(self):
+        # Clearing AEN resets the ADC, setting it again starts a new integration
+        # cycle. Pending gain and integration time changes are applied in between.
+        self.write_enable(self.TSL2591_ENABLE_POWERON)
+        self.write_control(self._gain | self._integration_time)
+        self.write_enable(self.TSL2591_ENABLE_POWERON | self.TSL2591_ENABLE_AEN)
+        self.acq_gain = self._gain
+        self.acq_integration_time = self._integration_time
+        self.acq_deadline = ticks_add(ticks_ms(), int(self.atime))
+        self.acq_state = AcquisitionState.INTEGRATING
+
+    def write_enable(self, value):
+        if value != self.enable_shadow:
+            self._device._write_u8(self.TSL2591_REGISTER_ENABLE, value)
+            self.enable_shadow = value
+            self.register_writes += 1
+
+    def write_control(self, value):
+        if value != self.control_shadow:
+            self._device._write_u8(self.TSL2591_REGISTER_CONTROL, value)
+            self.control_shadow = value
+            self.register_writes += 1
+
+    def update(self):
+        # Non-blocking, returns True when a new sample has been collected
+        if self.acq_state != AcquisitionState.INTEGRATING:
+            if self.auto_restart:
+                self.start()
+            return False
+        if ticks_diff(ticks_ms(), self.acq_deadline) < 0:
+            return False
+        status = self._device._read_u8(self.TSL2591_REGISTER_STATUS)
+        if not status & self.TSL2591_STATUS_AVALID:
+            return False
+        channel_0 = self._device._read_u16LE(self.TSL2591_REGISTER_CHAN0_LOW)
+        channel_1 = self._device._read_u16LE(self.TSL2591_REGISTER_CHAN1_LOW)
+        self.sample = channel_0, channel_1
+        self.sample_gain = self.acq_gain
+        self.sample_integration_time = self.acq_integration_time
+        self.sample_count += 1
+        if self.auto_range is not None:
+            self.auto_range.update(self)
+        if self.auto_restart:
+            self.start()
+        else:
+            self.acq_state = AcquisitionState.DONE
+        return True
+
+    def wait(self):
+        # Blocking, returns once the next conversion has completed
+        if self.acq_state != AcquisitionState.INTEGRATING:
+            self.start()
+        while not self.update():
+            dt_ms = ticks_diff(self.acq_deadline, ticks_ms())
+            if dt_ms > 0:
+                time.sleep(dt_ms/1000)
+            else:
+                time.sleep(self.WAIT_POLL_DT)
+        return self.sample
+
+    @property
+    def latest_sample(self):
+        # None until the first conversion has completed, callers skip until
+        # then rather than wait for it
+        if self.sample is None:
+            return None
+        if self.cache_cycle == self.sample_count:
+            self.cache_hits += 1
+        else:
+            self.cache_cycle = self.sample_count
+            self.cache_misses += 1
+        return self.sample
+
+    @property
+    def cache_stats(self):
+        return self.cache_hits, self.cache_misses
+
+    def reset_cache_stats(self):
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     @property
     def max_counts(self):
         if self.integration_time == adafruit_tsl2591.INTEGRATIONTIME_100MS:
-            return self.TSL2591_MAX_COUNT_100MS 
+            return self.TSL2591_MAX_COUNT_100MS
         else:
-            return self.TSL2591_MAX_COUNT 
+            return self.TSL2591_MAX_COUNT
+
+    @property
+    def sample_max_counts(self):
+        if self.sample_integration_time == adafruit_tsl2591.INTEGRATIONTIME_100MS:
+            return self.TSL2591_MAX_COUNT_100MS
+        else:
+            return self.TSL2591_MAX_COUNT
 
     @property
     def value(self):
-        value = self._device.raw_luminosity[self.channel]
-        if value >= self.max_counts:
+        value = self.latest_sample[self.channel]
+        if value >= self.sample_max_counts:
             raise LightSensorOverflow('light sensor reading > max_counts')
         #print(value)
         return value
 
     @property
     def values(self):
-        values = self._device.raw_luminosity
+        values = self.latest_sample
         for v in values:
-            if v >= self.max_counts:
+            if v >= self.sample_max_counts:
                 raise LightSensorOverflow('light sensor reading > max_counts')
         return values
 
     @property
     def lux(self):
-        return self._device.lux
+        channel_0, channel_1 = self.values
+        if channel_0 == 0:
+            return 0.0
+        again = self.GAIN_TO_LUX_AGAIN[self.sample_gain]
+        atime = 100.0*self.sample_integration_time + 100.0
+        cpl = (atime*again)/self.TSL2591_LUX_DF
+        lux1 = (channel_0 - self.TSL2591_LUX_COEFB*channel_1)/cpl
+        lux2 = (self.TSL2591_LUX_COEFC*channel_0 - self.TSL2591_LUX_COEFD*channel_1)/cpl
+        return max(lux1, lux2)
 
     @property
     def irradiance(self):
-        raw_value = self._device.raw_luminosity[0]/(self.again*self.atime)
+        return self.counts_to_irradiance(self.latest_sample[0])
+
+    def counts_to_irradiance(self, counts):
+        # Uses the gain and integration time of the latest sample
+        again = self.GAIN_TO_AGAIN[self.sample_gain]
+        atime = 100.0*self.sample_integration_time + 100.0
+        raw_value = counts/(again*atime)
         return raw_value*self.IRRADIANCE_COEFF
 
     @property
@@ -76,8 +261,9 @@ class LightSensorTSL2591:
 
     @gain.setter
     def gain(self, value):
-        self._gain = value
-        self._device.gain = value
+        if value != self._gain:
+            self._gain = value
+            self.acq_state = AcquisitionState.IDLE
 
     @property
     def integration_time(self):
@@ -85,8 +271,59 @@ class LightSensorTSL2591:
 
     @integration_time.setter
     def integration_time(self, value):
-        self._integration_time = value
-        self._device.integration_time = value
+        if value != self._integration_time:
+            self._integration_time = value
+            self.acq_state = AcquisitionState.IDLE
+
+
+class LightSensorPair:
+
+    # Sleep between status polls when waiting for a frame (s)
+    WAIT_POLL_DT = LightSensorTSL2591.WAIT_POLL_DT
+
+    def __init__(self, *sensors):
+        # Conversions on all sensors are started back to back and collected
+        # together so a paired frame costs one integration time, the longest
+        # of the sensors, rather than the sum.
+        self.sensors = sensors
+        for sensor in self.sensors:
+            sensor.auto_restart = False
+        self.frame_count = 0
+
+    def start(self):
+        for sensor in self.sensors:
+            sensor.start()
+
+    def update(self):
+        # Non-blocking, returns True when a new paired frame has been collected
+        for sensor in self.sensors:
+            sensor.update()
+        acq_states = [sensor.acq_state for sensor in self.sensors]
+        if AcquisitionState.INTEGRATING in acq_states:
+            return False
+        if AcquisitionState.IDLE in acq_states:
+            # Not started yet or settings changed, restart all so frames stay aligned
+            self.start()
+            return False
+        self.frame_count += 1
+        self.start()
+        return True
+
+    def wait(self):
+        # Blocking, returns once the next paired frame has completed
+        self.start()
+        while not self.update():
+            now = ticks_ms()
+            dt_ms = max([ticks_diff(sensor.acq_deadline, now) for sensor in self.sensors])
+            if dt_ms > 0:
+                time.sleep(dt_ms/1000)
+            else:
+                time.sleep(self.WAIT_POLL_DT)
+        return self.frame
+
+    @property
+    def frame(self):
+        return tuple(sensor.latest_sample for sensor in self.sensors)
 
 
 class LightSensorOverflow(Exception):
@@ -95,4 +332,3 @@ class LightSensorOverflow(Exception):
 class LightSensorIOError(Exception):
     pass
 
-
@@ -1,20 +1,32 @@
+import math
 from ulab import numpy as np
 import constants
-from count_measurement_screen import CountMeasurementScreen
-from irradiance_measurement_screen import IrradianceMeasurementScreen
-from reference_unit_screen import ReferenceUnitScreen
 from light_sensor import LightSensorOverflow
 
+LN_10 = math.log(10.0)
+
 class Measurement:
 
     NAME  = 'Measurment'
     LABEL = 'Label'
     UNITS = None
+    NUM_VALUES = 1
 
-    def __init__(self, sensor_90, sensor_180, config):
+    def __init__(self, sensor_90, sensor_180, config, norm_cache=None, blank_table=None):
         self.sensor_90  = sensor_90
         self.sensor_180 = sensor_180
         self.config = config
+        self.norm_cache = norm_cache
+        self.blank_table = blank_table
+
+        # Optional smoothing, raw values are added to the integrator once per
+        # sensor sample so repeated reads of value don't need extra sensor reads.
+        self.integrator = None
+        self.integrator_cycle = None
+        self.integrator_settings = None
+        if config.smoothing_window is not None:
+            from integrator import Integrator
+            self.integrator = Integrator(config.smoothing_window, self.NUM_VALUES)
 
     @property
     def name(self):
@@ -29,59 +41,154 @@ class Measurement:
         return self.UNITS
 
     @property
-    def value(self):
+    def raw_value(self):
         return 0.0
 
+    def blank_offset(self, sensor_name, sensor):
+        # Dark counts for the settings of the sensor's latest sample
+        if self.blank_table is None:
+            return 0.0
+        offset = self.blank_table.offset(
+                sensor_name,
+                sensor.sample_gain,
+                sensor.sample_integration_time,
+                )
+        return offset[sensor.channel]
+
+    def blanked_counts(self, sensor_name, sensor, counts):
+        # Counts are shown, logged and sent as whole numbers
+        offset = self.blank_offset(sensor_name, sensor)
+        if not offset:
+            return counts
+        return round(counts - offset)
+
+    def blanked_irradiance(self, sensor_name, sensor):
+        counts = sensor.latest_sample[0] - self.blank_offset(sensor_name, sensor)
+        return sensor.counts_to_irradiance(counts)
+
     @property
-    def create_screen(self):
+    def value(self):
+        value = self.raw_value
+        if self.integrator is None:
+            return value
+        values = value if self.NUM_VALUES > 1 else (value,)
+        if has_str(values):
+            # Overflow or no value, restart smoothing with the next good sample
+            self.update_integrator(None)
+            return value
+        self.update_integrator(values)
+        mean = self.integrator.mean
+        if self.NUM_VALUES > 1:
+            return tuple(float(v) for v in mean)
+        return float(mean[0])
+
+    def update_integrator(self, values):
+        # Adds values once per sensor sample, None resets the integrator
+        sensors = self.sensor_90, self.sensor_180
+        settings = tuple((s.sample_gain, s.sample_integration_time) for s in sensors)
+        if settings != self.integrator_settings:
+            self.integrator_settings = settings
+            self.integrator.reset()
+        cycle = tuple(s.sample_count for s in sensors)
+        if cycle == self.integrator_cycle:
+            return
+        self.integrator_cycle = cycle
+        if values is None:
+            self.integrator.reset()
+        else:
+            self.integrator.update(values)
+
+    @property
+    def noise(self):
+        # Coefficient of variation of the smoothing window, None when not smoothing
+        if self.integrator is None:
+            return None
+        cv = self.integrator.cv
+        if self.NUM_VALUES > 1:
+            return tuple(float(v) for v in cv)
+        return float(cv[0])
+
+    @staticmethod
+    def load_screen_class():
+        # Screen modules are imported on first use, see screen_class, so that
+        # only the screens which are shown get loaded at boot
         return None
 
-    def update_norm_sample(self):
+    def create_screen(self, screen_pool=None):
+        # Pooled screen when given a pool, otherwise a new one
+        screen_class = screen_class_of(type(self))
+        if screen_class is None:
+            return None
+        if screen_pool is None:
+            return screen_class()
+        return screen_pool.get(screen_class)
+
+    def update(self):
+        pass
+
+    def start_norm_sample(self):
         pass
 
+    def cancel_norm_sample(self):
+        pass
+
+    @property
+    def is_capturing_norm(self):
+        return False
+
+    @property
+    def norm_progress(self):
+        return None
+
 
 class RawCount(Measurement):
     
     NAME  = 'Raw Count'
     LABEL = 'Count @90', 'Count @180'
+    NUM_VALUES = 2
+
+    @staticmethod
+    def load_screen_class():
+        from count_measurement_screen import CountMeasurementScreen
+        return CountMeasurementScreen
 
     @property
-    def value(self): 
+    def raw_value(self): 
         try:
-            value_90  = self.sensor_90.value
+            value_90 = self.blanked_counts('sensor_90', self.sensor_90, self.sensor_90.value)
         except LightSensorOverflow:
             value_90 = constants.OVERFLOW_STR
         try:
-            value_180 = self.sensor_180.value 
+            value_180 = self.blanked_counts('sensor_180', self.sensor_180, self.sensor_180.value)
         except LightSensorOverflow:
             value_180 = constants.OVERFLOW_STR
         return value_90, value_180
 
-    def create_screen(self):
-        return CountMeasurementScreen()
-
 
 class Irradiance(Measurement):
 
     NAME  = f'Irradiance'
     LABEL = f'{NAME} @90', f'{NAME} @180' 
     UNITS = f'{constants.MU_STR}W/{constants.CM2_STR}'
+    NUM_VALUES = 2
+
+    @staticmethod
+    def load_screen_class():
+        from irradiance_measurement_screen import IrradianceMeasurementScreen
+        return IrradianceMeasurementScreen
 
     @property
-    def value(self):
+    def raw_value(self):
         try:
-            value_90 = self.sensor_90.irradiance
+            value_90 = self.blanked_irradiance('sensor_90', self.sensor_90)
         except LightSensorOverflow:
             value_90 = constants.OVERFLOW_STR
         try:
-            value_180 = self.sensor_180.irradiance
+            value_180 = self.blanked_irradiance('sensor_180', self.sensor_180)
         except LightSensorOverflow:
             value_180 = constants.OVERFLOW_STR
         return value_90, value_180
 
-    def create_screen(self): 
-        return IrradianceMeasurementScreen()
-
 
 class RelativeUnit(Measurement):
 
@@ -89,41 +196,183 @@ class RelativeUnit(Measurement):
     LABEL = f'{NAME} @90'
     UNITS = f'{constants.MU_STR}W/{constants.CM2_STR}'
 
-    def __init__(self, sensor_90, sensor_180, config):
-        super().__init__(sensor_90, sensor_180, config)
-        self.norm_sample_180 = None 
+    @staticmethod
+    def load_screen_class():
+        from reference_unit_screen import ReferenceUnitScreen
+        return ReferenceUnitScreen
+
+    def __init__(self, sensor_90, sensor_180, config, norm_cache=None, blank_table=None):
+        super().__init__(sensor_90, sensor_180, config, norm_cache, blank_table)
+        self._norm_sample_180 = None
         self.ref_irradiance_180 = config.ref_irradiance_180
 
+        # Background normalization capture state
+        self.norm_samples = None
+        self.norm_count = 0
+        self.norm_cycle = None
+        self.norm_medians = []
+
     @property
-    def value(self):
-        if self.norm_sample_180 is not None:
-            value_90 = self.sensor_90.irradiance
-            ref_value_90 = self.ref_irradiance_180*(value_90/self.norm_sample_180)
+    def norm_sample_180(self):
+        # Kept in the norm cache, when there is one, so that it outlives this
+        # measurement and only applies to the gain and integration time used.
+        if self.norm_cache is None:
+            return self._norm_sample_180
+        return self.norm_cache.get(
+                'sensor_180',
+                self.sensor_180.gain,
+                self.sensor_180.integration_time,
+                )
+
+    @norm_sample_180.setter
+    def norm_sample_180(self, value):
+        if self.norm_cache is None:
+            self._norm_sample_180 = value
+        else:
+            gain = self.sensor_180.sample_gain
+            itime = self.sensor_180.sample_integration_time
+            if gain is None:
+                gain = self.sensor_180.gain
+                itime = self.sensor_180.integration_time
+            self.norm_cache.put('sensor_180', gain, itime, value)
+
+    @property
+    def raw_value(self):
+        return self.relative_value()
+
+    def relative_value(self):
+        norm_sample_180 = self.norm_sample_180
+        if norm_sample_180 is not None:
+            value_90 = self.blanked_irradiance('sensor_90', self.sensor_90)
+            ref_value_90 = self.ref_irradiance_180*(value_90/norm_sample_180)
         else:
             ref_value_90 = '___.__'
         return ref_value_90
 
-    def create_screen(self):
-        return ReferenceUnitScreen()
-
-    def update_norm_sample(self):
-        samples = np.zeros(constants.NUM_SAMPLE_180)
-        for i in range(constants.NUM_SAMPLE_180):
-            samples[i] = self.sensor_180.irradiance
-        median_sample = np.median(samples)
+    def set_norm_sample(self, median_sample):
+        if self.integrator is not None:
+            self.integrator.reset()
         if median_sample > 0.0:
-            self.norm_sample_180 = np.median(samples)
+            self.norm_sample_180 = median_sample
         else:
             self.norm_sample_180 = None 
             raise ZeroNormalizationSample("normalization sample is 0")
 
+    def start_norm_sample(self):
+        # Non-blocking capture, advanced by update() with each new sensor sample
+        self.norm_samples = np.zeros(constants.NUM_SAMPLE_180)
+        self.norm_count = 0
+        self.norm_cycle = self.sensor_180.sample_count
+        self.norm_medians = []
+
+    def cancel_norm_sample(self):
+        self.norm_samples = None
+
+    @property
+    def is_capturing_norm(self):
+        return self.norm_samples is not None
+
+    @property
+    def norm_progress(self):
+        if self.norm_samples is None:
+            return None
+        return self.norm_count/constants.NUM_SAMPLE_180
+
+    def update(self):
+        if self.norm_samples is None:
+            return
+        if self.sensor_180.sample_count == self.norm_cycle:
+            return
+        self.norm_cycle = self.sensor_180.sample_count
+        self.norm_samples[self.norm_count] = self.blanked_irradiance(
+                'sensor_180',
+                self.sensor_180,
+                )
+        self.norm_count += 1
+
+        # Stop early once the running median has settled
+        median_sample = float(np.median(self.norm_samples[:self.norm_count]))
+        self.norm_medians.append(median_sample)
+        self.norm_medians = self.norm_medians[-constants.NORM_STABLE_COUNT:]
+        tolerance = constants.NORM_TOLERANCE*abs(median_sample)
+        is_stable = len(self.norm_medians) == constants.NORM_STABLE_COUNT
+        for value in self.norm_medians:
+            is_stable = is_stable and abs(value - median_sample) <= tolerance
+        if is_stable or self.norm_count == constants.NUM_SAMPLE_180:
+            self.norm_samples = None
+            try:
+                self.set_norm_sample(median_sample)
+            except ZeroNormalizationSample:
+                pass
+
+
+class CalibratedUnit(RelativeUnit):
+
+    # Absorbance mapped through a calibration fit. The fits in
+    # calibrations.json, and their ranges, are defined on absorbance,
+    # log10 of the normalization sample over the 180 degree irradiance, both
+    # blanked. A subclass is made for each calibration by
+    # calibrated_measurement.
+    FIT = None
+
+    @property
+    def raw_value(self):
+        value = self.absorbance()
+        if type(value) == str:
+            return value
+        return self.FIT.apply(value)
+
+    def absorbance(self):
+        norm_sample_180 = self.norm_sample_180
+        if norm_sample_180 is None:
+            return '___.__'
+        value_180 = self.blanked_irradiance('sensor_180', self.sensor_180)
+        if value_180 <= 0.0:
+            return constants.RANGE_ERROR_STR
+        return math.log(norm_sample_180/value_180)/LN_10
+
 
 class ZeroNormalizationSample(Exception):
     pass
 
 
+def has_str(values):
+    # True if any value is a string, e.g. overflow, without allocating
+    for value in values:
+        if type(value) == str:
+            return True
+    return False
+
+
 MEASUREMENTS = [RawCount, Irradiance, RelativeUnit]
 NAME_TO_MEASUREMENT = {item.NAME:item for item in MEASUREMENTS}
 
-def from_name(name, sensors, config):
-    return NAME_TO_MEASUREMENT[name](*sensors, config)
+def calibrated_measurement(name, units, fit):
+    class Calibrated(CalibratedUnit):
+        pass
+    Calibrated.NAME = name
+    Calibrated.LABEL = name
+    Calibrated.UNITS = units
+    Calibrated.FIT = fit
+    return Calibrated
+
+# Screen class of each measurement class, filled in on first use
+_screen_classes = {}
+
+def screen_class_of(measurement_class):
+    try:
+        return _screen_classes[measurement_class]
+    except KeyError:
+        pass
+    screen_class = measurement_class.load_screen_class()
+    _screen_classes[measurement_class] = screen_class
+    return screen_class
+
+def screen_class(name):
+    return screen_class_of(NAME_TO_MEASUREMENT[name])
+
+def register(measurement_class):
+    NAME_TO_MEASUREMENT[measurement_class.NAME] = measurement_class
+
+def from_name(name, sensors, config, norm_cache=None, blank_table=None):
+    return NAME_TO_MEASUREMENT[name](*sensors, config, norm_cache, blank_table)
@@ -0,0 +1,62 @@
+class MenuModel:
+
+    def __init__(self, items, num_rows=1):
+        # Cursor and view window over a list of item names, of which num_rows
+        # are visible. Every move is O(1) in the number of items; the letter
+        # jump table is built once here. num_rows can be set later, once the
+        # menu screen has been built.
+        self.items = items
+        self.num_rows = num_rows
+        self.pos = 0
+        self.view_pos = 0
+        self.next_letter_pos = [0]*len(items)
+        # Position of the next item, wrapping round, whose first letter
+        # differs from that of the item at each position
+        next_pos = 0
+        for i in range(2*len(items) - 1, -1, -1):
+            j = i % len(items)
+            k = (i + 1) % len(items)
+            if first_letter(items[j]) != first_letter(items[k]):
+                next_pos = k
+            if i < len(items):
+                self.next_letter_pos[j] = next_pos
+
+    @property
+    def num_items(self):
+        return len(self.items)
+
+    @property
+    def item(self):
+        return self.items[self.pos]
+
+    def set_pos(self, pos):
+        # Moves the cursor to pos, scrolling the view as little as possible
+        self.pos = min(max(pos, 0), self.num_items - 1)
+        if self.pos < self.view_pos:
+            self.view_pos = self.pos
+        elif self.pos > self.view_pos + self.num_rows - 1:
+            self.view_pos = self.pos - self.num_rows + 1
+
+    def set_num_rows(self, num_rows):
+        self.num_rows = num_rows
+        self.set_pos(self.pos)
+
+    def reset(self):
+        self.pos = 0
+        self.view_pos = 0
+
+    def move(self, delta):
+        self.set_pos(self.pos + delta)
+
+    def page_up(self):
+        self.move(-self.num_rows)
+
+    def page_down(self):
+        self.move(self.num_rows)
+
+    def jump_to_next_letter(self):
+        self.set_pos(self.next_letter_pos[self.pos])
+
+
+def first_letter(item):
+    return item[:1].upper()
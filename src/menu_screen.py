@@ -5,6 +5,10 @@ import constants
 import fonts
 from adafruit_display_text import label
 from adafruit_display_shapes import line 
+from render_layer import RenderLayer
+from screen_pool import COLOR_TO_INDEX
+from screen_pool import shared_palette
+from screen_pool import background_bitmap
 
 class MenuScreen:
 
@@ -14,26 +18,20 @@ class MenuScreen:
     def __init__(self):
         self.group = displayio.Group()
 
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
+        # Only labels whose text or colors changed are touched
+        self.render_layer = RenderLayer()
 
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
+        # Palette and background bitmap are shared by all screens
+        self.color_to_index = COLOR_TO_INDEX
+        self.palette = shared_palette()
+        self.bitmap = background_bitmap()
         self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
         font_scale = 1
 
         # Create header text label
-        header_str = 'Menu'
+        header_str = constants.MENU_HEADER_STR
         self.header_label = label.Label(
-                fonts.font_14pt, 
+                fonts.font_14pt(), 
                 text = header_str, 
                 color = constants.COLOR_TO_RGB['white'], 
                 scale = font_scale,
@@ -58,16 +56,17 @@ class MenuScreen:
 
         # Test populate some items
         vert_pix_remaining = board.DISPLAY.height - (menu_line_y1 + 1)
-        test_label = label.Label(fonts.font_10pt, text='test',scale=font_scale)
+        test_label = label.Label(fonts.font_10pt(), text='test',scale=font_scale)
         label_dy = test_label.bounding_box[3] + self.PADDING_ITEM
         self.items_per_screen = vert_pix_remaining//label_dy
 
         self.item_labels = []
+        self.row_positions = []
         for i in range(self.items_per_screen): 
             pos_x = 2
             pos_y = menu_line_y0 + (i+1)*label_dy 
             label_tmp = label.Label(
-                     fonts.font_10pt,
+                     fonts.font_10pt(),
                      text = '',
                      color = constants.COLOR_TO_RGB['white'],
                      scale = font_scale,
@@ -76,6 +75,7 @@ class MenuScreen:
                      padding_right = 160
                      )
             self.item_labels.append(label_tmp)
+            self.row_positions.append((pos_x, pos_y))
 
         # Ceate display group and add items to it
         self.group.append(self.tile_grid)
@@ -84,20 +84,53 @@ class MenuScreen:
         for item_label in self.item_labels:
             self.group.append(item_label)
 
-        self.set_curr_item(0)
+        # Item position and row shown by each label, and the highlighted label
+        self.label_items = [None]*self.items_per_screen
+        self.label_rows = list(range(self.items_per_screen))
+        self.view_pos = None
+        self.curr_label = None
+        for item_label in self.item_labels:
+            self.set_highlight(item_label, False)
 
-    def set_menu_items(self, text_list):
-        for item_label, item_text in zip(self.item_labels, text_list):
-            item_label.text = item_text 
+    def reset(self):
+        # Relabel every row on the next set_menu, the labels keep their text
+        # so unchanged rows are still skipped by the render layer
+        self.label_items = [None]*self.items_per_screen
+        self.view_pos = None
 
-    def set_curr_item(self, num):
-        for i, item_label in enumerate(self.item_labels):
-            if i==num:
-                item_label.color = constants.COLOR_TO_RGB['black']
-                item_label.background_color = constants.COLOR_TO_RGB['orange']
-            else:
-                item_label.color = constants.COLOR_TO_RGB['white']
-                item_label.background_color = constants.COLOR_TO_RGB['black']
+    def set_menu(self, menu):
+        # Draws a MenuModel. The item at position pos always goes in label
+        # pos % items_per_screen, so an item keeps its label and text while it
+        # stays in view: scrolling relabels only the rows coming into view and
+        # moves the others, and a cursor move only touches the highlight of
+        # the old and new labels.
+        if menu.view_pos != self.view_pos:
+            self.view_pos = menu.view_pos
+            for row in range(self.items_per_screen):
+                pos = menu.view_pos + row
+                index = pos % self.items_per_screen
+                item_label = self.item_labels[index]
+                if self.label_items[index] != pos:
+                    if pos < menu.num_items:
+                        self.render_layer.set_text(item_label, f'{pos} {menu.items[pos]}')
+                    else:
+                        self.render_layer.set_text(item_label, '')
+                    self.label_items[index] = pos
+                if self.label_rows[index] != row:
+                    item_label.anchored_position = self.row_positions[row]
+                    self.label_rows[index] = row
+                    self.render_layer.dirty = True
+        curr_label = menu.pos % self.items_per_screen
+        if curr_label != self.curr_label:
+            if self.curr_label is not None:
+                self.set_highlight(self.item_labels[self.curr_label], False)
+            self.set_highlight(self.item_labels[curr_label], True)
+            self.curr_label = curr_label
 
-    def show(self):
-        board.DISPLAY.root_group = self.group
+    def set_highlight(self, item_label, highlight):
+        if highlight:
+            self.render_layer.set_color(item_label, constants.COLOR_TO_RGB['black'])
+            self.render_layer.set_background_color(item_label, constants.COLOR_TO_RGB['orange'])
+        else:
+            self.render_layer.set_color(item_label, constants.COLOR_TO_RGB['white'])
+            self.render_layer.set_background_color(item_label, constants.COLOR_TO_RGB['black'])
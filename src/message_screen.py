@@ -4,6 +4,10 @@ import constants
 import fonts
 from adafruit_display_text import label
 from adafruit_display_text import wrap_text_to_lines 
+from render_layer import RenderLayer
+from screen_pool import COLOR_TO_INDEX
+from screen_pool import shared_palette
+from screen_pool import background_bitmap
 
 
 class MessageScreen:
@@ -16,27 +20,21 @@ class MessageScreen:
 
     def __init__(self):
 
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
+        # Only labels whose text changed are touched
+        self.render_layer = RenderLayer()
 
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
+        # Palette and background bitmap are shared by all screens
+        self.color_to_index = COLOR_TO_INDEX
+        self.palette = shared_palette()
+        self.bitmap = background_bitmap()
         self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
         font_scale = 1
 
         # Create header label
-        header_str = 'MESSAGE'
+        header_str = constants.MESSAGE_HEADER_STR
         text_color = constants.COLOR_TO_RGB['white']
         self.header_label = label.Label(
-                fonts.font_14pt, 
+                fonts.font_14pt(), 
                 text = header_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -54,7 +52,7 @@ class MessageScreen:
             message_str = ' '*self.MESSAGE_MAX_CHARS
             text_color = constants.COLOR_TO_RGB['orange']
             message_label = label.Label(
-                    fonts.font_10pt, 
+                    fonts.font_10pt(), 
                     text = message_str, 
                     color = text_color, 
                     scale = font_scale,
@@ -75,25 +73,28 @@ class MessageScreen:
 
     def set_message(self, message, ok_to_continue=True):
         if ok_to_continue:
-            message_extended = f'{message}. Press any key to continue.'
+            message_extended = f'{message}. {constants.CONTINUE_STR}'
         else:
             message_extended = f'{message}'
         wrapped_message = wrap_text_to_lines(message_extended, self.MESSAGE_MAX_CHARS) 
+        wrapped_message.extend(['']*(self.NUM_MESSAGE_LABEL - len(wrapped_message)))
         for message_label, line in zip(self.message_label_list, wrapped_message):
-            message_label.text = line  
+            self.render_layer.set_text(message_label, line)
+
+    def reset(self):
+        self.set_header(constants.MESSAGE_HEADER_STR)
+        for message_label in self.message_label_list:
+            self.render_layer.set_text(message_label, '')
 
     def set_header(self, header):
-        self.header_label.text = header
+        self.render_layer.set_text(self.header_label, header)
 
     def set_to_error(self):
-        self.header_label.text = 'Error'
+        self.set_header(constants.ERROR_HEADER_STR)
 
     def set_to_abort(self):
-        self.header_label.text = 'Abort'
+        self.set_header(constants.ABORT_HEADER_STR)
         
     def set_to_about(self):
-        self.header_label.text = 'About'
-
-    def show(self):
-        board.DISPLAY.root_group = self.group
+        self.set_header(constants.ABOUT_HEADER_STR)
 
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import constants
+
+
+class NormCache:
+
+    def __init__(self, max_age, filename=None, save_interval=constants.NORM_CACHE_SAVE_DT):
+        # Normalization samples keyed by sensor, gain and integration time. Each
+        # entry expires max_age seconds after it was captured. When filename is
+        # given the cache is persisted so it survives a reboot; as there is no
+        # real time clock, ages only count time the device is running. Ages are
+        # saved at least every save_interval seconds by update() and, as the
+        # time since the last save is lost at a reboot, restored entries are
+        # taken to be save_interval older than saved.
+        self.max_age = max_age
+        self.filename = filename
+        self.save_interval = save_interval
+        self.entries = {}
+        if self.filename is not None:
+            self.load()
+
+    def get(self, sensor_name, gain, itime):
+        key = sensor_name, gain, itime
+        try:
+            value, timestamp = self.entries[key]
+        except KeyError:
+            return None
+        if time.monotonic() - timestamp > self.max_age:
+            del self.entries[key]
+            if self.filename is not None:
+                self.save()
+            return None
+        return value
+
+    def update(self):
+        # Drops expired entries and saves the ages of the others, called
+        # every save_interval seconds
+        if not self.entries:
+            return
+        now = time.monotonic()
+        for key in [k for (k, (v, t)) in self.entries.items() if now - t > self.max_age]:
+            del self.entries[key]
+        if self.filename is not None:
+            self.save()
+
+    def put(self, sensor_name, gain, itime, value):
+        key = sensor_name, gain, itime
+        if value is None:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = (float(value), time.monotonic())
+        if self.filename is not None:
+            self.save()
+
+    def drop_sensor(self, sensor_name):
+        # Drops the entries of one sensor at every setting, e.g. when its
+        # blank offsets have changed
+        keys = [k for k in self.entries if k[0] == sensor_name]
+        if not keys:
+            return
+        for key in keys:
+            del self.entries[key]
+        if self.filename is not None:
+            self.save()
+
+    def clear(self):
+        self.entries = {}
+        if self.filename is not None:
+            self.save()
+
+    def load(self):
+        if self.filename not in os.listdir():
+            return
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+            now = time.monotonic()
+            for sensor_name, gain, itime, value, age in data:
+                age += self.save_interval
+                if age <= self.max_age:
+                    self.entries[sensor_name, gain, itime] = (float(value), now - age)
+        except (OSError, ValueError, TypeError):
+            self.entries = {}
+
+    def save(self):
+        # Entries are saved with their age rather than a timestamp
+        now = time.monotonic()
+        data = [list(k) + [v, now - t] for (k, (v, t)) in self.entries.items()]
+        try:
+            with open(self.filename, 'w') as f:
+                json.dump(data, f)
+        except OSError:
+            # Filesystem is read-only while mounted over USB
+            pass
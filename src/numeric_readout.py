@@ -0,0 +1,190 @@
+import displayio
+import constants
+
+# Fixed width readout for measurement values. The characters a value can be
+# made of are drawn into a sprite sheet once per font and a value is shown by
+# setting the tile indices of a TileGrid in place, so updating a number
+# doesn't build strings or lay out glyphs. Only tiles which change are written.
+
+NUMERIC_CHARS = ' 0123456789.-+_*'
+READOUT_CHARS = NUMERIC_CHARS + constants.OVERFLOW_STR + constants.RANGE_ERROR_STR + 'nan'
+
+# Zeros are drawn as the letter O, as on the label based screens
+GLYPH_SUBSTITUTIONS = {'0': 'O'}
+
+# Shown in every position when a value doesn't fit
+FILL_CHAR = '*'
+
+POWERS_OF_10 = tuple(10**n for n in range(10))
+
+_sprite_sheets = {}
+
+
+class SpriteSheet:
+
+    def __init__(self, font, chars):
+        # One cell per character, in order, on a two color bitmap with the
+        # glyphs' baselines aligned.
+        self.chars = ''
+        for c in chars:
+            if c not in self.chars:
+                self.chars += c
+        self.char_to_tile = {c:i for (i,c) in enumerate(self.chars)}
+        cell_width, cell_height, bbox_dx, bbox_dy = font.get_bounding_box()
+        for c in self.chars:
+            glyph = font.get_glyph(ord(GLYPH_SUBSTITUTIONS.get(c, c)))
+            if glyph is not None:
+                cell_width = max(cell_width, glyph.shift_x)
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.bitmap = displayio.Bitmap(cell_width*len(self.chars), cell_height, 2)
+        baseline = cell_height + bbox_dy
+        for tile, c in enumerate(self.chars):
+            glyph = font.get_glyph(ord(GLYPH_SUBSTITUTIONS.get(c, c)))
+            if glyph is None or c == ' ':
+                continue
+            x0 = tile*cell_width + glyph.dx - bbox_dx
+            y0 = baseline - glyph.dy - glyph.height
+            self.blit(glyph, x0, y0, tile*cell_width)
+
+    def blit(self, glyph, x0, y0, cell_x):
+        # Copies the set pixels of the glyph, clipped to its cell
+        glyph_x = glyph.tile_index*glyph.width
+        for y in range(glyph.height):
+            if not 0 <= y0 + y < self.cell_height:
+                continue
+            for x in range(glyph.width):
+                if not cell_x <= x0 + x < cell_x + self.cell_width:
+                    continue
+                if glyph.bitmap[glyph_x + x, y]:
+                    self.bitmap[x0 + x, y0 + y] = 1
+
+
+def sprite_sheet(font, chars=READOUT_CHARS):
+    # Sheets are shared by all readouts using the same font and characters
+    key = id(font), chars
+    try:
+        return _sprite_sheets[key]
+    except KeyError:
+        pass
+    sheet = SpriteSheet(font, chars)
+    _sprite_sheets[key] = sheet
+    return sheet
+
+
+class NumericReadout:
+
+    def __init__(self, font, num_chars, color, anchored_position, extra_chars='', render_layer=None):
+        # Left aligned and vertically centred on anchored_position, like a
+        # label with anchor_point (0.0, 0.5). extra_chars adds characters, e.g.
+        # those of the units, to the ones which can be shown. Changes are
+        # flagged on the screen's render_layer when given.
+        self.render_layer = render_layer
+        self.sheet = sprite_sheet(font, READOUT_CHARS + extra_chars)
+        self.num_chars = num_chars
+        self.palette = displayio.Palette(2)
+        self.palette.make_transparent(0)
+        self.palette[1] = color
+        self.color = color
+        self.blank_tile = self.sheet.char_to_tile[' ']
+        self.digit_tiles = tuple(self.sheet.char_to_tile[c] for c in '0123456789')
+        self.tiles = bytearray([self.blank_tile]*num_chars)
+        self.tile_grid = displayio.TileGrid(
+                self.sheet.bitmap,
+                pixel_shader = self.palette,
+                width = num_chars,
+                height = 1,
+                tile_width = self.sheet.cell_width,
+                tile_height = self.sheet.cell_height,
+                default_tile = self.blank_tile,
+                )
+        x, y = anchored_position
+        self.tile_grid.x = x
+        self.tile_grid.y = y - self.sheet.cell_height//2
+        self.tiles_written = 0
+
+    def set_color(self, color):
+        if color != self.color:
+            self.palette[1] = color
+            self.color = color
+            self.mark_dirty()
+
+    def set_tile(self, pos, tile):
+        if self.tiles[pos] != tile:
+            self.tiles[pos] = tile
+            self.tile_grid[pos] = tile
+            self.tiles_written += 1
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        if self.render_layer is not None:
+            self.render_layer.dirty = True
+
+    def put_text(self, pos, text):
+        # Writes text from pos, returns the position after it
+        for c in text:
+            if pos >= self.num_chars:
+                break
+            self.set_tile(pos, self.sheet.char_to_tile.get(c, self.blank_tile))
+            pos += 1
+        return pos
+
+    def clear_from(self, pos):
+        for i in range(pos, self.num_chars):
+            self.set_tile(i, self.blank_tile)
+
+    def fill(self):
+        self.put_text(0, FILL_CHAR*self.num_chars)
+
+    def set_text(self, text):
+        self.clear_from(self.put_text(0, text))
+
+    def set_value(self, value, decimals=2, suffix=None):
+        # Shows value with the given number of decimal places (ints as they
+        # are), optionally followed by a space and suffix.
+        if type(value) == str:
+            self.set_text(value)
+            return
+        if value != value:
+            self.set_text('nan')
+            return
+        if type(value) != int:
+            scaled = abs(value)*POWERS_OF_10[decimals] + 0.5
+            if scaled >= POWERS_OF_10[-1]:
+                self.fill()
+                return
+            scaled = int(scaled)
+            negative = value < 0 and scaled != 0
+        else:
+            decimals = 0
+            scaled = abs(value)
+            if scaled >= POWERS_OF_10[-1]:
+                self.fill()
+                return
+            negative = value < 0
+        int_part = scaled//POWERS_OF_10[decimals]
+        num_int = 1
+        while num_int < len(POWERS_OF_10) and int_part >= POWERS_OF_10[num_int]:
+            num_int += 1
+        size = negative + num_int + (decimals + 1 if decimals else 0)
+        if size > self.num_chars:
+            self.fill()
+            return
+
+        pos = 0
+        if negative:
+            pos = self.put_text(pos, '-')
+        pos += num_int
+        for i in range(pos - 1, pos - num_int - 1, -1):
+            self.set_tile(i, self.digit_tiles[int_part%10])
+            int_part //= 10
+        if decimals:
+            pos = self.put_text(pos, '.')
+            pos += decimals
+            for i in range(pos - 1, pos - decimals - 1, -1):
+                self.set_tile(i, self.digit_tiles[scaled%10])
+                scaled //= 10
+        if suffix:
+            pos = self.put_text(pos, ' ')
+            pos = self.put_text(pos, suffix)
+        self.clear_from(pos)
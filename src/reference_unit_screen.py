@@ -1,9 +1,13 @@
-import board
 import displayio
 import constants
 import fonts
 import adafruit_itertools
 from adafruit_display_text import label
+from render_layer import RenderLayer
+from numeric_readout import NumericReadout
+from screen_pool import COLOR_TO_INDEX
+from screen_pool import shared_palette
+from screen_pool import background_bitmap
 
 
 class ReferenceUnitScreen:
@@ -22,26 +26,28 @@ class ReferenceUnitScreen:
     UNITS_LABEL_X_POSITION = 90 
     UNITS_LABEL_Y_POSITION = VALUE_LABEL_Y_POSITION
 
+    NOISE_LABEL_X_POSITION = HEADER_LABEL_X_POSITION
+    NOISE_LABEL_Y_POSITION = VALUE_LABEL_Y_POSITION + 16
+
+    PROGRESS_LABEL_X_POSITION = HEADER_LABEL_X_POSITION
+    PROGRESS_LABEL_Y_POSITION = 86
+
     BATTERY_LABEL_X_POSITION = 30      
     BATTERY_LABEL_Y_POSITION = 114
 
+    VALUE_NUM_CHARS = 9
+
     SENSOR_INDICES = [0,1]
 
 
     def __init__(self):
-        # Setup color palette
-        self.color_to_index = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
-        self.palette = displayio.Palette(len(constants.COLOR_TO_RGB))
-        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
-            self.palette[i] = palette_tuple[1]   
-
-        # Create tile grid
-        self.bitmap = displayio.Bitmap( 
-                board.DISPLAY.width, 
-                board.DISPLAY.height, 
-                len(constants.COLOR_TO_RGB)
-                )
-        self.bitmap.fill(self.color_to_index['black'])
+        # Only labels whose text or color changed are touched on update
+        self.render_layer = RenderLayer()
+
+        # Palette and background bitmap are shared by all screens
+        self.color_to_index = COLOR_TO_INDEX
+        self.palette = shared_palette()
+        self.bitmap = background_bitmap()
         self.tile_grid = displayio.TileGrid(self.bitmap,pixel_shader=self.palette)
         font_scale = 1
 
@@ -49,7 +55,7 @@ class ReferenceUnitScreen:
         header_str = 'header'
         text_color = constants.COLOR_TO_RGB['white']
         self.header_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = header_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -60,27 +66,20 @@ class ReferenceUnitScreen:
                 self.HEADER_LABEL_Y_POSITION,
                 )
 
-        # Create value text label
-        dummy_value = 0.0
-        value_str = f'{dummy_value:1.2f}'.replace('0','O')
-        text_color = constants.COLOR_TO_RGB['orange']
-        self.value_label = label.Label(
-                fonts.font_10pt, 
-                text = value_str, 
-                color = text_color, 
-                scale = font_scale,
-                anchor_point = self.ANCHOR_POINT,
-                )
-        self.value_label.anchored_position = (
-                self.VALUE_LABEL_X_POSITION,
-                self.VALUE_LABEL_Y_POSITION, 
+        # Create value readout
+        self.value_readout = NumericReadout(
+                fonts.font_10pt(),
+                self.VALUE_NUM_CHARS,
+                constants.COLOR_TO_RGB['orange'],
+                (self.VALUE_LABEL_X_POSITION, self.VALUE_LABEL_Y_POSITION),
+                render_layer = self.render_layer,
                 )
 
         # Create units text label
         units_str = ' '
         text_color = constants.COLOR_TO_RGB['orange']
         self.units_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = units_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -91,12 +90,42 @@ class ReferenceUnitScreen:
                 self.UNITS_LABEL_Y_POSITION, 
                 )
 
+        # Create noise text label, shown when smoothing
+        noise_str = ' '
+        text_color = constants.COLOR_TO_RGB['gray']
+        self.noise_label = label.Label(
+                fonts.font_10pt(), 
+                text = noise_str, 
+                color = text_color, 
+                scale = font_scale,
+                anchor_point = self.ANCHOR_POINT,
+                )
+        self.noise_label.anchored_position = (
+                self.NOISE_LABEL_X_POSITION,
+                self.NOISE_LABEL_Y_POSITION, 
+                )
+
+        # Create normalization progress text label
+        progress_str = ' '
+        text_color = constants.COLOR_TO_RGB['gray']
+        self.progress_label = label.Label(
+                fonts.font_10pt(), 
+                text = progress_str, 
+                color = text_color, 
+                scale = font_scale,
+                anchor_point = self.ANCHOR_POINT,
+                )
+        self.progress_label.anchored_position = (
+                self.PROGRESS_LABEL_X_POSITION,
+                self.PROGRESS_LABEL_Y_POSITION, 
+                )
+
         # Create integration time/window text label
         #bat_str = 'battery 100%'
         bat_str = 'battery 0.0V'
         text_color = constants.COLOR_TO_RGB['gray']
         self.bat_label = label.Label(
-                fonts.font_10pt, 
+                fonts.font_10pt(), 
                 text = bat_str, 
                 color = text_color, 
                 scale = font_scale,
@@ -111,46 +140,59 @@ class ReferenceUnitScreen:
         self.group = displayio.Group()
         self.group.append(self.tile_grid)
         self.group.append(self.header_label)
-        self.group.append(self.value_label)
+        self.group.append(self.value_readout.tile_grid)
         self.group.append(self.units_label)
+        self.group.append(self.noise_label)
+        self.group.append(self.progress_label)
         self.group.append(self.bat_label)
 
     @property
     def has_selected_sensor(self):
         return False 
 
+    def reset(self):
+        self.set_progress(None)
+
     def set_measurement(self, measurement):
         name  = measurement.label
         value = measurement.value
         units = measurement.units
-        self.header_label.text = f'{name}'
-        if type(value) == float:
-            if value <= 10:
-                value_text = f'{value:.3f}'
-            else:
-                value_text = f'{value:.2f}'
-        else: 
-            value_text = f'{value}'
-        self.value_label.text = value_text.replace('0','O')
+        self.render_layer.set_text(self.header_label, f'{name}')
+        if type(value) == float and value <= 10:
+            self.value_readout.set_value(value, 3)
+        else:
+            self.value_readout.set_value(value, 2)
         if measurement.units is None:
             units_text = ''
         else:
             units_text = f'{units}'
-        self.units_label.text = units_text
+        self.render_layer.set_text(self.units_label, units_text)
             
-        if value == constants.OVERFLOW_STR:
+        if value in (constants.OVERFLOW_STR, constants.RANGE_ERROR_STR):
             color = constants.COLOR_TO_RGB['red']
         else:
             color = constants.COLOR_TO_RGB['orange']
-        self.value_label.color = color
+        self.value_readout.set_color(color)
 
-    def set_bat(self, value):
-        self.bat_label.text = f'battery {value:1.1f}V'
+    def set_progress(self, progress):
+        if progress is None:
+            self.render_layer.set_text(self.progress_label, ' ')
+        else:
+            self.render_layer.set_text(self.progress_label, f'normalizing {int(100*progress)}%')
 
-    def show(self):
-        board.DISPLAY.root_group = self.group
+    def set_noise(self, value):
+        if value is None:
+            self.render_layer.set_text(self.noise_label, ' ')
+        else:
+            self.render_layer.set_text(self.noise_label, f'noise {100*value:1.2f}%')
+
+    def set_bat(self, value):
+        self.render_layer.set_text(self.bat_label, f'battery {value:1.1f}V')
 
     def update(self, measurement, battery_monitor): 
+        self.render_layer.begin_frame()
         self.set_measurement(measurement)
+        self.set_progress(measurement.norm_progress)
+        self.set_noise(measurement.noise)
         self.set_bat(battery_monitor.voltage_lowpass)
 
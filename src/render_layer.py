@@ -0,0 +1,69 @@
+class RenderLayer:
+
+    def __init__(self):
+        # Remembers the last text and color written to each label so that
+        # unchanged values don't touch the label. On the device every text or
+        # color assignment lays out the glyphs again and dirties the label's
+        # area, even when the value is the same. Labels are keyed by id so a
+        # render layer should only be used for labels which outlive it, e.g.
+        # those of the screen owning it. dirty is set by any change, also by
+        # other widgets drawing into the same screen, until taken by the
+        # display manager.
+        self.text = {}
+        self.color = {}
+        self.background_color = {}
+        self.dirty = False
+        self.frame_updates = 0
+        self.frame_skips = 0
+        self.last_frame_updates = 0
+        self.last_frame_skips = 0
+        self.total_updates = 0
+        self.total_skips = 0
+
+    def begin_frame(self):
+        self.last_frame_updates = self.frame_updates
+        self.last_frame_skips = self.frame_skips
+        self.frame_updates = 0
+        self.frame_skips = 0
+
+    def set_text(self, label, text):
+        key = id(label)
+        if self.text.get(key) == text:
+            self.skip()
+            return
+        label.text = text
+        self.text[key] = text
+        self.update()
+
+    def set_color(self, label, color):
+        key = id(label)
+        if self.color.get(key) == color:
+            self.skip()
+            return
+        label.color = color
+        self.color[key] = color
+        self.update()
+
+    def set_background_color(self, label, color):
+        key = id(label)
+        if self.background_color.get(key) == color:
+            self.skip()
+            return
+        label.background_color = color
+        self.background_color[key] = color
+        self.update()
+
+    def take_dirty(self):
+        # Returns whether anything changed since the last call
+        dirty = self.dirty
+        self.dirty = False
+        return dirty
+
+    def update(self):
+        self.frame_updates += 1
+        self.total_updates += 1
+        self.dirty = True
+
+    def skip(self):
+        self.frame_skips += 1
+        self.total_skips += 1
@@ -0,0 +1,54 @@
+import asyncio
+from adafruit_ticks import ticks_ms
+from adafruit_ticks import ticks_add
+from adafruit_ticks import ticks_diff
+
+
+class PeriodicTask:
+
+    def __init__(self, name, func, period, deadline=None):
+        # Calls func every period seconds. A run starting more than deadline
+        # seconds (default one period) after it was due counts as a missed
+        # deadline and the schedule is resynchronized rather than bunched up.
+        self.name = name
+        self.func = func
+        self.period_ms = int(1000*period)
+        if deadline is None:
+            self.deadline_ms = self.period_ms
+        else:
+            self.deadline_ms = int(1000*deadline)
+        self.run_count = 0
+        self.missed_deadlines = 0
+        self.max_lateness_ms = 0
+
+    async def run(self):
+        due_ms = ticks_ms()
+        while True:
+            lateness_ms = ticks_diff(ticks_ms(), due_ms)
+            if lateness_ms > self.max_lateness_ms:
+                self.max_lateness_ms = lateness_ms
+            if lateness_ms > self.deadline_ms:
+                self.missed_deadlines += 1
+                due_ms = ticks_ms()
+            self.func()
+            self.run_count += 1
+            due_ms = ticks_add(due_ms, self.period_ms)
+            delay_ms = ticks_diff(due_ms, ticks_ms())
+            await asyncio.sleep(max(delay_ms, 0)/1000)
+
+
+class Scheduler:
+
+    def __init__(self):
+        self.tasks = []
+
+    def add(self, name, func, period, deadline=None):
+        task = PeriodicTask(name, func, period, deadline)
+        self.tasks.append(task)
+        return task
+
+    async def main(self):
+        await asyncio.gather(*[asyncio.create_task(task.run()) for task in self.tasks])
+
+    def run(self):
+        asyncio.run(self.main())
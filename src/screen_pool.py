@@ -0,0 +1,59 @@
+import board
+import displayio
+import constants
+
+# Palette and background bitmap shared by all screens. Each screen still has
+# its own TileGrid, displayio only allows a layer to be in one group at a time,
+# but a TileGrid is small compared to a full display bitmap.
+
+COLOR_TO_INDEX = {k:i for (i,k) in enumerate(constants.COLOR_TO_RGB)}
+
+_palette = None
+_background_bitmap = None
+
+
+def shared_palette():
+    global _palette
+    if _palette is None:
+        _palette = displayio.Palette(len(constants.COLOR_TO_RGB))
+        for i, palette_tuple in enumerate(constants.COLOR_TO_RGB.items()):
+            _palette[i] = palette_tuple[1]
+    return _palette
+
+
+def background_bitmap():
+    global _background_bitmap
+    if _background_bitmap is None:
+        _background_bitmap = displayio.Bitmap(
+                board.DISPLAY.width,
+                board.DISPLAY.height,
+                len(constants.COLOR_TO_RGB)
+                )
+        _background_bitmap.fill(COLOR_TO_INDEX['black'])
+    return _background_bitmap
+
+
+class ScreenPool:
+
+    def __init__(self):
+        # One instance of each screen class, built on first use (or by
+        # preload) and reused afterwards so switching modes doesn't allocate.
+        self.screens = {}
+
+    def preload(self, screen_classes):
+        # Builds the screens not yet in the pool, those already built are left
+        # alone as one of them may be showing
+        for screen_class in screen_classes:
+            if screen_class is not None and screen_class not in self.screens:
+                self.get(screen_class)
+
+    def get(self, screen_class):
+        # Returns the pooled screen, reset to its freshly built state
+        try:
+            screen = self.screens[screen_class]
+        except KeyError:
+            screen = screen_class()
+            self.screens[screen_class] = screen
+        else:
+            screen.reset()
+        return screen
@@ -0,0 +1,250 @@
+import os
+import struct
+import binascii
+import constants
+from collections import OrderedDict
+
+# Binary cache of a checked json settings file. Layout, little endian:
+#
+#   header  magic, firmware version, source size, source mtime, source crc32,
+#           number of entries
+#   index   per entry: key length (u8), key, offset (u32), length (u32)
+#   errors  length (u32), encoded error dict
+#   entries encoded values at the offsets given in the index
+#
+# Values are encoded with a one byte type tag, see encode. Entries are
+# decoded one at a time on first access so only the ones in use take up RAM.
+# The cache is written to a temporary file which then replaces the old one,
+# so a write cut short by a reset leaves either the old cache or none.
+
+MAGIC = b'JSC2'
+VERSION_SIZE = 16
+HEADER_FORMAT = f'<4s{VERSION_SIZE}sIIIH'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_FORMAT = '<II'
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+FIRMWARE_VERSION = constants.__version__.encode('utf-8')[:VERSION_SIZE]
+
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+MAX_COUNT = 0xffff
+MAX_KEY_LENGTH = 0xff
+
+TAG_NONE  = ord('N')
+TAG_TRUE  = ord('T')
+TAG_FALSE = ord('F')
+TAG_INT   = ord('i')
+TAG_FLOAT = ord('f')
+TAG_STR   = ord('s')
+TAG_LIST  = ord('l')
+TAG_DICT  = ord('d')
+
+
+class SettingsCacheError(Exception):
+    pass
+
+
+def source_stat(filename):
+    # Returns (size, mtime) of the source file, raises OSError if missing
+    stat = os.stat(filename)
+    return stat[6], int(stat[8])
+
+
+def source_crc(data):
+    return binascii.crc32(data) & 0xffffffff
+
+
+def encode(value, parts):
+    if value is None:
+        parts.append(struct.pack('<B', TAG_NONE))
+    elif value is True:
+        parts.append(struct.pack('<B', TAG_TRUE))
+    elif value is False:
+        parts.append(struct.pack('<B', TAG_FALSE))
+    elif type(value) == int:
+        if not INT_MIN <= value <= INT_MAX:
+            raise SettingsCacheError('int too large to encode')
+        parts.append(struct.pack('<Bq', TAG_INT, value))
+    elif type(value) == float:
+        parts.append(struct.pack('<Bd', TAG_FLOAT, value))
+    elif type(value) == str:
+        data = value.encode('utf-8')
+        check_count(len(data))
+        parts.append(struct.pack('<BH', TAG_STR, len(data)))
+        parts.append(data)
+    elif isinstance(value, (list, tuple)):
+        check_count(len(value))
+        parts.append(struct.pack('<BH', TAG_LIST, len(value)))
+        for item in value:
+            encode(item, parts)
+    elif isinstance(value, dict):
+        check_count(len(value))
+        parts.append(struct.pack('<BH', TAG_DICT, len(value)))
+        for k, v in value.items():
+            encode(k, parts)
+            encode(v, parts)
+    else:
+        raise SettingsCacheError(f'unable to encode {type(value)}')
+    return parts
+
+
+def check_count(n):
+    if n > MAX_COUNT:
+        raise SettingsCacheError('value too long to encode')
+
+
+def decode(data, pos=0):
+    # Returns (value, position after value)
+    tag = data[pos]
+    pos += 1
+    if tag == TAG_NONE:
+        return None, pos
+    if tag == TAG_TRUE:
+        return True, pos
+    if tag == TAG_FALSE:
+        return False, pos
+    if tag == TAG_INT:
+        return struct.unpack_from('<q', data, pos)[0], pos + 8
+    if tag == TAG_FLOAT:
+        return struct.unpack_from('<d', data, pos)[0], pos + 8
+    if tag == TAG_STR:
+        n = struct.unpack_from('<H', data, pos)[0]
+        pos += 2
+        return str(data[pos:pos+n], 'utf-8'), pos + n
+    if tag == TAG_LIST:
+        n = struct.unpack_from('<H', data, pos)[0]
+        pos += 2
+        items = []
+        for i in range(n):
+            item, pos = decode(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == TAG_DICT:
+        n = struct.unpack_from('<H', data, pos)[0]
+        pos += 2
+        items = {}
+        for i in range(n):
+            k, pos = decode(data, pos)
+            items[k], pos = decode(data, pos)
+        return items, pos
+    raise SettingsCacheError(f'unknown type tag {tag}')
+
+
+def write(filename, data, error_dict, size, mtime, crc):
+    keys = [str(k).encode('utf-8') for k in data]
+    for key in keys:
+        if len(key) > MAX_KEY_LENGTH:
+            raise SettingsCacheError('key too long to encode')
+    check_count(len(keys))
+    blobs = [b''.join(encode(v, [])) for v in data.values()]
+    errors = b''.join(encode(error_dict, []))
+
+    offset = HEADER_SIZE
+    offset += sum([1 + len(k) + INDEX_SIZE for k in keys])
+    offset += 4 + len(errors)
+
+    tmp_filename = f'{filename}.tmp'
+    with open(tmp_filename, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, FIRMWARE_VERSION, size, mtime, crc, len(keys)))
+        for key, blob in zip(keys, blobs):
+            f.write(struct.pack('<B', len(key)))
+            f.write(key)
+            f.write(struct.pack(INDEX_FORMAT, offset, len(blob)))
+            offset += len(blob)
+        f.write(struct.pack('<I', len(errors)))
+        f.write(errors)
+        for blob in blobs:
+            f.write(blob)
+    # rename doesn't replace an existing file on the device
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+    os.rename(tmp_filename, filename)
+
+
+def read_header(filename):
+    # Returns (size, mtime, crc) of the source the cache was made from
+    with open(filename, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE:
+        raise SettingsCacheError('cache header truncated')
+    magic, version, size, mtime, crc, num = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC:
+        raise SettingsCacheError('not a settings cache')
+    if version.rstrip(b'\x00') != FIRMWARE_VERSION:
+        # Made by another firmware, whose checks may differ
+        raise SettingsCacheError('cache from another firmware version')
+    return size, mtime, crc
+
+
+def read_exactly(f, n):
+    data = f.read(n)
+    if len(data) != n:
+        raise SettingsCacheError('cache truncated')
+    return data
+
+
+def read(filename):
+    # Returns (lazy data, error dict). Only the index and errors are read,
+    # the entries are checked to lie within the file.
+    file_size = os.stat(filename)[6]
+    index = OrderedDict()
+    with open(filename, 'rb') as f:
+        header = read_exactly(f, HEADER_SIZE)
+        num = struct.unpack(HEADER_FORMAT, header)[-1]
+        for i in range(num):
+            n = read_exactly(f, 1)[0]
+            key = str(read_exactly(f, n), 'utf-8')
+            index[key] = struct.unpack(INDEX_FORMAT, read_exactly(f, INDEX_SIZE))
+        n = struct.unpack('<I', read_exactly(f, 4))[0]
+        error_dict, pos = decode(read_exactly(f, n))
+        entries_pos = f.tell()
+    for offset, length in index.values():
+        if offset < entries_pos or offset + length > file_size:
+            raise SettingsCacheError('cache entry out of range')
+    return LazySettings(filename, index), error_dict
+
+
+class LazySettings:
+
+    # Read only mapping backed by a settings cache file. Values are decoded
+    # from the file on first access and kept.
+
+    def __init__(self, filename, index):
+        self.filename = filename
+        self.index = index
+        self.cache = {}
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __getitem__(self, key):
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        offset, length = self.index[key]
+        with open(self.filename, 'rb') as f:
+            f.seek(offset)
+            blob = f.read(length)
+        value, pos = decode(blob)
+        self.cache[key] = value
+        return value
+
+    def get(self, key, default=None):
+        if key in self.index:
+            return self[key]
+        return default
+
+    def keys(self):
+        return self.index.keys()
+
+    def items(self):
+        return [(k, self[k]) for k in self.index]
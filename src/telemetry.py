@@ -0,0 +1,140 @@
+import struct
+import binascii
+import constants
+from adafruit_ticks import ticks_ms
+
+# Binary frames sent on the USB CDC data channel, little endian
+#
+#   sync (2 bytes), type (u8), payload length (u16), sequence number (u16),
+#   payload, crc32 of type through payload (u32)
+#
+# Commands from the host, see command_interpreter.py, use the same framing.
+# The sync bytes and crc let a reader find frame boundaries again after
+# dropped or corrupted bytes and the sequence number shows lost frames.
+
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_HEADER_FORMAT = '<2sBHH'
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER_FORMAT)
+FRAME_CRC_FORMAT = '<I'
+FRAME_CRC_SIZE = struct.calcsize(FRAME_CRC_FORMAT)
+
+# Acquisition payload: ticks (ms), paired frame count, sensor 90 counts (ch0,
+# ch1), sensor 180 counts (ch0, ch1), sensor 90 gain, itime, sensor 180 gain,
+# itime
+FRAME_TYPE_ACQUISITION = 1
+ACQUISITION_FORMAT = '<IIHHHHBBBB'
+ACQUISITION_SIZE = struct.calcsize(ACQUISITION_FORMAT)
+
+
+def frame_buffer(payload_size):
+    # Buffer for a whole frame, the payload goes at FRAME_HEADER_SIZE
+    return bytearray(FRAME_HEADER_SIZE + payload_size + FRAME_CRC_SIZE)
+
+
+class Telemetry:
+
+    def __init__(self, serial, buffer_size=constants.TELEMETRY_BUFFER_SIZE):
+        # Frames are packed into a transmit buffer and written to the serial
+        # port without blocking, whatever doesn't fit is left for pump(). When
+        # the host isn't reading, or there is no room for a whole frame, the
+        # frame is dropped rather than stalling the caller. Blocks sent with
+        # send_block, e.g. command responses, are never dropped while the host
+        # is connected; streaming frames are dropped while they are queued.
+        self.serial = serial
+        self.serial.write_timeout = 0
+        self.buffer = bytearray(buffer_size)
+        self.buffer_view = memoryview(self.buffer)
+        self.pending = 0
+        self.blocks = []
+        self.seq = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def send(self, frame_type, payload_format, payload_size, *values):
+        if not self.serial.connected:
+            self.pending = 0
+            self.blocks = []
+            self.frames_dropped += 1
+            return False
+        frame_size = FRAME_HEADER_SIZE + payload_size + FRAME_CRC_SIZE
+        if self.blocks or self.pending + frame_size > len(self.buffer):
+            self.frames_dropped += 1
+            self.pump()
+            return False
+        pos = self.pending
+        struct.pack_into(payload_format, self.buffer, pos + FRAME_HEADER_SIZE, *values)
+        self.seal(self.buffer, pos, frame_type, payload_size)
+        self.pending += frame_size
+        self.pump()
+        return True
+
+    def send_block(self, frame_type, frame):
+        # frame is from frame_buffer() with the payload filled in
+        if not self.serial.connected:
+            return False
+        payload_size = len(frame) - FRAME_HEADER_SIZE - FRAME_CRC_SIZE
+        self.seal(frame, 0, frame_type, payload_size)
+        self.blocks.append(memoryview(frame))
+        self.pump()
+        return True
+
+    def seal(self, buffer, pos, frame_type, payload_size):
+        # Fills in the header and crc of the frame at pos
+        struct.pack_into(
+                FRAME_HEADER_FORMAT,
+                buffer,
+                pos,
+                FRAME_SYNC,
+                frame_type,
+                payload_size,
+                self.seq,
+                )
+        crc_pos = pos + FRAME_HEADER_SIZE + payload_size
+        crc = binascii.crc32(memoryview(buffer)[pos + len(FRAME_SYNC):crc_pos]) & 0xffffffff
+        struct.pack_into(FRAME_CRC_FORMAT, buffer, crc_pos, crc)
+        self.seq = (self.seq + 1) & 0xffff
+        self.frames_sent += 1
+
+    def send_acquisition(self, sensors, frame_count):
+        sensor_90, sensor_180 = sensors
+        return self.send(
+                FRAME_TYPE_ACQUISITION,
+                ACQUISITION_FORMAT,
+                ACQUISITION_SIZE,
+                ticks_ms(),
+                frame_count,
+                sensor_90.sample[0],
+                sensor_90.sample[1],
+                sensor_180.sample[0],
+                sensor_180.sample[1],
+                sensor_90.sample_gain,
+                sensor_90.sample_integration_time,
+                sensor_180.sample_gain,
+                sensor_180.sample_integration_time,
+                )
+
+    def pump(self):
+        # Writes as much as the port will take. The transmit buffer is always
+        # emptied before blocks are written so frames are never interleaved.
+        if self.pending:
+            num = self.write(self.buffer_view[:self.pending])
+            remaining = self.pending - num
+            if num:
+                self.buffer_view[:remaining] = self.buffer_view[num:self.pending]
+                self.pending = remaining
+            if remaining:
+                return
+        while self.blocks:
+            block = self.blocks[0]
+            num = self.write(block)
+            if num < len(block):
+                self.blocks[0] = block[num:]
+                return
+            self.blocks.pop(0)
+
+    def write(self, data):
+        try:
+            num = self.serial.write(data)
+        except OSError:
+            num = 0
+        return num or 0
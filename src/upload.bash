@@ -1,7 +1,7 @@
 for entry in *
 do
     case $entry in 
-        code.py)
+        code.py|boot.py)
             echo $entry "->" /media/$USER/CIRCUITPY
             cp $entry /media/$USER/CIRCUITPY
             ;;
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The firmware modules in src run on CPython against the CircuitPython
+# stand-ins in sim/modules, as they do in the simulation. They go after the
+# standard library, which src/code.py would otherwise shadow.
+sys.path.insert(0, REPO_ROOT)
+sys.path.append(os.path.join(REPO_ROOT, 'sim', 'modules'))
+sys.path.append(os.path.join(REPO_ROOT, 'src'))
+
+from sim.simulation import Simulation
+
+
+@pytest.fixture
+def simulation():
+    # Simulated clock, display and serial port; the working directory is a
+    # temporary CIRCUITPY drive for the duration of the test
+    with Simulation() as sim:
+        yield sim
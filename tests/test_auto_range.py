@@ -0,0 +1,104 @@
+import constants
+from auto_range import AutoRange
+from auto_range import sensitivity_from_settings
+from light_sensor import LightSensorTSL2591
+
+GAIN_LOW = constants.STR_TO_GAIN['low']
+GAIN_MED = constants.STR_TO_GAIN['med']
+GAIN_MAX = constants.STR_TO_GAIN['max']
+ITIME_100MS = constants.STR_TO_INTEGRATION_TIME['100ms']
+ITIME_300MS = constants.STR_TO_INTEGRATION_TIME['300ms']
+ITIME_600MS = constants.STR_TO_INTEGRATION_TIME['600ms']
+
+
+class FakeSensor:
+
+    # The parts of LightSensorTSL2591 AutoRange uses, with a sample taken at
+    # the current settings
+
+    def __init__(self, gain, integration_time, counts):
+        self.gain = gain
+        self.integration_time = integration_time
+        self.sample = counts, counts//10
+        self.sample_gain = gain
+        self.sample_integration_time = integration_time
+
+    @property
+    def sample_max_counts(self):
+        if self.sample_integration_time == ITIME_100MS:
+            return LightSensorTSL2591.TSL2591_MAX_COUNT_100MS
+        return LightSensorTSL2591.TSL2591_MAX_COUNT
+
+
+def test_table_sorted_by_sensitivity():
+    auto_range = AutoRange()
+    sensitivities = [item[0] for item in auto_range.table]
+    assert len(sensitivities) == len(constants.STR_TO_GAIN)*len(constants.STR_TO_INTEGRATION_TIME)
+    assert sensitivities == sorted(sensitivities)
+    assert auto_range.table[0][1:] == (GAIN_LOW, ITIME_100MS)
+    assert auto_range.table[-1][1:] == (GAIN_MAX, ITIME_600MS)
+
+
+def test_find_setting():
+    auto_range = AutoRange()
+    sensitivity = sensitivity_from_settings(GAIN_MED, ITIME_300MS)
+    assert auto_range.find_setting(sensitivity)[0] == sensitivity
+    assert auto_range.find_setting(1.01*sensitivity)[0] == sensitivity
+    # Below the least sensitive setting and above the most sensitive
+    assert auto_range.find_setting(0.0) == auto_range.table[0]
+    assert auto_range.find_setting(1.0e12) == auto_range.table[-1]
+
+
+def test_no_step_in_range():
+    auto_range = AutoRange()
+    sensor = FakeSensor(GAIN_MED, ITIME_300MS, 20000)
+    assert not auto_range.update(sensor)
+    assert (sensor.gain, sensor.integration_time) == (GAIN_MED, ITIME_300MS)
+    assert auto_range.num_steps == 0
+
+
+def test_step_down_on_overflow():
+    auto_range = AutoRange()
+    sensor = FakeSensor(GAIN_MAX, ITIME_600MS, LightSensorTSL2591.TSL2591_MAX_COUNT)
+    sensitivity = sensitivity_from_settings(GAIN_MAX, ITIME_600MS)
+    assert auto_range.update(sensor)
+    new_sensitivity = sensitivity_from_settings(sensor.gain, sensor.integration_time)
+    assert new_sensitivity <= sensitivity/AutoRange.OVERFLOW_FACTOR
+    assert auto_range.num_steps == 1
+
+
+def test_step_down_near_max_counts():
+    auto_range = AutoRange()
+    counts = int(0.95*LightSensorTSL2591.TSL2591_MAX_COUNT)
+    sensor = FakeSensor(GAIN_MED, ITIME_600MS, counts)
+    assert auto_range.update(sensor)
+    # Expected counts at the new setting are at most the target
+    scale = sensitivity_from_settings(sensor.gain, sensor.integration_time)/sensitivity_from_settings(GAIN_MED, ITIME_600MS)
+    assert scale*counts <= AutoRange.TARGET_COUNTS
+
+
+def test_step_up_from_noise_floor():
+    auto_range = AutoRange()
+    counts = 50
+    sensor = FakeSensor(GAIN_LOW, ITIME_100MS, counts)
+    assert auto_range.update(sensor)
+    scale = sensitivity_from_settings(sensor.gain, sensor.integration_time)/sensitivity_from_settings(GAIN_LOW, ITIME_100MS)
+    assert scale > 1.0
+    assert scale*counts <= AutoRange.TARGET_COUNTS
+
+
+def test_no_step_past_the_end_of_the_table():
+    auto_range = AutoRange()
+    sensor = FakeSensor(GAIN_MAX, ITIME_600MS, 10)
+    assert not auto_range.update(sensor)
+    sensor = FakeSensor(GAIN_LOW, ITIME_100MS, LightSensorTSL2591.TSL2591_MAX_COUNT_100MS)
+    assert not auto_range.update(sensor)
+
+
+def test_next_setting_steps_from_current(simulation):
+    import colorimeter
+    gains = tuple(constants.GAIN_TO_STR)
+    assert colorimeter.next_setting(gains, gains[0]) == gains[1]
+    assert colorimeter.next_setting(gains, gains[-1]) == gains[0]
+    # A setting not in the list, e.g. before the sensor was set up
+    assert colorimeter.next_setting(gains, None) == gains[0]
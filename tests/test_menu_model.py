@@ -0,0 +1,70 @@
+from menu_model import MenuModel
+
+ITEMS = ['Absorbance', 'alkalinity', 'Ammonia', 'Chlorine', 'Copper', 'Iron', 'Nitrate', 'nitrite', 'Phosphate']
+
+
+def test_cursor_clamped():
+    model = MenuModel(ITEMS, num_rows=4)
+    model.move(-1)
+    assert (model.pos, model.view_pos) == (0, 0)
+    model.set_pos(100)
+    assert model.pos == len(ITEMS) - 1
+    assert model.item == 'Phosphate'
+
+
+def test_view_scrolls_as_little_as_possible():
+    model = MenuModel(ITEMS, num_rows=4)
+    model.move(3)
+    assert (model.pos, model.view_pos) == (3, 0)
+    model.move(1)
+    assert (model.pos, model.view_pos) == (4, 1)
+    model.move(-2)
+    assert (model.pos, model.view_pos) == (2, 1)
+    model.move(-2)
+    assert (model.pos, model.view_pos) == (0, 0)
+
+
+def test_paging():
+    model = MenuModel(ITEMS, num_rows=4)
+    model.page_down()
+    assert (model.pos, model.view_pos) == (4, 1)
+    model.page_down()
+    model.page_down()
+    assert (model.pos, model.view_pos) == (8, 5)
+    model.page_up()
+    assert (model.pos, model.view_pos) == (4, 4)
+    model.page_up()
+    model.page_up()
+    assert (model.pos, model.view_pos) == (0, 0)
+
+
+def test_set_num_rows_keeps_cursor_visible():
+    model = MenuModel(ITEMS)
+    model.set_pos(6)
+    assert model.view_pos == 6
+    model.set_num_rows(3)
+    assert (model.pos, model.view_pos) == (6, 6)
+    model.set_pos(8)
+    assert model.view_pos == 6
+    model.reset()
+    assert (model.pos, model.view_pos) == (0, 0)
+
+
+def test_next_letter_table():
+    model = MenuModel(ITEMS)
+    # Case is ignored and the last letter wraps round to the first
+    assert model.next_letter_pos == [3, 3, 3, 5, 5, 6, 8, 8, 0]
+    visited = []
+    for i in range(6):
+        model.jump_to_next_letter()
+        visited.append(model.item)
+    assert visited == ['Chlorine', 'Iron', 'Nitrate', 'Phosphate', 'Absorbance', 'Chlorine']
+
+
+def test_next_letter_single_letter():
+    model = MenuModel(['Nitrate', 'nitrite'])
+    assert model.next_letter_pos == [0, 0]
+    model.set_pos(1)
+    model.jump_to_next_letter()
+    assert model.pos == 0
+    assert MenuModel([]).next_letter_pos == []
@@ -0,0 +1,87 @@
+import json
+import time
+from norm_cache import NormCache
+
+FILENAME = 'norm_cache.json'
+
+
+def test_get_and_put(simulation):
+    cache = NormCache(max_age=100.0)
+    assert cache.get('sensor_180', 16, 2) is None
+    cache.put('sensor_180', 16, 2, 1000)
+    assert cache.get('sensor_180', 16, 2) == 1000.0
+    # Only for the settings it was taken with
+    assert cache.get('sensor_180', 16, 3) is None
+    assert cache.get('sensor_90', 16, 2) is None
+    cache.put('sensor_180', 16, 2, None)
+    assert cache.get('sensor_180', 16, 2) is None
+
+
+def test_entries_expire(simulation):
+    cache = NormCache(max_age=100.0)
+    cache.put('sensor_180', 16, 2, 1000.0)
+    time.sleep(99.0)
+    assert cache.get('sensor_180', 16, 2) == 1000.0
+    time.sleep(2.0)
+    assert cache.get('sensor_180', 16, 2) is None
+    assert not cache.entries
+
+
+def test_update_drops_expired_entries(simulation):
+    cache = NormCache(max_age=100.0)
+    cache.put('sensor_180', 16, 2, 1000.0)
+    time.sleep(50.0)
+    cache.put('sensor_180', 16, 3, 500.0)
+    time.sleep(60.0)
+    cache.update()
+    assert list(cache.entries) == [('sensor_180', 16, 3)]
+
+
+def test_drop_sensor(simulation):
+    cache = NormCache(max_age=100.0)
+    cache.put('sensor_180', 16, 2, 1000.0)
+    cache.put('sensor_180', 32, 2, 900.0)
+    cache.put('sensor_90', 16, 2, 800.0)
+    cache.drop_sensor('sensor_180')
+    assert list(cache.entries) == [('sensor_90', 16, 2)]
+
+
+def test_ages_persist_across_reboots(simulation):
+    cache = NormCache(max_age=100.0, filename=FILENAME, save_interval=10.0)
+    cache.put('sensor_180', 16, 2, 1000.0)
+    time.sleep(30.0)
+    cache.update()
+
+    # Restored entries are taken to be save_interval older than saved
+    time.sleep(500.0)
+    cache = NormCache(max_age=100.0, filename=FILENAME, save_interval=10.0)
+    value, timestamp = cache.entries['sensor_180', 16, 2]
+    assert value == 1000.0
+    assert abs((time.monotonic() - timestamp) - 40.0) < 1.0e-6
+
+    # and keep counting from there
+    time.sleep(55.0)
+    cache.update()
+    cache = NormCache(max_age=100.0, filename=FILENAME, save_interval=10.0)
+    assert cache.get('sensor_180', 16, 2) is None
+
+
+def test_expired_entries_not_restored(simulation):
+    cache = NormCache(max_age=100.0, filename=FILENAME, save_interval=10.0)
+    cache.put('sensor_180', 16, 2, 1000.0)
+    time.sleep(95.0)
+    cache.update()
+    cache = NormCache(max_age=100.0, filename=FILENAME, save_interval=10.0)
+    assert not cache.entries
+
+
+def test_bad_file_ignored(simulation):
+    # e.g. from an earlier firmware, keyed by a string
+    with open(FILENAME, 'w') as f:
+        json.dump({'sensor_180 16 2': [1000.0, 10.0]}, f)
+    cache = NormCache(max_age=100.0, filename=FILENAME)
+    assert not cache.entries
+    with open(FILENAME, 'w') as f:
+        f.write('not json')
+    cache = NormCache(max_age=100.0, filename=FILENAME)
+    assert not cache.entries
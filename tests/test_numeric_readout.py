@@ -0,0 +1,82 @@
+import pytest
+import fonts
+import constants
+from numeric_readout import NumericReadout
+
+
+class FakeRenderLayer:
+
+    def __init__(self):
+        self.dirty = False
+
+
+@pytest.fixture
+def readout(simulation):
+    return NumericReadout(fonts.font_10pt(), 8, 0xffffff, (0, 0), extra_chars='ppm')
+
+
+def shown(readout):
+    # The text the tiles spell, trailing blanks included
+    return ''.join(readout.sheet.chars[t] for t in readout.tiles)
+
+
+@pytest.mark.parametrize('value, decimals, text', [
+    (1.234, 2, '1.23    '),
+    (1.235, 2, '1.24    '),
+    (0.0, 3, '0.000   '),
+    (12.5, 0, '13      '),
+    (-1.5, 1, '-1.5    '),
+    (-0.001, 2, '0.00    '),
+    (42, 2, '42      '),
+    (-7, 2, '-7      '),
+    (9999999.0, 0, '9999999 '),
+    ])
+def test_numbers(readout, value, decimals, text):
+    readout.set_value(value, decimals)
+    assert shown(readout) == text
+
+
+def test_suffix(readout):
+    readout.set_value(1.5, 1, 'ppm')
+    assert shown(readout) == '1.5 ppm '
+    # Cut off at the end of the readout
+    readout.set_value(123.5, 1, 'ppm')
+    assert shown(readout) == '123.5 pp'
+
+
+def test_strings_and_nan(readout):
+    readout.set_value(constants.OVERFLOW_STR)
+    assert shown(readout) == 'OVFL    '
+    readout.set_value(float('nan'))
+    assert shown(readout) == 'nan     '
+    # Characters not on the sheet are left blank
+    readout.set_value('1?2')
+    assert shown(readout) == '1 2     '
+
+
+@pytest.mark.parametrize('value, decimals', [
+    (123456.78, 2),
+    (-12345678.0, 0),
+    (123456789, 2),
+    (1.0e12, 2),
+    ])
+def test_fill_when_too_wide(readout, value, decimals):
+    readout.set_value(value, decimals)
+    assert shown(readout) == '*'*8
+
+
+def test_only_changed_tiles_written(simulation):
+    render_layer = FakeRenderLayer()
+    readout = NumericReadout(fonts.font_10pt(), 6, 0xffffff, (0, 0), render_layer=render_layer)
+    readout.set_value(1.25)
+    assert render_layer.dirty
+    render_layer.dirty = False
+    written = readout.tiles_written
+    readout.set_value(1.25)
+    assert readout.tiles_written == written
+    assert not render_layer.dirty
+    readout.set_value(1.26)
+    assert readout.tiles_written == written + 1
+    assert render_layer.dirty
+    # The tile grid shows the same tiles
+    assert [readout.tile_grid[i] for i in range(6)] == list(readout.tiles)
@@ -0,0 +1,176 @@
+import os
+import json
+import struct
+import pytest
+import settings_cache
+from settings_cache import SettingsCacheError
+from json_settings_file import JsonSettingsFile
+
+CACHE_FILENAME = 'settings.bin'
+
+
+class CountingSettingsFile(JsonSettingsFile):
+
+    FILE_TYPE = 'test settings'
+    FILE_NAME = 'settings.json'
+
+    def __init__(self):
+        super().__init__()
+        self.num_checks = 0
+
+    def check(self):
+        self.num_checks += 1
+        if 'bad' in self.data:
+            self.error_dict['bad'] = ['bad entry']
+            del self.data['bad']
+
+
+def write_json(data, filename=CountingSettingsFile.FILE_NAME):
+    with open(filename, 'w') as f:
+        json.dump(data, f)
+
+
+def test_encode_decode_round_trip():
+    values = [
+            None,
+            True,
+            False,
+            0,
+            -12345678901,
+            settings_cache.INT_MAX,
+            settings_cache.INT_MIN,
+            1.5,
+            '',
+            'gain μ',
+            [1, [2.0, 'three'], {}],
+            {'a': {'b': [None, True]}, 'c': 'd'},
+            ]
+    for value in values:
+        data = b''.join(settings_cache.encode(value, []))
+        decoded, pos = settings_cache.decode(data)
+        assert decoded == value
+        assert pos == len(data)
+
+
+def test_encode_out_of_range():
+    with pytest.raises(SettingsCacheError):
+        settings_cache.encode(settings_cache.INT_MAX + 1, [])
+    with pytest.raises(SettingsCacheError):
+        settings_cache.encode([0]*(settings_cache.MAX_COUNT + 1), [])
+    with pytest.raises(SettingsCacheError):
+        settings_cache.encode(object(), [])
+
+
+def test_decode_unknown_tag():
+    with pytest.raises(SettingsCacheError):
+        settings_cache.decode(b'?')
+
+
+def test_write_read_round_trip(simulation):
+    data = {'startup': 'Irradiance', 'window': 5, 'cal': {'fit_coef': [1.0, 0.0]}}
+    error_dict = {'bad': ['bad entry']}
+    settings_cache.write(CACHE_FILENAME, data, error_dict, 123, 456, 789)
+    assert settings_cache.read_header(CACHE_FILENAME) == (123, 456, 789)
+    lazy_data, read_error_dict = settings_cache.read(CACHE_FILENAME)
+    assert read_error_dict == error_dict
+    assert list(lazy_data) == list(data)
+    # Entries are decoded on first access
+    assert not lazy_data.cache
+    assert lazy_data['cal'] == data['cal']
+    assert list(lazy_data.cache) == ['cal']
+    assert dict(lazy_data.items()) == data
+    assert lazy_data.get('missing', 'default') == 'default'
+    assert not os.path.exists(f'{CACHE_FILENAME}.tmp')
+
+
+def test_key_too_long(simulation):
+    data = {'k'*(settings_cache.MAX_KEY_LENGTH + 1): 1}
+    with pytest.raises(SettingsCacheError):
+        settings_cache.write(CACHE_FILENAME, data, {}, 0, 0, 0)
+
+
+def test_read_header_rejects_other_files(simulation):
+    with open(CACHE_FILENAME, 'wb') as f:
+        f.write(b'JSC')
+    with pytest.raises(SettingsCacheError):
+        settings_cache.read_header(CACHE_FILENAME)
+    with open(CACHE_FILENAME, 'wb') as f:
+        f.write(b'\x00'*settings_cache.HEADER_SIZE)
+    with pytest.raises(SettingsCacheError):
+        settings_cache.read_header(CACHE_FILENAME)
+
+
+def test_read_header_rejects_other_firmware(simulation, monkeypatch):
+    monkeypatch.setattr(settings_cache, 'FIRMWARE_VERSION', b'0.0.1')
+    settings_cache.write(CACHE_FILENAME, {'a': 1}, {}, 1, 2, 3)
+    monkeypatch.setattr(settings_cache, 'FIRMWARE_VERSION', b'0.0.2')
+    with pytest.raises(SettingsCacheError):
+        settings_cache.read_header(CACHE_FILENAME)
+
+
+def test_read_truncated(simulation):
+    settings_cache.write(CACHE_FILENAME, {'a': 'value', 'b': [1, 2, 3]}, {}, 1, 2, 3)
+    with open(CACHE_FILENAME, 'rb') as f:
+        data = f.read()
+    # Cut in the index and in the entries
+    for size in (settings_cache.HEADER_SIZE + 3, len(data) - 2):
+        with open(CACHE_FILENAME, 'wb') as f:
+            f.write(data[:size])
+        with pytest.raises(SettingsCacheError):
+            settings_cache.read(CACHE_FILENAME)
+
+
+def test_read_entry_out_of_range(simulation):
+    settings_cache.write(CACHE_FILENAME, {'a': 1}, {}, 1, 2, 3)
+    with open(CACHE_FILENAME, 'r+b') as f:
+        f.seek(settings_cache.HEADER_SIZE + 1 + len('a'))
+        f.write(struct.pack(settings_cache.INDEX_FORMAT, 0, 9))
+    with pytest.raises(SettingsCacheError):
+        settings_cache.read(CACHE_FILENAME)
+
+
+def test_load_uses_cache(simulation):
+    write_json({'a': 1, 'bad': 2})
+    settings = CountingSettingsFile()
+    settings.load()
+    assert settings.num_checks == 1
+    assert dict(settings.data) == {'a': 1}
+    assert settings.pop_error() == 'bad entry'
+
+    # Unchanged source, the checked settings and errors come from the cache
+    settings = CountingSettingsFile()
+    settings.load()
+    assert settings.num_checks == 0
+    assert dict(settings.data.items()) == {'a': 1}
+    assert settings.has_errors
+
+
+def test_load_rebuilds_stale_cache(simulation):
+    write_json({'a': 1})
+    CountingSettingsFile().load()
+
+    # Size changed
+    write_json({'a': 12})
+    settings = CountingSettingsFile()
+    settings.load()
+    assert settings.num_checks == 1
+    assert dict(settings.data) == {'a': 12}
+
+    # Same size, no usable mtime, the checksum tells them apart
+    write_json({'a': 34})
+    os.utime(CountingSettingsFile.FILE_NAME, (0, 0))
+    settings = CountingSettingsFile()
+    settings.load()
+    assert settings.num_checks == 1
+    assert dict(settings.data) == {'a': 34}
+
+
+def test_load_rebuilds_corrupt_cache(simulation):
+    write_json({'a': 1})
+    CountingSettingsFile().load()
+    with open(CACHE_FILENAME, 'r+b') as f:
+        f.truncate(settings_cache.HEADER_SIZE + 2)
+    settings = CountingSettingsFile()
+    settings.load()
+    assert settings.num_checks == 1
+    assert dict(settings.data) == {'a': 1}
@@ -0,0 +1,141 @@
+import struct
+import zlib
+import telemetry
+from command_interpreter import CommandInterpreter, FRAME_TYPE_COMMAND
+from tools.telemetry_reader import FrameDecoder
+
+TEST_FORMAT = '<HH'
+TEST_SIZE = struct.calcsize(TEST_FORMAT)
+
+
+def make_frame(frame_type, seq, payload):
+    # Host side framing, as tools/command_client.py sends commands
+    body = struct.pack(
+            telemetry.FRAME_HEADER_FORMAT,
+            telemetry.FRAME_SYNC,
+            frame_type,
+            len(payload),
+            seq,
+            ) + payload
+    crc = zlib.crc32(body[len(telemetry.FRAME_SYNC):])
+    return body + struct.pack(telemetry.FRAME_CRC_FORMAT, crc)
+
+
+def send_frames(link, num):
+    for i in range(num):
+        assert link.send(1, TEST_FORMAT, TEST_SIZE, i, 1000 + i)
+
+
+def payloads(frames):
+    return [struct.unpack(TEST_FORMAT, f.payload) for f in frames]
+
+
+def test_frames_decode(simulation):
+    link = telemetry.Telemetry(simulation.serial)
+    send_frames(link, 3)
+    frame = telemetry.frame_buffer(4)
+    frame[telemetry.FRAME_HEADER_SIZE:telemetry.FRAME_HEADER_SIZE + 4] = b'abcd'
+    assert link.send_block(7, frame)
+    decoder = FrameDecoder()
+    frames = decoder.feed(simulation.serial.host_read())
+    assert [f.seq for f in frames] == [0, 1, 2, 3]
+    assert [f.frame_type for f in frames] == [1, 1, 1, 7]
+    assert payloads(frames[:3]) == [(0, 1000), (1, 1001), (2, 1002)]
+    assert frames[3].payload == b'abcd'
+    assert decoder.crc_errors == decoder.bytes_skipped == decoder.frames_lost == 0
+
+
+def test_frames_split_across_reads(simulation):
+    link = telemetry.Telemetry(simulation.serial)
+    send_frames(link, 3)
+    data = simulation.serial.host_read()
+    decoder = FrameDecoder()
+    frames = []
+    for i in range(len(data)):
+        frames.extend(decoder.feed(data[i:i + 1]))
+    assert payloads(frames) == [(0, 1000), (1, 1001), (2, 1002)]
+    assert decoder.bytes_skipped == 0
+
+
+def test_decoder_resyncs_after_corruption(simulation):
+    link = telemetry.Telemetry(simulation.serial)
+    send_frames(link, 3)
+    data = bytearray(simulation.serial.host_read())
+    frame_size = len(data)//3
+    # Prefix some junk and flip a payload byte of the first frame
+    data[telemetry.FRAME_HEADER_SIZE] ^= 0xff
+    junk = b'\x00\xa5\x33\xa5'
+    decoder = FrameDecoder()
+    frames = decoder.feed(junk + data)
+    assert payloads(frames) == [(1, 1001), (2, 1002)]
+    assert decoder.crc_errors >= 1
+    assert decoder.bytes_skipped == len(junk) + frame_size
+    assert decoder.frames_lost == 0
+
+
+def test_decoder_counts_lost_frames(simulation):
+    link = telemetry.Telemetry(simulation.serial)
+    send_frames(link, 4)
+    data = simulation.serial.host_read()
+    frame_size = len(data)//4
+    # Drop the middle two frames
+    decoder = FrameDecoder()
+    frames = decoder.feed(data[:frame_size] + data[3*frame_size:])
+    assert [f.seq for f in frames] == [0, 3]
+    assert decoder.frames_lost == 2
+    assert decoder.crc_errors == 0
+
+
+def test_send_drops_frames_when_host_not_reading(simulation):
+    link = telemetry.Telemetry(simulation.serial, buffer_size=64)
+    size = telemetry.FRAME_HEADER_SIZE + TEST_SIZE + telemetry.FRAME_CRC_SIZE
+    sent = 0
+    while link.send(1, TEST_FORMAT, TEST_SIZE, sent, 0):
+        sent += 1
+    # The port buffer and then the transmit buffer fill, whole frames only
+    assert sent == (simulation.serial.OUT_BUFFER_SIZE + 64)//size
+    assert link.frames_dropped == 1
+    simulation.serial.host_connected = False
+    assert not link.send(1, TEST_FORMAT, TEST_SIZE, 0, 0)
+    assert link.pending == 0
+    assert link.frames_dropped == 2
+
+
+def test_commands_parsed_after_junk(simulation):
+    link = telemetry.Telemetry(simulation.serial)
+    interpreter = CommandInterpreter(None, simulation.serial, link)
+    corrupt = bytearray(make_frame(FRAME_TYPE_COMMAND, 5, b'\x01\x02'))
+    corrupt[-1] ^= 0xff
+    simulation.serial.host_write(
+            b'\x00\xa5\x33'
+            + make_frame(FRAME_TYPE_COMMAND, 1, b'\x00')
+            + bytes(corrupt)
+            + make_frame(1, 2, b'ignored')
+            + make_frame(FRAME_TYPE_COMMAND, 3, b'\x04\x05')
+            )
+    interpreter.read()
+    assert interpreter.queue == [(1, b'\x00'), (3, b'\x04\x05')]
+    assert interpreter.frame_errors == 1
+    assert interpreter.rx_count == 0
+
+
+def test_command_split_across_reads(simulation):
+    link = telemetry.Telemetry(simulation.serial)
+    interpreter = CommandInterpreter(None, simulation.serial, link)
+    data = make_frame(FRAME_TYPE_COMMAND, 9, b'\x06\x07\x08')
+    for i in range(len(data)):
+        simulation.serial.host_write(data[i:i + 1])
+        interpreter.read()
+        assert interpreter.queue == ([] if i < len(data) - 1 else [(9, b'\x06\x07\x08')])
+    assert interpreter.frame_errors == 0
+
+
+def test_oversized_frame_length_skipped(simulation):
+    link = telemetry.Telemetry(simulation.serial)
+    interpreter = CommandInterpreter(None, simulation.serial, link, buffer_size=64)
+    # A corrupted length that could never fit the buffer mustn't stall parsing
+    bad_header = struct.pack(telemetry.FRAME_HEADER_FORMAT, telemetry.FRAME_SYNC, FRAME_TYPE_COMMAND, 1000, 0)
+    simulation.serial.host_write(bad_header + make_frame(FRAME_TYPE_COMMAND, 4, b'\x00'))
+    interpreter.read()
+    assert interpreter.queue == [(4, b'\x00')]
+    assert interpreter.frame_errors == 1
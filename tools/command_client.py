@@ -0,0 +1,226 @@
+# Host side of the command protocol (src/command_interpreter.py). Commands are
+# sent as frames on the USB CDC data channel and answered with one response
+# frame each, so several commands can be in flight at once:
+#
+#   reader, writer = await open_serial('/dev/ttyACM1')
+#   client = CommandClient(reader, writer)
+#   await client.set_gain(0, 'high')
+#   records, settings = await asyncio.gather(client.acquire(100), client.get_settings())
+#
+# Or from the command line
+#
+#   python -m tools.command_client /dev/ttyACM1 --gain 1 med --acquire 100
+import sys
+import struct
+import asyncio
+import zlib
+import argparse
+import numpy as np
+
+from tools.telemetry_reader import FRAME_SYNC
+from tools.telemetry_reader import FRAME_HEADER_FORMAT
+from tools.telemetry_reader import FRAME_CRC_FORMAT
+from tools.telemetry_reader import FrameDecoder
+from tools.telemetry_reader import open_serial
+
+# Must match src/command_interpreter.py
+FRAME_TYPE_COMMAND = 2
+FRAME_TYPE_RESPONSE = 3
+
+RESPONSE_HEADER_FORMAT = '<HBB'
+RESPONSE_HEADER_SIZE = struct.calcsize(RESPONSE_HEADER_FORMAT)
+
+OP_PING = 0
+OP_GET_SETTINGS = 1
+OP_SET_GAIN = 2
+OP_SET_ITIME = 3
+OP_ACQUIRE = 4
+OP_BLANK = 5
+
+STATUS_OK = 0
+STATUS_UNKNOWN_COMMAND = 1
+STATUS_BAD_ARGUMENT = 2
+STATUS_BUSY = 3
+
+STATUS_TO_STR = {
+        STATUS_OK: 'ok',
+        STATUS_UNKNOWN_COMMAND: 'unknown command',
+        STATUS_BAD_ARGUMENT: 'bad argument',
+        STATUS_BUSY: 'busy',
+        }
+
+# Most records the device returns for one acquire command
+MAX_ACQUIRE = 256
+
+SETTINGS_FORMAT = '<BBBB'
+BLANK_FORMAT = '<ffff'
+
+RECORD_DTYPE = np.dtype([
+    ('ticks_ms', '<u4'),
+    ('frame_count', '<u4'),
+    ('counts_90', '<u2', (2,)),
+    ('counts_180', '<u2', (2,)),
+    ('values', '<f4', (2,)),
+    ])
+
+# Codes from adafruit_tsl2591, as in src/constants.py
+GAIN_TO_CODE = {'low': 0x00, 'med': 0x10, 'high': 0x20, 'max': 0x30}
+INTEGRATION_TIME_TO_CODE = {100: 0x00, 200: 0x01, 300: 0x02, 400: 0x03, 500: 0x04, 600: 0x05}
+
+SENSOR_TO_NUM = {'90': 0, '180': 1}
+
+
+class CommandError(Exception):
+
+    def __init__(self, opcode, status):
+        self.opcode = opcode
+        self.status = status
+        status_str = STATUS_TO_STR.get(status, f'status {status}')
+        super().__init__(f'command {opcode} failed: {status_str}')
+
+
+class CommandClient:
+
+    def __init__(self, reader, writer):
+        # Responses are read by a background task and matched to the waiting
+        # command by sequence number. Other frames, e.g. streamed telemetry,
+        # are ignored.
+        self.reader = reader
+        self.writer = writer
+        self.decoder = FrameDecoder()
+        self.seq = 0
+        self.waiting = {}
+        self.read_task = asyncio.get_running_loop().create_task(self.read_responses())
+
+    async def close(self):
+        self.read_task.cancel()
+        try:
+            await self.read_task
+        except asyncio.CancelledError:
+            pass
+        self.writer.close()
+
+    async def read_responses(self):
+        while True:
+            data = await self.reader.read(4096)
+            if not data:
+                break
+            for frame in self.decoder.feed(data):
+                if frame.frame_type != FRAME_TYPE_RESPONSE:
+                    continue
+                if len(frame.payload) < RESPONSE_HEADER_SIZE:
+                    continue
+                seq, opcode, status = struct.unpack_from(RESPONSE_HEADER_FORMAT, frame.payload)
+                future = self.waiting.pop(seq, None)
+                if future is None or future.done():
+                    continue
+                if status != STATUS_OK:
+                    future.set_exception(CommandError(opcode, status))
+                else:
+                    future.set_result(frame.payload[RESPONSE_HEADER_SIZE:])
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError('serial port closed'))
+        self.waiting = {}
+
+    async def command(self, opcode, args=b'', timeout=None):
+        # Sends a command and returns the result bytes of its response
+        seq = self.seq
+        self.seq = (self.seq + 1) & 0xffff
+        payload = struct.pack('<B', opcode) + args
+        body = struct.pack(FRAME_HEADER_FORMAT, FRAME_SYNC, FRAME_TYPE_COMMAND, len(payload), seq)
+        body += payload
+        crc = zlib.crc32(body[len(FRAME_SYNC):])
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[seq] = future
+        self.writer.write(body + struct.pack(FRAME_CRC_FORMAT, crc))
+        await self.writer.drain()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.waiting.pop(seq, None)
+
+    async def ping(self, timeout=None):
+        await self.command(OP_PING, timeout=timeout)
+
+    async def get_settings(self, timeout=None):
+        # Returns {'90': (gain, itime), '180': (gain, itime)} as codes
+        result = await self.command(OP_GET_SETTINGS, timeout=timeout)
+        gain_90, itime_90, gain_180, itime_180 = struct.unpack(SETTINGS_FORMAT, result)
+        return {'90': (gain_90, itime_90), '180': (gain_180, itime_180)}
+
+    async def set_gain(self, sensor, gain, timeout=None):
+        # sensor is 0 or '90', 1 or '180'; gain a code or 'low' ... 'max'
+        code = GAIN_TO_CODE.get(gain, gain)
+        args = struct.pack('<BB', sensor_num(sensor), code)
+        await self.command(OP_SET_GAIN, args, timeout=timeout)
+
+    async def set_itime(self, sensor, itime, timeout=None):
+        # itime is a code or the integration time in ms
+        code = INTEGRATION_TIME_TO_CODE.get(itime, itime)
+        args = struct.pack('<BB', sensor_num(sensor), code)
+        await self.command(OP_SET_ITIME, args, timeout=timeout)
+
+    async def acquire(self, count, timeout=None):
+        # Returns count records as a numpy array with RECORD_DTYPE. Counts over
+        # MAX_ACQUIRE are sent as several commands, one after another, and the
+        # timeout applies to each. Frames arriving between them are missed
+        # (see the frame_count field).
+        sizes = [MAX_ACQUIRE]*(count//MAX_ACQUIRE)
+        if count % MAX_ACQUIRE or not sizes:
+            sizes.append(count % MAX_ACQUIRE)
+        results = []
+        for size in sizes:
+            results.append(await self.command(OP_ACQUIRE, struct.pack('<H', size), timeout=timeout))
+        return np.frombuffer(b''.join(results), dtype=RECORD_DTYPE)
+
+    async def blank(self, timeout=None):
+        # Returns {'90': (ch0, ch1), '180': (ch0, ch1)} dark count offsets
+        result = await self.command(OP_BLANK, timeout=timeout)
+        ch0_90, ch1_90, ch0_180, ch1_180 = struct.unpack(BLANK_FORMAT, result)
+        return {'90': (ch0_90, ch1_90), '180': (ch0_180, ch1_180)}
+
+
+def sensor_num(sensor):
+    return SENSOR_TO_NUM.get(str(sensor), sensor)
+
+
+async def main_async(args):
+    reader, writer = await open_serial(args.port)
+    client = CommandClient(reader, writer)
+    try:
+        await client.ping(timeout=args.timeout)
+        if args.gain is not None:
+            await client.set_gain(args.gain[0], args.gain[1], timeout=args.timeout)
+        if args.itime is not None:
+            await client.set_itime(args.itime[0], int(args.itime[1]), timeout=args.timeout)
+        if args.blank:
+            print(f'blank: {await client.blank(timeout=args.timeout)}')
+        print(f'settings: {await client.get_settings(timeout=args.timeout)}')
+        if args.acquire:
+            records = await client.acquire(args.acquire, timeout=args.timeout)
+            print(f'records: {len(records)}')
+            print(f'counts 90 (ch0) mean: {records["counts_90"][:, 0].mean():1.1f}')
+            print(f'counts 180 (ch0) mean: {records["counts_180"][:, 0].mean():1.1f}')
+            if args.save is not None:
+                np.save(args.save, records)
+    finally:
+        await client.close()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='USB command client')
+    parser.add_argument('port', help='serial port of the USB CDC data channel')
+    parser.add_argument('--gain', nargs=2, metavar=('SENSOR', 'GAIN'), help='set gain, e.g. 90 high')
+    parser.add_argument('--itime', nargs=2, metavar=('SENSOR', 'MS'), help='set integration time, e.g. 180 200')
+    parser.add_argument('--blank', action='store_true', help='capture dark counts first')
+    parser.add_argument('--acquire', type=int, default=0, help='number of paired frames to acquire')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per command timeout (s)')
+    parser.add_argument('--save', default=None, help='save records to this .npy file')
+    args = parser.parse_args(args)
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
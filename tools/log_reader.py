@@ -0,0 +1,117 @@
+# Reads data logger files (src/data_logger.py) on the host as numpy
+# structured arrays. Files are memory mapped so even very large logs open
+# instantly and only the parts used are read from disk.
+#
+#   python -m tools.log_reader logs/            # summary of all log files
+#   python -m tools.log_reader logs/log_0003.bin
+#
+import os
+import sys
+import argparse
+import numpy as np
+
+LOG_MAGIC = b'CLOG'
+LOG_VERSION = 1
+
+# Must match HEADER_FORMAT and RECORD_FORMAT in src/data_logger.py
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u2'),
+    ('record_size', '<u2'),
+    ('file_num', '<u4'),
+    ('reserved', '<u4'),
+    ])
+
+RECORD_DTYPE = np.dtype([
+    ('ticks_ms', '<u4'),
+    ('counts_90', '<u2', (2,)),
+    ('counts_180', '<u2', (2,)),
+    ('gain_90', 'u1'),
+    ('itime_90', 'u1'),
+    ('gain_180', 'u1'),
+    ('itime_180', 'u1'),
+    ('value', '<f4', (2,)),
+    ('battery', '<f4'),
+    ])
+
+
+class LogFormatError(Exception):
+    pass
+
+
+def read_header(path):
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header['magic'][0] != LOG_MAGIC:
+        raise LogFormatError(f'{path} is not a data log file')
+    if header['version'][0] != LOG_VERSION:
+        raise LogFormatError(f'{path} unsupported version {header["version"][0]}')
+    if header['record_size'][0] != RECORD_DTYPE.itemsize:
+        raise LogFormatError(f'{path} record size {header["record_size"][0]} != {RECORD_DTYPE.itemsize}')
+    return header[0]
+
+
+def read_log(path):
+    # Returns the records of one log file as a read only memory mapped array
+    read_header(path)
+    num = (os.path.getsize(path) - HEADER_DTYPE.itemsize)//RECORD_DTYPE.itemsize
+    if num == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_DTYPE.itemsize, shape=(num,))
+
+
+def log_files(directory):
+    # Log files in the directory in the order they were written
+    names = [n for n in os.listdir(directory) if n.startswith('log_') and n.endswith('.bin')]
+    names.sort(key=lambda n: int(n[4:-4]))
+    return [os.path.join(directory, n) for n in names]
+
+
+def read_logs(directory):
+    # Returns the records of all log files in the directory as one array. This
+    # copies the records, use read_log on the files to keep them mapped.
+    logs = [read_log(path) for path in log_files(directory)]
+    if not logs:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.concatenate(logs)
+
+
+def summary(records):
+    lines = [f'records: {len(records)}']
+    if len(records):
+        dt_ms = np.diff(records['ticks_ms'].astype(np.int64)) % 2**32
+        lines.append(f'duration: {dt_ms.sum()/1000:1.1f}s')
+        if len(dt_ms):
+            lines.append(f'frame period: {np.median(dt_ms):1.0f}ms (median)')
+        for i in range(2):
+            value = records['value'][:, i]
+            good = value[~np.isnan(value)]
+            if len(good):
+                lines.append(f'value {i}: mean {good.mean():1.4g}, std {good.std():1.4g}, n {len(good)}')
+        lines.append(f'battery: {records["battery"].min():1.2f}V - {records["battery"].max():1.2f}V')
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='data logger file reader')
+    parser.add_argument('path', help='log file or directory of log files')
+    args = parser.parse_args(args)
+    if os.path.isdir(args.path):
+        paths = log_files(args.path)
+    else:
+        paths = [args.path]
+    try:
+        for path in paths:
+            print(f'{path}: {len(read_log(path))} records')
+        if os.path.isdir(args.path):
+            records = read_logs(args.path)
+        else:
+            records = read_log(args.path)
+    except LogFormatError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(summary(records))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# Reads the binary telemetry stream (src/telemetry.py) from the device's USB
+# CDC data channel with asyncio and decodes acquisitions into numpy arrays.
+#
+#   python -m tools.telemetry_reader /dev/ttyACM1 --count 100
+#
+# The port is opened as a plain tty, so a pseudo terminal such as the one
+# made by sim.Simulation(usb_pty=True) works as a stand-in for the device.
+import os
+import sys
+import tty
+import struct
+import asyncio
+import zlib
+import argparse
+import numpy as np
+
+# Must match the formats in src/telemetry.py
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_HEADER_FORMAT = '<2sBHH'
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER_FORMAT)
+FRAME_CRC_FORMAT = '<I'
+FRAME_CRC_SIZE = struct.calcsize(FRAME_CRC_FORMAT)
+
+FRAME_TYPE_ACQUISITION = 1
+
+ACQUISITION_DTYPE = np.dtype([
+    ('ticks_ms', '<u4'),
+    ('frame_count', '<u4'),
+    ('counts_90', '<u2', (2,)),
+    ('counts_180', '<u2', (2,)),
+    ('gain_90', 'u1'),
+    ('itime_90', 'u1'),
+    ('gain_180', 'u1'),
+    ('itime_180', 'u1'),
+    ])
+
+
+class Frame:
+
+    def __init__(self, frame_type, seq, payload):
+        self.frame_type = frame_type
+        self.seq = seq
+        self.payload = payload
+
+    def __repr__(self):
+        return f'<Frame type {self.frame_type} seq {self.seq} {len(self.payload)} bytes>'
+
+
+class FrameDecoder:
+
+    # Incremental decoder. Bytes which can't be part of a valid frame are
+    # skipped until the next sync, so decoding recovers from dropped or
+    # corrupted bytes.
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.last_seq = None
+        self.frames = 0
+        self.crc_errors = 0
+        self.bytes_skipped = 0
+        self.frames_lost = 0
+
+    def feed(self, data):
+        # Returns the complete frames found in the data fed so far
+        self.buffer.extend(data)
+        frames = []
+        while True:
+            start = self.buffer.find(FRAME_SYNC)
+            if start < 0:
+                keep = 1 if self.buffer.endswith(FRAME_SYNC[:1]) else 0
+                self.skip(len(self.buffer) - keep)
+                break
+            self.skip(start)
+            if len(self.buffer) < FRAME_HEADER_SIZE:
+                break
+            sync, frame_type, length, seq = struct.unpack_from(FRAME_HEADER_FORMAT, self.buffer)
+            frame_size = FRAME_HEADER_SIZE + length + FRAME_CRC_SIZE
+            if len(self.buffer) < frame_size:
+                break
+            crc_pos = FRAME_HEADER_SIZE + length
+            crc, = struct.unpack_from(FRAME_CRC_FORMAT, self.buffer, crc_pos)
+            if zlib.crc32(self.buffer[len(FRAME_SYNC):crc_pos]) != crc:
+                # Not a frame after all, look for the next sync
+                self.crc_errors += 1
+                self.skip(1)
+                continue
+            payload = bytes(self.buffer[FRAME_HEADER_SIZE:crc_pos])
+            del self.buffer[:frame_size]
+            if self.last_seq is not None:
+                self.frames_lost += (seq - self.last_seq - 1) & 0xffff
+            self.last_seq = seq
+            self.frames += 1
+            frames.append(Frame(frame_type, seq, payload))
+        return frames
+
+    def skip(self, num):
+        if num > 0:
+            del self.buffer[:num]
+            self.bytes_skipped += num
+
+
+def acquisitions_to_array(frames):
+    payloads = [f.payload for f in frames if f.frame_type == FRAME_TYPE_ACQUISITION]
+    return np.frombuffer(b''.join(payloads), dtype=ACQUISITION_DTYPE)
+
+
+async def open_serial(path):
+    # Returns (reader, writer) asyncio streams for a tty or pty
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    tty.setraw(fd)
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    read_file = os.fdopen(fd, 'rb', buffering=0, closefd=True)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), read_file)
+    write_file = os.fdopen(os.dup(fd), 'wb', buffering=0)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, write_file)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return reader, writer
+
+
+class TelemetryReader:
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.decoder = FrameDecoder()
+        self.frames = []
+
+    async def read_frames(self, count=None, timeout=None):
+        # Reads until count frames have been decoded, the stream ends or no
+        # data arrives for timeout seconds. Returns the frames read.
+        frames = self.frames
+        self.frames = []
+        while count is None or len(frames) < count:
+            try:
+                data = await asyncio.wait_for(self.reader.read(4096), timeout)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+            frames.extend(self.decoder.feed(data))
+        if count is not None:
+            # Keep any extra frames for the next call
+            self.frames = frames[count:]
+            frames = frames[:count]
+        return frames
+
+    async def read_acquisitions(self, count=None, timeout=None):
+        return acquisitions_to_array(await self.read_frames(count, timeout))
+
+
+async def main_async(args):
+    reader, writer = await open_serial(args.port)
+    telemetry_reader = TelemetryReader(reader)
+    records = await telemetry_reader.read_acquisitions(args.count, args.timeout)
+    writer.close()
+    decoder = telemetry_reader.decoder
+    print(f'acquisitions: {len(records)}')
+    print(f'frames lost: {decoder.frames_lost}, crc errors: {decoder.crc_errors}, bytes skipped: {decoder.bytes_skipped}')
+    if len(records):
+        print(f'counts 90 (ch0) mean: {records["counts_90"][:, 0].mean():1.1f}')
+        print(f'counts 180 (ch0) mean: {records["counts_180"][:, 0].mean():1.1f}')
+    if args.save is not None:
+        np.save(args.save, records)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='USB telemetry stream reader')
+    parser.add_argument('port', help='serial port of the USB CDC data channel')
+    parser.add_argument('--count', type=int, default=None, help='number of frames to read')
+    parser.add_argument('--timeout', type=float, default=5.0, help='stop when idle this long (s)')
+    parser.add_argument('--save', default=None, help='save acquisitions to this .npy file')
+    args = parser.parse_args(args)
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())